@@ -1,12 +1,10 @@
-import time
 import mc6470
-import math
-import subprocess
-import requests
-import psutil
 import RPi.GPIO as GPIO
+from imu_stream import ImuStream, SAMPLE_RATE_HZ
+from supervisor import Supervisor
+from Emergency import send_emergency
+from send_regions_to_glass import send_regions_to_glass
 
-GPIO.cleanup()
 # ─── GPIO / LED SETUP ──────────────────────────────────────────────────────────
 LED_PIN = 24  # BCM pin where LED anode (via resistor) is connected
 GPIO.setmode(GPIO.BCM)
@@ -15,57 +13,40 @@ GPIO.setup(LED_PIN, GPIO.OUT, initial=GPIO.LOW)  # LED off at first
 # Track LED state for blinking
 led_state = False  # True = ON (GPIO.HIGH)
 
-# ─── SENSOR & SCRIPT PATH SETUP ───────────────────────────────────────────────
+# ─── SENSOR & TASK SETUP ──────────────────────────────────────────────────────
 accl = mc6470.Accelerometer()
-script_path = '/home/wearableaac/send_regions_to_glass.py'
 
-def is_script_running(script_name):
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            if script_name in ' '.join(proc.info['cmdline']):
-                return True
-        except Exception:
-            continue
-    return False
+# The senders run in this process: the emergency sender is a thread parked on an
+# event, so a tilt only sets a flag instead of starting a python3 interpreter
+supervisor = Supervisor()
+supervisor.add_trigger('emergency', send_emergency)
 
-while True:
-    time.sleep(0.5)
-    ax, ay, az = accl.get_data()
-    roll = math.degrees(math.atan2(ax, az))
-    rel = roll - 90
-    blink_on = False
+# Gestures that start each task: a held tilt, or two quick tilts to the same side
+EMERGENCY_GESTURES = {("hold", "left"), ("double_tilt", "left")}
+REGION_GESTURES = {("hold", "right"), ("double_tilt", "right")}
 
-    if -90 < rel < -45:      # left head tilt
-        blink_on = True
-        if not is_script_running('Emergency.py'):
-            subprocess.Popen(['python3', '/home/wearableaac/Emergency.py'])
-            print("Started script due to left tilt")
-#        else:
-#            print("Script already running.")
-    elif 45 < rel < 90:      # right head tilt
-        if not is_script_running('send_regions_to_glass.py'):
-            subprocess.Popen(['python3', script_path])
-#            print("Started script due to right tilt")
-#        else:
-            print("Script already running.")
-    elif -45 < rel < 45:      # normal
-#        print("normal")
-        continue
-    else:
-        print("Emergency")
-    # ── LED handling ───────────────────────────────────────────────────────
-    if blink_on:
-        # Toggle LED state to create blink effect (1 Hz)
-        led_state = not led_state
-        GPIO.output(LED_PIN, GPIO.HIGH if led_state else GPIO.LOW)
-    else:
-        # Ensure LED is solid ON
-        if not led_state:
-            led_state = True
-            GPIO.output(LED_PIN, GPIO.LOW)
+stream = ImuStream(accl, rate_hz=SAMPLE_RATE_HZ)
+blink_samples = max(1, round(0.5 * SAMPLE_RATE_HZ))
 
+for sample, gesture in stream.events():
+    ax, ay, az, rel = sample.ax, sample.ay, sample.az, sample.roll
 
+    if gesture is not None:
+        print(f"[INFO] {gesture.kind} {gesture.side} after {gesture.latency_samples} samples")
+        if (gesture.kind, gesture.side) in EMERGENCY_GESTURES:
+            supervisor.trigger('emergency')
+        elif (gesture.kind, gesture.side) in REGION_GESTURES:
+            supervisor.start('send_regions_to_glass', send_regions_to_glass)
 
+    # ── LED handling ───────────────────────────────────────────────────────
+    if stream.recognizer.side == "left":      # left head tilt
+        # Toggle LED state every 0.5 s to create blink effect (1 Hz)
+        if sample.index % blink_samples == 0:
+            led_state = not led_state
+            GPIO.output(LED_PIN, GPIO.HIGH if led_state else GPIO.LOW)
+    elif led_state:
+        led_state = False
+        GPIO.output(LED_PIN, GPIO.LOW)
 
     #print("", flush=True)
     #print(f"aX: {ax:.2f} m/s², Y: {ay:.2f} m/s², Z: {az:.2f} m/s²", flush=True)
@@ -2,78 +2,15 @@ import json
 import os
 import time
 from eyetracking import main as gaze_stream
-import math
+from gaze_filter import make_gaze_filter, smooth_gaze
+from region_layout import classify_point  # noqa: F401 (re-exported for the pipeline)
 
 CALIBRATION_FILE = "calibration_data.json"
+# Smoothing applied to the pupil stream before transform_coordinates:
+# "one_euro", "kalman", "median" or "none"
+GAZE_FILTER = "one_euro"
 corner_labels = ["center", "top_mid", "left_mid", "bottom_mid", "right_mid"]
 
-def classify_point(x, y):
-    a = 1
-    cx, cy = 0.5, 0.5
-    dx = x - cx
-    dy = y - cy
-    dist = math.hypot(dx, dy)
-
-    inner_radius = 0.25 * a
-    outer_radius = 0.47 * a
-
-    if dist <= inner_radius:
-        return "25"
-    
-    elif dist <= outer_radius:
-        angle = math.degrees(math.atan2(dy, dx)) % 360
-        if 0 <= angle < 36:
-            return "1"
-        elif 36 <= angle < 45:
-            return "2"
-        elif 45 <= angle < 360/7:
-            return "3"
-        elif 360/7 <= angle < 72:
-            return "4"
-        elif 72 <= angle < 2*360/7:
-            return "5"
-        elif 2*360/7 <= angle < 108:
-            return "6"
-        elif 108 <= angle < 135:
-            return "7"
-        elif 135 <= angle < 144:
-            return "8"
-        elif 144 <= angle < 3*360/7:
-            return "9"
-        elif 3*360/7 <= angle < 180:
-            return "10"
-        elif 180 <= angle < 4*360/7:
-            return "11"
-        elif 4*360/7 <= angle < 216:
-            return "12"
-        elif 216 <= angle < 225:
-            return "13"
-        elif 225 <= angle < 252:
-            return "14"
-        elif 252 <= angle < 5*360/7:
-            return "15"
-        elif 5*360/7 <= angle < 288:
-            return "16"
-        elif 288 <= angle < 6*360/7:
-            return "17"
-        elif 6*360/7 <= angle < 315:
-            return "18"
-        elif 315 <= angle < 324:
-            return "19"
-        else:
-            return "20"
-    else:
-        if x < 0.5 and y < 0.5:
-            return "23"
-        elif x > 0.5 and y < 0.5:
-            return "24"
-        elif x < 0.5 and y > 0.5:
-            return "21"
-        elif x > 0.5 and y > 0.5:
-            return "22"
-        else:
-            return "outside"
-
 class Calibration:
     def __init__(self):
         self.corners = {}
@@ -81,9 +18,11 @@ class Calibration:
             with open(CALIBRATION_FILE, 'r') as f:
                 self.corners = json.load(f)
 
-    def calibrate(self, gaze_generator):
+    def calibration_steps(self, gaze_generator):
+        # Yields each label before its countdown so callers can show the target
         self.corners = {}
         for label in corner_labels:
+            yield label
             print(label)
             for i in range(3, 0, -1):
                 print(label)
@@ -96,6 +35,10 @@ class Calibration:
             json.dump(self.corners, f)
             print("[INFO] Calibration data saved.")
 
+    def calibrate(self, gaze_generator):
+        for _ in self.calibration_steps(gaze_generator):
+            pass
+
     def transform_coordinates(self, rel_x, rel_y):
         if len(self.corners) != 5:
             raise ValueError("Calibration data is incomplete. Please calibrate.")
@@ -155,10 +98,9 @@ if __name__ == "__main__":
 
     print("\n[INFO] Starting live gaze processing (press Ctrl+C to stop):")
     try:
-        for rel_x, rel_y in stream:
+        for rel_x, rel_y in smooth_gaze(stream, make_gaze_filter(GAZE_FILTER)):
             cal_x, cal_y = calib.transform_coordinates(rel_x, rel_y)
             region = classify_point(cal_x, cal_y)
             print(region)
-            time.sleep(0.5)
     except KeyboardInterrupt:
         print("\n[INFO] Gaze processing stopped.")
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+WINDOW = 30  # Recent frames the drift statistics look at (1 s at 30 fps)
+MAX_FAILURE_RATE = 0.6  # Pupil lost on more than this share of them
+AREA_FACTOR = 2.5  # Median pupil area this many times above / below the box's baseline
+EDGE_MARGIN = 0.1  # Pupil centre within this share of the crop size from an edge...
+MAX_EDGE_RATE = 0.5  # ...on more than this share of the detections
+SEARCH_PAD = 0.5  # Re-detection first searches the last box grown by this much per side
+RETRY_INTERVAL = 0.5  # sec between attempts while no eye is found
+
+
+class EyeBoxManager:
+    """
+    Keeps the eye box the pupil tracker crops to, and re-runs the Haar detector
+    only when the box looks wrong: the pupil is lost on most frames, its area
+    moved far from what it was in this box, or it sits against the crop edge
+    (the headset slipped). A re-detection searches around the last box before
+    falling back to the whole frame, and runs on a worker thread so the frame
+    loop keeps going with the old box meanwhile.
+
+    Arguments:
+        cascade: cv2.CascadeClassifier for eyes
+        fixed_box: (x, y, w, h) to always use; disables detection
+        background: Detect on a worker thread (False: inline, e.g. for repeatable benchmarks)
+        to_gray: Turns a frame into the grayscale image the cascade runs on; only
+            called when a detection starts
+    """
+
+    def __init__(self, cascade, fixed_box=None, background=True, window=WINDOW, to_gray=None):
+        self.cascade = cascade
+        self.to_gray = to_gray or (lambda frame: frame)
+        self.fixed = fixed_box is not None
+        self.box = None if fixed_box is None else tuple(int(v) for v in fixed_box)
+        self.box_id = 0  # Changes with every new box, so trackers know to reset
+        self.background = background
+        self.window = window
+        self.results = deque(maxlen=window)  # True for each frame the pupil was found
+        self.areas = deque(maxlen=window)
+        self.edges = deque(maxlen=window)  # True for each detection near the crop edge
+        self.baseline_area = None
+        self.needs_detection = self.box is None
+        self.worker = None
+        self.found = None  # (box, how) from the worker, applied by the next update()
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+        self.local_detections = 0
+        self.full_detections = 0
+        self.failed_detections = 0
+
+    def update(self, frame):
+        """Call once per frame; returns the box to crop (None until an eye is found)"""
+        if self.fixed:
+            return self.box
+        with self.lock:
+            found, self.found = self.found, None
+        if found is not None:
+            self._set_box(*found)
+
+        busy = self.worker is not None and self.worker.is_alive()
+        if self.needs_detection and not busy and time.monotonic() >= self.retry_at:
+            gray = self.to_gray(frame)
+            if self.background:
+                if gray is frame or gray.base is not None:
+                    # The frame buffer may be reused by the camera (or the next stage) while detecting
+                    gray = gray.copy()
+                self.worker = threading.Thread(target=self._detect, args=(gray, self.box),
+                                               name="eye_box", daemon=True)
+                self.worker.start()
+            else:
+                self._detect(gray, self.box)
+                with self.lock:
+                    found, self.found = self.found, None
+                if found is not None:
+                    self._set_box(*found)
+        return self.box
+
+    def report(self, detection, crop_shape, box_id=None):
+        """Feeds the pupil detection (or None) of a frame cropped to box box_id; closed-eye frames should not be reported"""
+        if self.fixed or self.box is None or (box_id is not None and box_id != self.box_id):
+            return
+        self.results.append(detection is not None)
+        if detection is not None:
+            self.areas.append(detection.area)
+            (x, y), (h, w) = detection.center, crop_shape[:2]
+            self.edges.append(min(x, w - x) < EDGE_MARGIN * w or min(y, h - y) < EDGE_MARGIN * h)
+        if len(self.results) < self.window or self.needs_detection:
+            return
+
+        reason = None
+        if self.results.count(False) > MAX_FAILURE_RATE * self.window:
+            reason = "pupil lost"
+        elif len(self.areas) >= self.window // 2:
+            area = float(np.median(self.areas))
+            if self.baseline_area is None:
+                self.baseline_area = area
+            elif not self.baseline_area / AREA_FACTOR < area < self.baseline_area * AREA_FACTOR:
+                reason = "pupil size changed"
+            elif self.edges.count(True) > MAX_EDGE_RATE * len(self.edges):
+                reason = "pupil at the crop edge"
+        if reason:
+            print(f"[INFO] Eye box drift ({reason}), re-detecting")
+            self.needs_detection = True
+
+    def _set_box(self, box, how):
+        self.box = box
+        self.box_id += 1
+        self.needs_detection = False
+        self.results.clear()
+        self.areas.clear()
+        self.edges.clear()
+        self.baseline_area = None
+        print(f"[INFO] Eye box {box} ({how} search)")
+
+    def _search(self, gray, x1=0, y1=0):
+        eyes = self.cascade.detectMultiScale(gray, 1.3, 5)
+        if len(eyes) == 0:
+            return None
+        ex, ey, ew, eh = max(eyes, key=lambda e: e[2] * e[3])
+        return int(ex + x1), int(ey + y1), int(ew), int(eh)
+
+    def _detect(self, gray, last_box):
+        found = None
+        if last_box is not None:
+            x, y, w, h = last_box
+            pad_x, pad_y = int(w * SEARCH_PAD), int(h * SEARCH_PAD)
+            x1, y1 = max(x - pad_x, 0), max(y - pad_y, 0)
+            x2, y2 = min(x + w + pad_x, gray.shape[1]), min(y + h + pad_y, gray.shape[0])
+            box = self._search(gray[y1:y2, x1:x2], x1, y1)
+            if box is not None:
+                found = (box, "local")
+                self.local_detections += 1
+        if found is None:
+            box = self._search(gray)
+            if box is not None:
+                found = (box, "full frame")
+                self.full_detections += 1
+        if found is None:
+            self.failed_detections += 1
+            self.retry_at = time.monotonic() + RETRY_INTERVAL
+        with self.lock:
+            self.found = found
@@ -1,18 +1,71 @@
-from picamera2 import Picamera2
+import os
 import cv2
-from collections import deque
+from collections import namedtuple
 import numpy as np
 import time
 
-# Initialize a deque to store the last N eye positions for smoothing
-eye_buffer = deque(maxlen=5)
+from eye_box import EyeBoxManager
+from frame_capture import LatestFrameCapture
+
+try:
+    from picamera2 import Picamera2
+except ImportError:  # Replays and benchmarks (session_recording.py) run without the Pi camera stack
+    Picamera2 = None
 
 # Load the pre-trained Haar Cascade classifier for eye detection
-eye_cascade = cv2.CascadeClassifier('/usr/share/opencv4/haarcascades/haarcascade_eye.xml')
+EYE_CASCADE_FILE = '/usr/share/opencv4/haarcascades/haarcascade_eye.xml'
+if not os.path.exists(EYE_CASCADE_FILE) and hasattr(cv2, "data"):
+    # pip's opencv-python ships its own copy
+    EYE_CASCADE_FILE = os.path.join(cv2.data.haarcascades, 'haarcascade_eye.xml')
+eye_cascade = cv2.CascadeClassifier(EYE_CASCADE_FILE)
+
+# "yuv420": the camera delivers planar YUV and the pipeline works on its Y (luma)
+# plane, which is the grayscale image already; "bgr": colour frames, converted per crop
+CAPTURE_FORMAT = "yuv420"
+CAPTURE_SIZE = (640, 480)
+# Capture on a separate thread and always process the newest frame (stale ones are
+# dropped and counted, see frame_capture.py) instead of capturing between frames
+CAPTURE_THREAD = True
+# Run capture, preprocessing and pupil detection as separate processes connected by
+# shared memory (frame_pipeline.py), so consecutive frames use different cores
+PROCESS_PIPELINE = False
+
+# Started on first use, so importing this module does not grab the camera
+picam2 = None
+camera = None
+
+class LumaCamera:
+    # capture_array() returns the Y plane of each YUV420 frame as a 2-D view
+    # (the U and V planes below it are never touched)
+    def __init__(self, picam2, size=CAPTURE_SIZE):
+        picam2.configure(picam2.create_preview_configuration(main={"format": "YUV420", "size": size}))
+        self.picam2 = picam2
+        self.height = size[1]
+
+    def capture_array(self):
+        return self.picam2.capture_array()[:self.height]
 
-# Initialize Picamera2
-picam2 = Picamera2()
-picam2.start()
+def open_camera():
+    global picam2, camera
+    if camera is None:
+        if Picamera2 is None:
+            raise RuntimeError("picamera2 is not installed; pass a camera such as session_recording.ReplayCamera")
+        picam2 = Picamera2()
+        camera = LumaCamera(picam2) if CAPTURE_FORMAT == "yuv420" else picam2
+        picam2.start()
+        if CAPTURE_THREAD:
+            camera = LatestFrameCapture(camera).start()
+    return camera
+
+def to_gray(frame):
+    # 2-D frames (luma planes, gray recordings) are used as they are
+    if frame.ndim == 2:
+        return frame
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def blur_eye(eye_gray):
+    # One blurred crop per frame, shared by the pupil search and the closed-eye check
+    return cv2.GaussianBlur(eye_gray, (7, 7), 0)
 
 def fit_circle_to_partial_pupil(contour):
     pts = contour.reshape(-1, 2)
@@ -20,27 +73,23 @@ def fit_circle_to_partial_pupil(contour):
     center = (int(x), int(y))
     return center, int(radius)
 
-def estimate_eye_closed(eye_frame):
-    gray = cv2.cvtColor(eye_frame, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    black_pixels = np.sum(thresh == 0)
+def estimate_eye_closed(eye_frame, blurred=None):
+    if blurred is None:
+        blurred = cv2.GaussianBlur(to_gray(eye_frame), (5, 5), 0)
+    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     total_pixels = thresh.size
+    black_pixels = total_pixels - cv2.countNonZero(thresh)
     darkness_ratio = black_pixels / total_pixels
     return darkness_ratio > 0.7
 
-def track_pupil(eye_frame, initial_threshold=30):
-    gray = cv2.cvtColor(eye_frame, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
+# "histogram" picks the threshold from one cumulative histogram and runs
+# findContours once; "sweep" is the original walk outward from the initial threshold
+PUPIL_ENGINE = "histogram"
 
-    h, w = eye_frame.shape[:2]
-    frame_area = w * h
-
-    best_pupil = None
-    best_thresh = initial_threshold
-    step = 5
-    max_attempts = 10
+# confidence (0-1): how much of its enclosing circle the pupil blob fills
+PupilDetection = namedtuple("PupilDetection", ["center", "area", "threshold", "confidence"])
 
+def pupil_threshold_candidates(initial_threshold=30, step=5, max_attempts=10):
     thresholds = []
     for i in range(max_attempts):
         up = initial_threshold + step * i
@@ -49,85 +98,229 @@ def track_pupil(eye_frame, initial_threshold=30):
             thresholds.append(up)
         if down >= 0 and down != up:
             thresholds.append(down)
+    return thresholds
+
+def contour_center(contour):
+    M = cv2.moments(contour)
+    if M["m00"] != 0:
+        return int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
+    (x, y), radius = cv2.minEnclosingCircle(contour)
+    if radius > 1:
+        return int(x), int(y)
+    return None
+
+def largest_contour(blurred, threshold):
+    _, thresh_img = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(thresh_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, 0.0
+    max_contour = max(contours, key=cv2.contourArea)
+    return max_contour, cv2.contourArea(max_contour)
+
+def pupil_confidence(contour, area):
+    # A round pupil fills most of its enclosing circle; eyelid shadow or lashes merged
+    # into the blob, or a pupil cut off by the crop, fill much less
+    _, radius = cv2.minEnclosingCircle(contour)
+    if radius <= 0:
+        return 0.0
+    return min(1.0, area / (np.pi * radius * radius))
+
+def first_pupil(blurred, thresholds):
+    # First threshold whose largest dark blob passes the size gate
+    frame_area = blurred.shape[0] * blurred.shape[1]
 
     for threshold in thresholds:
-        _, thresh_img = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY_INV)
-        contours, _ = cv2.findContours(thresh_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if contours:
-            max_contour = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(max_contour)
-
-            if frame_area * 0.01 < area < frame_area * 0.5:
-                M = cv2.moments(max_contour)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"])
-                    cy = int(M["m01"] / M["m00"])
-                    best_pupil = (cx, cy)
-                    best_thresh = threshold
-                    break
-                else:
-                    (x, y), radius = cv2.minEnclosingCircle(max_contour)
-                    if radius > 1:
-                        best_pupil = (int(x), int(y))
-                        best_thresh = threshold
-                        break
+        max_contour, area = largest_contour(blurred, threshold)
 
-    if best_pupil:
-        cv2.circle(eye_frame, best_pupil, 3, (255, 0, 0), -1)
+        if max_contour is not None and frame_area * 0.01 < area < frame_area * 0.5:
+            center = contour_center(max_contour)
+            if center is not None:
+                return PupilDetection(center, area, threshold, pupil_confidence(max_contour, area))
+    return None
 
-    return best_pupil
+def likely_pupil_thresholds(blurred, thresholds, min_ratio=0.01, max_ratio=0.5):
+    # THRESH_BINARY_INV keeps pixels <= threshold, so the cumulative histogram gives
+    # the dark area of every candidate threshold at once
+    dark_area = np.cumsum(np.bincount(blurred.ravel(), minlength=256))
+    ratios = dark_area[thresholds] / blurred.size
+    return [t for t, ratio in zip(thresholds, ratios) if min_ratio < ratio < max_ratio]
 
-def median_smooth_position(eye_buffer):
-    if len(eye_buffer) > 1:
-        smoothed_position = np.median(np.array(eye_buffer), axis=0).astype(int)
-        return smoothed_position
-    return eye_buffer[-1]
+def locate_pupil_histogram(blurred, initial_threshold=30):
+    # Only the first likely threshold is tried: a frame whose blob there fails the
+    # size gate is dropped rather than paying for the sweep
+    likely = likely_pupil_thresholds(blurred, pupil_threshold_candidates(initial_threshold))
+    return first_pupil(blurred, likely[:1])
 
-def main():
-    eye_bbox_fixed = None
-    last_update_time = 0
+def locate_pupil_sweep(blurred, initial_threshold=30):
+    return first_pupil(blurred, pupil_threshold_candidates(initial_threshold))
 
-    while True:
-        frame = picam2.capture_array()  # 获取 NumPy 格式的当前帧
+def locate_pupil(blurred, initial_threshold=30, engine=None):
+    engine = engine or PUPIL_ENGINE
+    if engine == "histogram":
+        return locate_pupil_histogram(blurred, initial_threshold)
+    if engine == "sweep":
+        return locate_pupil_sweep(blurred, initial_threshold)
+    raise ValueError(f"Unknown pupil engine: {engine}")
+
+# "temporal" follows the pupil inside a small ROI around its last centre and only
+# falls back to the full locate_pupil search on loss; "full" searches every frame
+TRACKING_MODE = "temporal"
+
+class PupilTracker:
+    def __init__(self, initial_threshold=30, engine=None, roi_scale=3.0, min_roi=12,
+                 area_tolerance=2.0):
+        self.initial_threshold = initial_threshold
+        self.engine = engine
+        self.roi_scale = roi_scale
+        self.min_roi = min_roi
+        self.area_tolerance = area_tolerance
+        self.last = None
+        self.local_updates = 0
+        self.full_searches = 0
+
+    def reset(self):
+        self.last = None
+
+    def local_update(self, blurred):
+        (px, py), area, threshold, _ = self.last
+        h, w = blurred.shape[:2]
+        half = max(self.min_roi, int(self.roi_scale * np.sqrt(area / np.pi)))
 
-        current_time = time.time()
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        x1, y1 = max(px - half, 0), max(py - half, 0)
+        x2, y2 = min(px + half + 1, w), min(py + half + 1, h)
+        roi = blurred[y1:y2, x1:x2]
 
-        # 每300秒更新一次眼睛检测区域
-        if current_time - last_update_time > 600:
-            eyes = eye_cascade.detectMultiScale(gray, 1.3, 5)
-            if len(eyes) > 0:
-                eye_bbox_fixed = max(eyes, key=lambda e: e[2] * e[3])
-                last_update_time = current_time
+        max_contour, roi_area = largest_contour(roi, threshold)
+        if max_contour is None:
+            return None
+        if not (area / self.area_tolerance < roi_area < area * self.area_tolerance):
+            return None
+        # A blob touching the ROI edge is eyelid/lash shadow or a pupil that moved
+        # further than the ROI covers; let the full search decide
+        bx, by, bw, bh = cv2.boundingRect(max_contour)
+        if (bx == 0 and x1 > 0) or (by == 0 and y1 > 0) or \
+                (bx + bw == roi.shape[1] and x2 < w) or (by + bh == roi.shape[0] and y2 < h):
+            return None
 
-        if eye_bbox_fixed is not None:
-            ex, ey, ew, eh = eye_bbox_fixed
+        center = contour_center(max_contour)
+        if center is None:
+            return None
+        return PupilDetection((center[0] + x1, center[1] + y1), roi_area, threshold,
+                              pupil_confidence(max_contour, roi_area))
 
-            crop_w, crop_h = ew, eh
-            center_x = ex + ew // 2
-            center_y = ey + eh // 2
+    def update(self, blurred):
+        detection = None
+        if self.last is not None:
+            detection = self.local_update(blurred)
+            if detection is not None:
+                self.local_updates += 1
 
-            crop_x1 = max(center_x - crop_w // 2, 0)
-            crop_y1 = max(center_y - crop_h // 2, 0)
-            crop_x2 = min(crop_x1 + crop_w, frame.shape[1])
-            crop_y2 = min(crop_y1 + crop_h, frame.shape[0])
+        if detection is None:
+            detection = locate_pupil(blurred, self.initial_threshold, self.engine)
+            self.full_searches += 1
 
-            eye_frame = frame[crop_y1:crop_y2, crop_x1:crop_x2].copy()
+        self.last = detection
+        return detection
 
-            pupil_center = track_pupil(eye_frame)
+def detect_pupil(blurred, initial_threshold=30, engine=None, tracker=None):
+    if tracker is not None:
+        return tracker.update(blurred)
+    return locate_pupil(blurred, initial_threshold, engine)
 
-            if pupil_center is None and estimate_eye_closed(eye_frame):
+def track_pupil(eye_frame, initial_threshold=30, engine=None, tracker=None, blurred=None, annotate=True):
+    # blurred: the crop already through blur_eye; annotate draws the centre on
+    # eye_frame, so it must be off when eye_frame is a view into the camera frame
+    if blurred is None:
+        blurred = blur_eye(to_gray(eye_frame))
+
+    detection = detect_pupil(blurred, initial_threshold, engine, tracker)
+    if detection is None:
+        return None
+
+    if annotate:
+        cv2.circle(eye_frame, detection.center, 3, (255, 0, 0), -1)
+    return detection.center
+
+def crop_box(eye_bbox, frame_shape):
+    # (x1, y1, x2, y2) of the eye box clipped to the frame
+    ex, ey, ew, eh = eye_bbox
+
+    crop_w, crop_h = ew, eh
+    center_x = ex + ew // 2
+    center_y = ey + eh // 2
+
+    crop_x1 = max(center_x - crop_w // 2, 0)
+    crop_y1 = max(center_y - crop_h // 2, 0)
+    crop_x2 = min(crop_x1 + crop_w, frame_shape[1])
+    crop_y2 = min(crop_y1 + crop_h, frame_shape[0])
+    return crop_x1, crop_y1, crop_x2, crop_y2
+
+_highgui = True
+
+def escape_pressed():
+    # Headless OpenCV builds (replays and benchmarks on a server) have no waitKey
+    global _highgui
+    if _highgui:
+        try:
+            return cv2.waitKey(1) & 0xFF == 27
+        except cv2.error:
+            _highgui = False
+    return False
+
+def main(timestamps=False, camera=None, eye_bbox=None, engine=None, tracking_mode=None, pipelined=None):
+    # With timestamps=True each sample is (rel_x, rel_y, frame_time, confidence), frame_time
+    # being time.monotonic() taken when the frame came off the camera and confidence
+    # the PupilDetection's.
+    # camera is anything with capture_array() (the Pi camera by default; replay
+    # sources return None once they run out); a fixed eye_bbox skips the eye detector
+    if PROCESS_PIPELINE if pipelined is None else pipelined:
+        from frame_pipeline import ProcessPipeline
+        yield from ProcessPipeline(camera, eye_bbox, engine, tracking_mode).samples(timestamps)
+        return
+
+    camera = camera or open_camera()
+    eye_box = EyeBoxManager(eye_cascade, eye_bbox, to_gray=to_gray)
+    box_id = eye_box.box_id
+    tracking_mode = tracking_mode or TRACKING_MODE
+    tracker = PupilTracker(engine=engine) if tracking_mode == "temporal" else None
+
+    while True:
+        frame = camera.capture_array()  # 获取 NumPy 格式的当前帧
+        if frame is None:
+            break
+        # A capture thread knows when the frame really came off the camera
+        frame_time = getattr(camera, "frame_time", None) or time.monotonic()
+
+        # 眼睛检测区域只在瞳孔追踪出现漂移时重新检测 (eye_box.py)
+        eye_bbox_current = eye_box.update(frame)
+        if tracker is not None and eye_box.box_id != box_id:
+            tracker.reset()
+        box_id = eye_box.box_id
+
+        if eye_bbox_current is not None:
+            crop_x1, crop_y1, crop_x2, crop_y2 = crop_box(eye_bbox_current, frame.shape)
+
+            # A view into the frame; only a colour crop is converted (into a crop-sized buffer)
+            eye_gray = to_gray(frame[crop_y1:crop_y2, crop_x1:crop_x2])
+            blurred = blur_eye(eye_gray)
+
+            detection = detect_pupil(blurred, engine=engine, tracker=tracker)
+
+            if detection is None and estimate_eye_closed(eye_gray, blurred):
                 print("Eye is likely closed")
                 continue
+            eye_box.report(detection, blurred.shape)
 
-            if pupil_center:
-                pcx, pcy = pupil_center
+            if detection is not None:
+                pcx, pcy = detection.center
                 rel_x = 1 - pcx / (crop_x2 - crop_x1)
                 rel_y = 1 - pcy / (crop_y2 - crop_y1)
-                yield rel_x, rel_y
+                if timestamps:
+                    yield rel_x, rel_y, frame_time, detection.confidence
+                else:
+                    yield rel_x, rel_y
 
-        if cv2.waitKey(1) & 0xFF == 27:
+        if escape_pressed():
             break
 
 if __name__ == '__main__':
@@ -135,5 +328,9 @@ if __name__ == '__main__':
         for rel_x, rel_y in main():
             print(f"Pupil position (relative): x={rel_x:.2f}, y={rel_y:.2f}")
     finally:
-        picam2.stop()
+        if isinstance(camera, LatestFrameCapture):
+            camera.stop()
+            print(f"[INFO] Frames: {camera.stats()}")
+        if picam2 is not None:
+            picam2.stop()
         cv2.destroyAllWindows()
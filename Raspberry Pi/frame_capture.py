@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+class LatestFrameCapture:
+    """
+    Grabs frames from a camera on its own thread so capturing the next frame
+    overlaps with processing the current one. capture_array() always returns the
+    newest frame; a frame replaced before anyone took it is counted in dropped.
+    The camera allocates every array it returns, so the slots (one being
+    captured, one waiting, one being processed) are handed over without copying.
+
+    Wraps anything with capture_array(): the Pi camera, or a ReplayCamera at
+    recorded speed to see how many frames a slow tracker would drop.
+    """
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.cond = threading.Condition()
+        self.frame = None  # Newest frame not yet taken
+        self.frame_time = None  # time.monotonic() when the last returned frame was captured
+        self.pending_time = None
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.ended = False  # The camera returned None (end of a replay) or failed
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="frame_capture", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def _run(self):
+        try:
+            while self.running:
+                frame = self.camera.capture_array()
+                frame_time = time.monotonic()
+                if frame is None:
+                    break
+                with self.cond:
+                    if self.frame is not None:
+                        self.dropped += 1
+                    self.frame = frame
+                    self.pending_time = frame_time
+                    self.captured += 1
+                    self.cond.notify_all()
+        except Exception as e:
+            print(f"[ERROR] Camera capture failed: {e}")
+        finally:
+            with self.cond:
+                self.ended = True
+                self.cond.notify_all()
+
+    def capture_array(self, timeout=None):
+        """Waits for a frame newer than the last one returned; None once the camera has ended"""
+        self.start()
+        with self.cond:
+            self.cond.wait_for(lambda: self.frame is not None or self.ended or not self.running, timeout)
+            frame, self.frame = self.frame, None
+            if frame is None:
+                return None
+            self.frame_time = self.pending_time
+            self.delivered += 1
+            return frame
+
+    def stats(self):
+        return {"captured": self.captured, "delivered": self.delivered, "dropped": self.dropped}
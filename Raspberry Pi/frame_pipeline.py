@@ -0,0 +1,297 @@
+"""
+eyetracking.main() as a chain of processes, one per stage, so the Pi's cores work
+on consecutive frames at the same time:
+
+    capture -> [ring] -> preprocess (eye box, crop, blur) -> [ring] -> detect (pupil) -> queue
+        -> the consuming process (GazePipeline filters, calibrates and classifies)
+
+Frames move through SharedRings: fixed slots in shared memory, so a frame is
+written once by the stage that produces it and read in place by the next one.
+Every stage handles frames in arrival order and each ring has a single
+producer and consumer, so samples come out in capture order.
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import eyetracking
+from eye_box import WINDOW, EyeBoxManager
+from frame_capture import LatestFrameCapture
+
+PIPELINE_DEPTH = 3  # Slots per ring: frames in flight between two stages
+MAX_FRAME_BYTES = 640 * 480 * 3  # Largest frame (or crop) a slot holds
+# Samples waiting for the consumer, and detections waiting for the eye box manager;
+# when full the oldest is dropped, like gaze_pipeline.EventChannel
+OUTPUT_QUEUE_SIZE = 8
+FEEDBACK_QUEUE_SIZE = WINDOW
+STATS_INTERVAL = 30.0  # sec between stage utilization reports; 0 disables them
+STAGES = ("capture", "preprocess", "detect")
+
+# fork: the stages inherit the camera or replay object and the loaded eye cascade.
+# Threads do not survive a fork, so ProcessPipeline stops a capture thread first.
+_context = mp.get_context("fork")
+
+
+def put_latest(q, item):
+    """Puts item on a bounded queue, dropping the oldest items to make room; returns how many"""
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+
+class SharedRing:
+    """
+    depth fixed-size slots in one shared memory block, between one producer and
+    one consumer process. The free semaphore counts empty slots; slot numbers and
+    metadata go through a queue, in order.
+    """
+
+    def __init__(self, depth=PIPELINE_DEPTH, slot_bytes=MAX_FRAME_BYTES):
+        self.depth = depth
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=depth * slot_bytes)
+        self.free = _context.Semaphore(depth)
+        self.filled = _context.Queue()
+        self.next_slot = 0  # Producer side only
+
+    def _view(self, slot, shape):
+        return np.ndarray(shape, np.uint8, self.shm.buf, slot * self.slot_bytes)
+
+    def reserve(self, shape, stop=None):
+        """(slot, writable array of shape) once a slot is free; None if stop is set first"""
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError(f"Frame of shape {shape} does not fit a {self.slot_bytes} byte slot")
+        while not self.free.acquire(timeout=0.1):
+            if stop is not None and stop.is_set():
+                return None
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.depth
+        return slot, self._view(slot, shape)
+
+    def commit(self, slot, shape, meta):
+        self.filled.put((slot, shape, meta))
+
+    def close_stream(self):
+        self.filled.put(None)
+
+    def get(self):
+        """(slot, read-only view, meta), or None at the end of the stream. release(slot) when done."""
+        item = self.filled.get()
+        if item is None:
+            return None
+        slot, shape, meta = item
+        return slot, self._view(slot, shape), meta
+
+    def release(self, slot):
+        self.free.release()
+
+    def destroy(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class StageStats:
+    """Busy seconds, frames and start time of each stage, and samples dropped
+    because the consumer fell behind, in shared memory"""
+
+    def __init__(self):
+        self.values = _context.Array("d", 3 * len(STAGES))
+        self.dropped = _context.Value("i", 0)
+
+    def start(self, stage):
+        self.values[3 * STAGES.index(stage) + 2] = time.monotonic()
+
+    def add(self, stage, busy):
+        i = 3 * STAGES.index(stage)
+        self.values[i] += busy
+        self.values[i + 1] += 1
+
+    def drop(self, count):
+        if count:
+            with self.dropped.get_lock():
+                self.dropped.value += count
+
+    def utilization(self):
+        """{stage: (fraction of time busy, frames handled)}"""
+        now = time.monotonic()
+        result = {}
+        for i, stage in enumerate(STAGES):
+            busy, frames, start = self.values[3 * i:3 * i + 3]
+            result[stage] = (busy / (now - start) if start else 0.0, int(frames))
+        return result
+
+    def report(self):
+        stages = ", ".join(f"{stage} {busy:.0%} ({frames} frames)" for stage, (busy, frames) in self.utilization().items())
+        return f"{stages}, {self.dropped.value} samples dropped"
+
+
+def capture_stage(camera, out_ring, stats, stop):
+    if isinstance(camera, LatestFrameCapture):
+        # Its thread was stopped before the fork: run a fresh one in this process
+        camera = LatestFrameCapture(camera.camera)
+    camera = camera or eyetracking.open_camera()
+    stats.start("capture")
+    seq = 0
+    try:
+        while not stop.is_set():
+            frame = camera.capture_array()
+            start = time.monotonic()
+            if frame is None:
+                break
+            frame_time = getattr(camera, "frame_time", None) or start
+            reserved = out_ring.reserve(frame.shape, stop)
+            if reserved is None:
+                break
+            # Waiting for a free slot is not work: only the copy counts
+            start = time.monotonic()
+            slot, view = reserved
+            np.copyto(view, frame)
+            out_ring.commit(slot, frame.shape, (seq, frame_time))
+            seq += 1
+            stats.add("capture", time.monotonic() - start)
+    finally:
+        out_ring.close_stream()
+
+
+def preprocess_stage(in_ring, out_ring, stats, stop, eye_bbox, feedback):
+    stats.start("preprocess")
+    eye_box = EyeBoxManager(eyetracking.eye_cascade, eye_bbox, to_gray=eyetracking.to_gray)
+    try:
+        while not stop.is_set():
+            item = in_ring.get()
+            if item is None:
+                break
+            start = time.monotonic()
+            slot, frame, (seq, frame_time) = item
+            # Detections come back from the detect stage a few frames late; report()
+            # ignores the ones made with an older box
+            while True:
+                try:
+                    eye_box.report(*feedback.get_nowait())
+                except queue.Empty:
+                    break
+            eye_bbox_current = eye_box.update(frame)
+            box_id = eye_box.box_id  # Changes whenever the eye box does, so detect restarts its tracker
+
+            if eye_bbox_current is not None:
+                x1, y1, x2, y2 = eyetracking.crop_box(eye_bbox_current, frame.shape)
+                eye_gray = eyetracking.to_gray(frame[y1:y2, x1:x2])
+                waiting = time.monotonic()
+                reserved = out_ring.reserve(eye_gray.shape, stop)
+                start += time.monotonic() - waiting
+                if reserved is None:
+                    in_ring.release(slot)
+                    break
+                out_slot, blurred = reserved
+                # Blur straight into the next stage's slot
+                cv2.GaussianBlur(eye_gray, (7, 7), 0, dst=blurred)
+                out_ring.commit(out_slot, eye_gray.shape, (seq, frame_time, box_id))
+            in_ring.release(slot)
+            stats.add("preprocess", time.monotonic() - start)
+    finally:
+        out_ring.close_stream()
+
+
+def detect_stage(in_ring, out_queue, stats, stop, engine, tracking_mode, feedback):
+    stats.start("detect")
+    tracker = eyetracking.PupilTracker(engine=engine) if tracking_mode == "temporal" else None
+    last_box_id = None
+    try:
+        while not stop.is_set():
+            item = in_ring.get()
+            if item is None:
+                break
+            start = time.monotonic()
+            slot, blurred, (seq, frame_time, box_id) = item
+            if tracker is not None and box_id != last_box_id:
+                tracker.reset()
+            last_box_id = box_id
+
+            detection = eyetracking.detect_pupil(blurred, engine=engine, tracker=tracker)
+            if detection is None and eyetracking.estimate_eye_closed(None, blurred):
+                print("Eye is likely closed")
+            else:
+                put_latest(feedback, (detection, blurred.shape, box_id))
+            if detection is not None:
+                pcx, pcy = detection.center
+                crop_h, crop_w = blurred.shape
+                sample = (1 - pcx / crop_w, 1 - pcy / crop_h, frame_time, detection.confidence)
+                stats.drop(put_latest(out_queue, sample))
+            in_ring.release(slot)
+            stats.add("detect", time.monotonic() - start)
+    finally:
+        # Making room for the end of the stream drops a sample too
+        stats.drop(put_latest(out_queue, None))
+
+
+class ProcessPipeline:
+    """
+    Runs the stages above and yields eyetracking.main()'s samples.
+
+    Arguments:
+        camera: Frame source for the capture process (the Pi camera if None)
+        eye_bbox: Fixed eye box; None runs the eye detector like main()
+        depth: Slots per ring buffer
+    """
+
+    def __init__(self, camera=None, eye_bbox=None, engine=None, tracking_mode=None, depth=PIPELINE_DEPTH):
+        self.camera = camera
+        self.eye_bbox = eye_bbox
+        self.engine = engine
+        self.tracking_mode = tracking_mode or eyetracking.TRACKING_MODE
+        self.depth = depth
+        self.stats = StageStats()
+        self.processes = []
+
+    def utilization(self):
+        return self.stats.utilization()
+
+    def samples(self, timestamps=False):
+        if isinstance(self.camera, LatestFrameCapture):
+            self.camera.stop()
+        frames = SharedRing(self.depth)
+        crops = SharedRing(self.depth)
+        output = _context.Queue(OUTPUT_QUEUE_SIZE)
+        feedback = _context.Queue(FEEDBACK_QUEUE_SIZE)  # Pupil detections back to the eye box manager
+        stop = _context.Event()
+        self.processes = [
+            _context.Process(target=capture_stage, args=(self.camera, frames, self.stats, stop),
+                             name="capture", daemon=True),
+            _context.Process(target=preprocess_stage, args=(frames, crops, self.stats, stop, self.eye_bbox, feedback),
+                             name="preprocess", daemon=True),
+            _context.Process(target=detect_stage, args=(crops, output, self.stats, stop, self.engine,
+                                                        self.tracking_mode, feedback), name="detect", daemon=True),
+        ]
+        for process in self.processes:
+            process.start()
+
+        next_report = time.monotonic() + STATS_INTERVAL
+        try:
+            while True:
+                sample = output.get()
+                if sample is None:
+                    break
+                yield sample if timestamps else sample[:2]
+                if STATS_INTERVAL and time.monotonic() > next_report:
+                    print(f"[INFO] Stage utilization: {self.stats.report()}")
+                    next_report += STATS_INTERVAL
+        finally:
+            stop.set()
+            for process in self.processes:
+                process.join(timeout=1.0)
+                if process.is_alive():
+                    process.terminate()
+            frames.destroy()
+            crops.destroy()
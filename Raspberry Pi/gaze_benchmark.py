@@ -0,0 +1,151 @@
+"""
+Runs every pupil tracker variant over the same frames and reports throughput,
+CPU time per frame and how often each variant puts the gaze in the same region
+as the reference (the original sweep search on every frame). Needs no camera:
+
+    python gaze_benchmark.py session.gzs --calibration calibration_data.json
+    python gaze_benchmark.py --synthetic 600
+
+Synthetic frames draw a dark pupil moving inside a fixed eye box, so the truth
+column gives the agreement with where the pupil really was.
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import cv2
+import numpy as np
+
+import eyetracking
+from calibration import Calibration
+from region_layout import classify_point
+from session_recording import ReplayCamera
+
+REFERENCE = "sweep/full"
+VARIANTS = [f"{engine}/{mode}" for engine in ("sweep", "histogram") for mode in ("full", "temporal")]
+SYNTHETIC_BBOX = (240, 180, 160, 120)  # x, y, w, h of the eye in a 640x480 frame
+
+
+def synthetic_frames(count, seed=0, bbox=SYNTHETIC_BBOX, blink_every=90):
+    """(frames, [(rel_x, rel_y) or None]) of a pupil tracing a Lissajous curve, with blinks"""
+    rng = np.random.default_rng(seed)
+    x, y, w, h = bbox
+    frames, truth = [], []
+    for i in range(count):
+        frame = np.full((480, 640, 3), 150, np.uint8)
+        cv2.ellipse(frame, (x + w // 2, y + h // 2), (w // 2 - 4, h // 2 - 6), 0, 0, 360, (225, 225, 225), -1)
+        if blink_every and i % blink_every < 4:
+            cv2.ellipse(frame, (x + w // 2, y + h // 2), (w // 2 - 4, h // 2 - 6), 0, 0, 360, (20, 20, 20), -1)
+            truth.append(None)
+        else:
+            px = w / 2 + 0.35 * w * np.sin(i / 23)
+            py = h / 2 + 0.3 * h * np.sin(i / 37 + 1)
+            cv2.circle(frame, (int(x + px), int(y + py)), 11, (15, 15, 15), -1)
+            truth.append((1 - px / w, 1 - py / h))
+        noise = rng.integers(-6, 7, frame.shape, dtype=np.int16)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames, truth
+
+
+def make_classifier(calibration_path=None):
+    """rel coordinates -> region label, through the saved calibration if given"""
+    if calibration_path is None:
+        return lambda rel_x, rel_y: classify_point(rel_x, rel_y)
+    calibration = Calibration()
+    with open(calibration_path) as f:
+        calibration.corners = json.load(f)
+    return lambda rel_x, rel_y: classify_point(*calibration.transform_coordinates(rel_x, rel_y))
+
+
+def run_eyetracking(camera, eye_bbox, variant):
+    """{frame index: (rel_x, rel_y)} of every frame eyetracking.main found a pupil in"""
+    engine, mode = variant.split("/")
+    samples = {}
+    # main() prints on every closed-eye frame
+    with contextlib.redirect_stdout(io.StringIO()):
+        for rel_x, rel_y in eyetracking.main(camera=camera, eye_bbox=eye_bbox, engine=engine, tracking_mode=mode):
+            samples[camera.index] = (rel_x, rel_y)
+    return samples
+
+
+def run_gaze_tracking(camera, eye_bbox, variant):
+    from gaze_tracking import GazeTracking
+
+    gaze = GazeTracking()
+    samples = {}
+    while True:
+        ok, frame = camera.read()
+        if not ok:
+            break
+        gaze.refresh(frame)
+        if gaze.pupils_located:
+            samples[camera.index] = (gaze.horizontal_ratio(), gaze.vertical_ratio())
+    return samples
+
+
+def benchmark(camera, eye_bbox, variants, classify, truth=None):
+    rows = []
+    regions = {}
+    for variant in variants:
+        runner = run_gaze_tracking if variant == "gaze_tracking" else run_eyetracking
+        camera.rewind()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            samples = runner(camera, eye_bbox, variant)
+        except (ImportError, RuntimeError) as e:
+            # dlib or its landmark model missing
+            print(f"[ERROR] Skipping {variant}: {e}")
+            continue
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        frames = camera.index + 1
+        regions[variant] = [classify(*samples[i]) if i in samples else None for i in range(frames)]
+        rows.append((variant, frames, len(samples), frames / wall, cpu / frames * 1000))
+
+    if truth is not None:
+        regions["truth"] = [None if sample is None else classify(*sample) for sample in truth]
+
+    def agreement(variant, other):
+        if other not in regions:
+            return float("nan")
+        pairs = list(zip(regions[variant], regions[other]))
+        return 100 * sum(a == b for a, b in pairs) / len(pairs) if pairs else float("nan")
+
+    print(f"{'variant':<20}{'frames':>8}{'found':>8}{'fps':>10}{'cpu ms':>9}{'vs ref %':>10}{'vs truth %':>12}")
+    for variant, frames, found, fps, cpu_ms in rows:
+        print(f"{variant:<20}{frames:>8}{found:>8}{fps:>10.1f}{cpu_ms:>9.2f}"
+              f"{agreement(variant, REFERENCE):>10.1f}{agreement(variant, 'truth'):>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pupil tracker variants on recorded or synthetic frames")
+    parser.add_argument("recording", nargs="?", help="Session file from session_recording.py")
+    parser.add_argument("--synthetic", type=int, metavar="FRAMES", help="Use generated frames instead")
+    parser.add_argument("--variants", default=",".join(VARIANTS),
+                        help="Comma-separated engine/mode pairs (default: all); add gaze_tracking to also run "
+                             "GazeTracking (needs dlib and eye-tracking/real on PYTHONPATH)")
+    parser.add_argument("--calibration", help="Calibration JSON used to classify regions (default: none)")
+    parser.add_argument("--eye-bbox", type=int, nargs=4, metavar=("X", "Y", "W", "H"),
+                        help="Fixed eye box (default: the recording's crop, else the Haar detector)")
+    args = parser.parse_args()
+    if not args.recording and not args.synthetic:
+        parser.error("Give a recording or --synthetic FRAMES")
+
+    variants = args.variants.split(",")
+    if REFERENCE not in variants:
+        variants.insert(0, REFERENCE)
+    truth = None
+    if args.synthetic:
+        frames, truth = synthetic_frames(args.synthetic)
+        camera = ReplayCamera(frames, speed=0)
+        eye_bbox = args.eye_bbox or SYNTHETIC_BBOX
+    else:
+        # Decoded up front so decompression is not counted against the trackers
+        camera = ReplayCamera(args.recording, speed=0, preload=True)
+        eye_bbox = args.eye_bbox or camera.eye_bbox
+    benchmark(camera, eye_bbox, variants, make_classifier(args.calibration), truth)
+
+
+if __name__ == "__main__":
+    main()
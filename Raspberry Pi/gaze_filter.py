@@ -0,0 +1,153 @@
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PassThroughFilter:
+    def __call__(self, x, y, t=None):
+        return x, y
+
+    def reset(self):
+        pass
+
+
+class MedianFilter:
+    """Median of the last `window` samples (replaces the old eye_buffer)."""
+
+    def __init__(self, window=5):
+        self.buffer = deque(maxlen=window)
+
+    def __call__(self, x, y, t=None):
+        self.buffer.append((x, y))
+        if len(self.buffer) == 1:
+            return x, y
+        mx, my = np.median(np.array(self.buffer), axis=0)
+        return float(mx), float(my)
+
+    def reset(self):
+        self.buffer.clear()
+
+
+class _LowPass:
+    def __init__(self):
+        self.value = None
+
+    def __call__(self, value, alpha):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = alpha * value + (1 - alpha) * self.value
+        return self.value
+
+
+class OneEuroFilter:
+    """One-Euro filter (Casiez et al. 2012): heavy smoothing while the gaze
+    rests on a target, little lag during saccades."""
+
+    def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def _filter_axis(self, value, dt, axis):
+        prev = self.x_filters[axis].value
+        dvalue = 0.0 if prev is None else (value - prev) / dt
+        edvalue = self.dx_filters[axis](dvalue, self._alpha(self.d_cutoff, dt))
+        cutoff = self.min_cutoff + self.beta * abs(edvalue)
+        return self.x_filters[axis](value, self._alpha(cutoff, dt))
+
+    def __call__(self, x, y, t=None):
+        t = time.monotonic() if t is None else t
+        dt = t - self.last_time if self.last_time is not None else 0.0
+        self.last_time = t
+        if dt <= 0:
+            dt = 1.0 / 30
+        return self._filter_axis(x, dt, 0), self._filter_axis(y, dt, 1)
+
+    def reset(self):
+        self.x_filters = (_LowPass(), _LowPass())
+        self.dx_filters = (_LowPass(), _LowPass())
+        self.last_time = None
+
+
+class KalmanFilter:
+    """Constant-velocity Kalman filter, run independently on x and y.
+
+    Arguments:
+        process_noise: Variance of the (white) acceleration driving the gaze
+        measurement_noise: Variance of a single pupil measurement
+    """
+
+    def __init__(self, process_noise=20.0, measurement_noise=4e-4):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.reset()
+
+    def _filter_axis(self, z, dt, axis):
+        pos, vel = self.state[axis]
+        p00, p01, p10, p11 = self.cov[axis]
+
+        # Predict
+        pos += vel * dt
+        dt2 = dt * dt
+        p00 += dt * (p10 + p01) + dt2 * p11 + self.q * dt2 * dt2 / 4
+        p01 += dt * p11 + self.q * dt2 * dt / 2
+        p10 += dt * p11 + self.q * dt2 * dt / 2
+        p11 += self.q * dt2
+
+        # Update with the position measurement
+        s = p00 + self.r
+        k0, k1 = p00 / s, p10 / s
+        residual = z - pos
+        pos += k0 * residual
+        vel += k1 * residual
+        self.cov[axis] = ((1 - k0) * p00, (1 - k0) * p01, p10 - k1 * p00, p11 - k1 * p01)
+        self.state[axis] = (pos, vel)
+        return pos
+
+    def __call__(self, x, y, t=None):
+        t = time.monotonic() if t is None else t
+        if self.last_time is None:
+            self.last_time = t
+            self.state = [(x, 0.0), (y, 0.0)]
+            return x, y
+
+        dt = t - self.last_time
+        self.last_time = t
+        if dt <= 0:
+            dt = 1.0 / 30
+        return self._filter_axis(x, dt, 0), self._filter_axis(y, dt, 1)
+
+    def reset(self):
+        self.state = [(0.0, 0.0), (0.0, 0.0)]
+        self.cov = [(self.r, 0.0, 0.0, 1.0), (self.r, 0.0, 0.0, 1.0)]
+        self.last_time = None
+
+
+GAZE_FILTERS = {
+    "none": PassThroughFilter,
+    "median": MedianFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def make_gaze_filter(mode="one_euro", **kwargs):
+    if mode not in GAZE_FILTERS:
+        raise ValueError(f"Unknown gaze filter: {mode}")
+    return GAZE_FILTERS[mode](**kwargs)
+
+
+def smooth_gaze(stream, gaze_filter):
+    """Wraps a (rel_x, rel_y) generator such as eyetracking.main() and yields
+    filtered samples, timestamped on arrival."""
+    for rel_x, rel_y in stream:
+        yield gaze_filter(rel_x, rel_y, time.monotonic())
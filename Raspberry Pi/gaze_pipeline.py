@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from eyetracking import main as gaze_stream
+from calibration import CALIBRATION_FILE, GAZE_FILTER, Calibration, classify_point
+from gaze_filter import make_gaze_filter
+from latency_trace import start_trace
+
+# Region events per second handed to consumers; None passes every tracked frame, at
+# whatever rate the camera delivers. Consumers tuned for a fixed rate pass their own:
+# send_regions_to_glass uses glass_link.region_rate() (bounded for the Glass app's
+# line-counting dwell), LedWatcher keeps its own 2 Hz limiter.
+OUTPUT_RATE_HZ = None
+# Events buffered between the camera thread and a slow consumer, and what to do
+# when the buffer is full: "drop_oldest" keeps the freshest gaze, "block" stalls
+# the camera loop (frames are then dropped by the camera instead)
+QUEUE_SIZE = 8
+BACKPRESSURE = "drop_oldest"
+
+# kind is "calibration" while a calibration target is shown (region is its label,
+# x/y are None) and "region" for every classified gaze sample; timestamp is the
+# time.monotonic() capture time of the frame the event came from; confidence (0-1)
+# is how round the pupil blob was (eyetracking.pupil_confidence; 1.0 for
+# calibration events), carried to the display by the binary wire protocol; trace holds the
+# latency_trace stamps of the stages the sample went through (stays on the Pi)
+RegionEvent = namedtuple("RegionEvent", ["kind", "region", "x", "y", "timestamp", "confidence", "trace"],
+                         defaults=(1.0, None))
+
+
+class RateLimiter:
+    """Decimates events to at most rate_hz using their own timestamps, so the
+    output rate follows the camera clock rather than wall-clock sleeps."""
+
+    def __init__(self, rate_hz=OUTPUT_RATE_HZ):
+        self.interval = 1.0 / rate_hz if rate_hz else 0.0
+        self.next_time = None
+        self.skipped = 0
+
+    def allow(self, timestamp):
+        if self.next_time is not None and timestamp < self.next_time:
+            self.skipped += 1
+            return False
+        # Schedule from the ideal grid so jitter in frame times does not lower the rate
+        if self.next_time is None or timestamp - self.next_time > self.interval:
+            self.next_time = timestamp
+        self.next_time += self.interval
+        return True
+
+
+class EventChannel:
+    """Bounded FIFO between the pipeline thread and one consumer."""
+
+    def __init__(self, maxsize=QUEUE_SIZE, policy=BACKPRESSURE):
+        if policy not in ("drop_oldest", "block"):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.events = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def _drop_oldest(self):
+        # Calibration events drive what the display shows, so only drop gaze samples
+        for i, event in enumerate(self.events):
+            if event.kind == "region":
+                del self.events[i]
+                break
+        else:
+            self.events.popleft()
+        self.dropped += 1
+
+    def put(self, event):
+        with self.cond:
+            if self.policy == "block":
+                while len(self.events) >= self.maxsize and not self.closed:
+                    self.cond.wait()
+            elif len(self.events) >= self.maxsize:
+                self._drop_oldest()
+            if self.closed:
+                return False
+            self.events.append(event)
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.events or self.closed, timeout):
+                return None
+            if not self.events:
+                return None
+            event = self.events.popleft()
+            self.cond.notify_all()
+            return event
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+
+class GazePipeline:
+    """Camera -> pupil -> smoothing -> calibration -> classification in one
+    process. Consumers either iterate events() or subscribe() a callback."""
+
+    def __init__(self, gaze_filter=GAZE_FILTER, recalibrate=True, output_rate=OUTPUT_RATE_HZ, camera=None):
+        # camera: frame source for eyetracking.main, the Pi camera by default
+        self.camera = camera
+        self.gaze_filter = make_gaze_filter(gaze_filter)
+        self.recalibrate = recalibrate
+        self.rate_limiter = RateLimiter(output_rate)
+        self.calibration = None
+        self.subscribers = []
+        self.thread = None
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def emit(self, event):
+        for callback in list(self.subscribers):
+            callback(event)
+        return event
+
+    def calibration_events(self, stream):
+        if self.recalibrate and os.path.exists(CALIBRATION_FILE):
+            os.remove(CALIBRATION_FILE)
+
+        self.calibration = Calibration()
+        if len(self.calibration.corners) != 5:
+            samples = (sample[:2] for sample in stream)
+            for label in self.calibration.calibration_steps(samples):
+                yield self.emit(RegionEvent("calibration", label, None, None, time.monotonic()))
+        self.gaze_filter.reset()
+
+    def events(self):
+        stream = gaze_stream(timestamps=True, camera=self.camera)
+        yield from self.calibration_events(stream)
+
+        for rel_x, rel_y, frame_time, confidence in stream:
+            trace = start_trace("capture", frame_time)
+            if trace:
+                trace.stamp("pupil")
+            # Filter every frame so smoothing sees the full sample rate
+            rel_x, rel_y = self.gaze_filter(rel_x, rel_y, frame_time)
+            if not self.rate_limiter.allow(frame_time):
+                continue
+            if trace:
+                trace.stamp("filter")
+            cal_x, cal_y = self.calibration.transform_coordinates(rel_x, rel_y)
+            if trace:
+                trace.stamp("transform")
+            region = classify_point(cal_x, cal_y)
+            if trace:
+                trace.stamp("classify")
+            yield self.emit(RegionEvent("region", region, cal_x, cal_y, frame_time, confidence, trace))
+
+    def run(self):
+        for _ in self.events():
+            pass
+
+    def start(self, channel=None):
+        """Runs the pipeline on a background thread feeding a bounded channel."""
+        channel = channel or EventChannel()
+
+        def produce():
+            try:
+                for event in self.events():
+                    if not channel.put(event):
+                        break
+            finally:
+                channel.close()
+
+        self.thread = threading.Thread(target=produce, daemon=True)
+        self.thread.start()
+        return channel
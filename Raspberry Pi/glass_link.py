@@ -0,0 +1,253 @@
+import socket
+import threading
+import time
+from collections import deque
+
+import latency_trace
+from wire_protocol import KEEPALIVE_LABEL, ProtocolError, encode_frame, encode_text
+
+HOST = '172.20.10.3'  # Google Glass 的 IP
+PORT = 5051
+QUEUE_SIZE = 32  # Region events buffered while the link is slow or down; the oldest are dropped
+BACKOFF_MIN = 0.25  # sec, first reconnect delay, doubled after every failed attempt
+BACKOFF_MAX = 8.0
+# sec a write may stall (peer not reading, half-open connection) before the link is
+# treated as broken and reconnected
+SEND_TIMEOUT = 2.0
+# "text" (one label per line, what the Glass app reads) or "binary" (wire_protocol
+# frames with coordinates, timestamps and sequence numbers; Python receivers only)
+PROTOCOL = "text"
+BATCH_SIZE = 1  # Max events written per send; >1 packs a backlog into one frame
+# A keepalive line / empty frame (wire_protocol.KEEPALIVE_LABEL) is sent after this
+# many seconds without traffic, so the display does not close the connection as idle
+# and a dead link shows up before an emergency has to go through it
+KEEPALIVE = 5.0
+# How region samples travel: "tcp" through the shared GlassLink, or "udp" as one
+# binary frame per datagram (Python display only). Commands always use TCP.
+REGION_TRANSPORT = "tcp"
+UDP_PORT = 5051
+# Region samples per second sent as text lines. The Glass app selects a region after
+# SELECTION_THRESHOLD = 4 lines for it (kt_UI/UI.kt) however fast they arrive, so at
+# 30 fps a glance would select in about 0.13 s; at 4 Hz a selection takes a 1 s dwell.
+# Binary receivers (the Python display) dwell on sample time and get every frame.
+TEXT_REGION_RATE_HZ = 4.0
+
+
+class GlassLink:
+    """
+    One long-lived TCP connection to the Glass shared by every sender in the process.
+    Events (RegionEvents or bare labels) go through two lanes: the priority lane
+    (emergencies) is always sent before anything waiting in the bounded region
+    lane, and is never dropped.
+    """
+
+    def __init__(self, host=HOST, port=PORT, queue_size=QUEUE_SIZE, connect_timeout=2.0,
+                 protocol=PROTOCOL, batch_size=BATCH_SIZE, send_timeout=SEND_TIMEOUT):
+        if protocol not in ("text", "binary"):
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.protocol = protocol
+        self.batch_size = max(1, batch_size)
+        self.seq = 0
+        self.priority = deque()
+        self.regular = deque(maxlen=queue_size)
+        self.cond = threading.Condition()
+        self.sock = None
+        self.in_flight = False
+        self.closed = False
+        self.dropped = 0
+        self.reconnects = 0
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="glass_link", daemon=True)
+            self.thread.start()
+        return self
+
+    def send(self, event, priority=False):
+        """Queues a RegionEvent or a bare label such as "Emergency"; never blocks on the network"""
+        with self.cond:
+            if priority:
+                self.priority.append(event)
+            else:
+                if len(self.regular) == self.regular.maxlen:
+                    self.dropped += 1
+                self.regular.append(event)
+            self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every queued line has been written to the socket"""
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: not (self.priority or self.regular or self.in_flight), timeout)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _connect(self):
+        backoff = BACKOFF_MIN
+        while not self.closed:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+                sock.settimeout(self.send_timeout)
+                # Lines are tiny and latency-sensitive: do not let Nagle hold them back
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                print(f"[INFO] Connected to Glass at {self.host}:{self.port}")
+                return sock
+            except OSError as e:
+                print(f"[ERROR] Could not connect to Google Glass: {e} (retry in {backoff:.2f} s)")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, BACKOFF_MAX)
+        return None
+
+    def _next_batch(self):
+        # [(lane, event)], priority lane first; empty (a keepalive) if KEEPALIVE passed
+        # without events, None once the link is closed
+        with self.cond:
+            self.cond.wait_for(lambda: self.priority or self.regular or self.closed, KEEPALIVE)
+            if self.closed:
+                return None
+            batch = []
+            for lane in (self.priority, self.regular):
+                while lane and len(batch) < self.batch_size:
+                    batch.append((lane, lane.popleft()))
+            self.in_flight = bool(batch)
+            return batch
+
+    def _encode(self, events):
+        if self.protocol == "text":
+            return encode_text(events or [KEEPALIVE_LABEL])
+        frame = encode_frame(events, self.seq)
+        self.seq += len(events)
+        return frame
+
+    @staticmethod
+    def _trace_sent(batch):
+        # The stamps end on the Pi: the display starts its own trace from the capture time
+        now = time.monotonic()
+        for _, event in batch:
+            trace = getattr(event, "trace", None)
+            if trace:
+                latency_trace.recorder.record(trace.stamp("send", now))
+
+    def _done(self):
+        with self.cond:
+            self.in_flight = False
+            self.cond.notify_all()
+
+    def _run(self):
+        while not self.closed:
+            if self.sock is None:
+                self.sock = self._connect()
+                if self.sock is None:
+                    break
+
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                payload = self._encode([event for _, event in batch])
+            except ValueError as e:
+                print(f"[ERROR] Dropping unencodable events: {e}")
+                self._done()
+                continue
+            try:
+                self.sock.sendall(payload)
+                self._trace_sent(batch)
+            except OSError as e:
+                # socket.timeout included: a stalled peer is handled like a dropped one
+                print(f"[ERROR] Failed to send: {e!r}")
+                with self.cond:
+                    # Put them back at the head of their lanes and resend after reconnecting
+                    for lane, event in reversed(batch):
+                        if lane is self.regular and len(lane) == lane.maxlen:
+                            self.dropped += 1
+                        else:
+                            lane.appendleft(event)
+                self.sock.close()
+                self.sock = None
+                self.reconnects += 1
+                time.sleep(BACKOFF_MIN)
+            finally:
+                self._done()
+
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+_shared_link = None
+_shared_lock = threading.Lock()
+
+
+def get_link():
+    """The process-wide link, connected on first use"""
+    global _shared_link
+    with _shared_lock:
+        if _shared_link is None:
+            _shared_link = GlassLink().start()
+        return _shared_link
+
+
+class UdpRegionSender:
+    """
+    Region samples as one binary frame per datagram. A lost or late sample is
+    simply superseded by the next one (the display drops out-of-order ones by
+    sequence number), so a bad stretch of WiFi never blocks the caller or forces
+    a reconnect. Commands and calibration targets must arrive, so they go to the
+    reliable TCP link instead.
+    """
+
+    def __init__(self, host=HOST, port=UDP_PORT, command_link=None):
+        self.address = (host, port)
+        self.command_link = command_link
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.seq = 0
+        self.dropped = 0
+
+    def send(self, event, priority=False):
+        if priority or isinstance(event, str) or event.kind != "region":
+            (self.command_link or get_link()).send(event, priority)
+            return
+        try:
+            self.sock.sendto(encode_frame([event], self.seq), self.address)
+            if event.trace:
+                latency_trace.recorder.record(event.trace.stamp("send"))
+        except (OSError, ProtocolError) as e:
+            # Full socket buffer or no route: this sample is lost, the next one replaces it
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                print(f"[ERROR] Dropped region datagram ({self.dropped} so far): {e}")
+        self.seq += 1
+
+    def close(self):
+        self.sock.close()
+
+
+_region_sender = None
+
+
+def region_rate():
+    """GazePipeline output rate for what get_region_link() sends to (None: every frame)"""
+    if REGION_TRANSPORT == "tcp" and PROTOCOL == "text":
+        return TEXT_REGION_RATE_HZ
+    return None
+
+
+def get_region_link():
+    """Where region samples go, according to REGION_TRANSPORT"""
+    global _region_sender
+    if REGION_TRANSPORT == "tcp":
+        return get_link()
+    with _shared_lock:
+        if _region_sender is None:
+            _region_sender = UdpRegionSender()
+        return _region_sender
+
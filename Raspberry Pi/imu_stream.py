@@ -0,0 +1,168 @@
+import math
+import time
+from collections import deque, namedtuple
+
+SAMPLE_RATE_HZ = 50.0
+CUTOFF_HZ = 4.0  # Low-pass cutoff on the accelerometer vector; head tilts are far slower
+BUFFER_SIZE = 256  # Recent samples kept in the ring buffer (~5 s at 50 Hz)
+
+# index counts samples since the stream started; roll is the head roll in degrees
+# relative to upright (negative = left tilt), computed from the filtered vector
+ImuSample = namedtuple("ImuSample", ["index", "timestamp", "ax", "ay", "az", "roll"])
+# kind is "hold" or "double_tilt", side is "left" or "right"; latency_samples is
+# the number of samples between the start of the tilt and the event
+GestureEvent = namedtuple("GestureEvent", ["kind", "side", "index", "timestamp", "latency_samples"])
+
+
+class LowPassFilter:
+    """First-order low-pass on the (ax, ay, az) vector. The MC6470 has no
+    gyroscope to fuse with, so this stands in for a complementary filter."""
+
+    def __init__(self, cutoff_hz=CUTOFF_HZ):
+        self.rc = 1.0 / (2 * math.pi * cutoff_hz)
+        self.value = None
+
+    def __call__(self, vector, dt):
+        if self.value is None:
+            self.value = vector
+        else:
+            alpha = dt / (self.rc + dt)
+            self.value = tuple(v + alpha * (new - v) for v, new in zip(self.value, vector))
+        return self.value
+
+    def reset(self):
+        self.value = None
+
+
+class TiltGestureRecognizer:
+    """
+    Turns a stream of roll samples into tilt gestures.
+
+    Arguments:
+        rate_hz: Sample rate, used to turn the millisecond settings into sample counts
+        tilt_angle: Roll (degrees) past which the head counts as tilted
+        release_angle: Roll below which a tilt ends (hysteresis against jitter at tilt_angle)
+        max_angle: Rolls beyond this are ignored (headset off or upside down)
+        debounce_ms: How long a tilt or release must last before it is accepted
+        hold_ms: Tilt duration that makes a "hold"
+        double_window_ms: Max time from the end of a short tilt to the start of a
+            second one on the same side for a "double_tilt"
+    """
+
+    def __init__(self, rate_hz=SAMPLE_RATE_HZ, tilt_angle=45.0, release_angle=35.0, max_angle=90.0,
+                 debounce_ms=60, hold_ms=600, double_window_ms=800):
+        def samples(ms):
+            return max(1, round(ms * rate_hz / 1000))
+
+        self.tilt_angle = tilt_angle
+        self.release_angle = release_angle
+        self.max_angle = max_angle
+        self.debounce = samples(debounce_ms)
+        self.hold = samples(hold_ms)
+        self.double_window = samples(double_window_ms)
+        self.reset()
+
+    def reset(self):
+        self.side = None  # Accepted tilt side, None while upright
+        self.tilt_start = None  # Index of the first sample of the current tilt
+        self.hold_fired = False
+        self.candidate = None  # Side the raw samples are moving to
+        self.candidate_start = None
+        self.candidate_count = 0
+        self.last_release = None  # (side, index) of the last tilt that ended without a gesture
+
+    def _raw_side(self, roll):
+        for side, sign in (("left", -1), ("right", 1)):
+            threshold = self.release_angle if self.side == side else self.tilt_angle
+            if threshold < sign * roll < self.max_angle:
+                return side
+        return None
+
+    def _transition(self, side, sample):
+        event = None
+        if self.side is not None:
+            self.last_release = None if self.hold_fired else (self.side, sample.index)
+        if side is not None:
+            if (self.last_release is not None and self.last_release[0] == side
+                    and self.candidate_start - self.last_release[1] <= self.double_window):
+                event = GestureEvent("double_tilt", side, sample.index, sample.timestamp,
+                                     sample.index - self.candidate_start)
+                self.last_release = None
+            self.tilt_start = self.candidate_start
+        self.side = side
+        self.hold_fired = event is not None  # A double tilt is not also a hold
+        return event
+
+    def update(self, sample):
+        """Feeds one ImuSample; returns a GestureEvent or None"""
+        raw = self._raw_side(sample.roll)
+        event = None
+
+        if raw == self.side:
+            self.candidate = None
+        else:
+            if raw != self.candidate:
+                self.candidate = raw
+                self.candidate_start = sample.index
+                self.candidate_count = 0
+            self.candidate_count += 1
+            if self.candidate_count >= self.debounce:
+                event = self._transition(raw, sample)
+                self.candidate = None
+
+        if self.side is not None and not self.hold_fired and sample.index - self.tilt_start + 1 >= self.hold:
+            event = GestureEvent("hold", self.side, sample.index, sample.timestamp,
+                                 sample.index - self.tilt_start)
+            self.hold_fired = True
+        return event
+
+
+class ImuStream:
+    """Samples the accelerometer at a fixed rate into a ring buffer and
+    recognizes tilt gestures on the filtered roll."""
+
+    def __init__(self, accel, rate_hz=SAMPLE_RATE_HZ, cutoff_hz=CUTOFF_HZ, buffer_size=BUFFER_SIZE, **gesture_options):
+        self.accel = accel
+        self.rate_hz = rate_hz
+        self.interval = 1.0 / rate_hz
+        self.low_pass = LowPassFilter(cutoff_hz)
+        self.recognizer = TiltGestureRecognizer(rate_hz, **gesture_options)
+        self.buffer = deque(maxlen=buffer_size)
+        self.overruns = 0  # Samples that started late because a read took too long
+
+    def read(self, index, timestamp, dt):
+        ax, ay, az = self.low_pass(tuple(self.accel.get_data()), dt)
+        roll = math.degrees(math.atan2(ax, az)) - 90
+        sample = ImuSample(index, timestamp, ax, ay, az, roll)
+        self.buffer.append(sample)
+        return sample
+
+    def samples(self):
+        index = 0
+        next_time = time.monotonic()
+        last_time = None
+        while True:
+            now = time.monotonic()
+            if now < next_time:
+                time.sleep(next_time - now)
+                now = time.monotonic()
+            elif now - next_time > self.interval:
+                # Fell behind (slow I2C read): restart the schedule instead of bursting
+                self.overruns += 1
+                next_time = now
+            next_time += self.interval
+
+            dt = self.interval if last_time is None else now - last_time
+            last_time = now
+            yield self.read(index, now, dt)
+            index += 1
+
+    def events(self):
+        """Yields (sample, gesture) for every sample; gesture is None most of the time"""
+        for sample in self.samples():
+            yield sample, self.recognizer.update(sample)
+
+    def gestures(self):
+        for _sample, gesture in self.events():
+            if gesture is not None:
+                yield gesture
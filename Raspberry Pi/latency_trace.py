@@ -0,0 +1,193 @@
+"""
+Per-stage latency tracing from camera frame to canvas update. Keep the copies in
+"Raspberry Pi/" and "eye-tracking/real/" identical
+(tests/test_mirrored_modules.py checks it).
+
+A Trace collects time.monotonic() stamps as an event moves through the stages
+and travels with the event; when the event reaches the end of the process,
+record() adds the time spent in each stage (since the previous stamp) and the
+total to log-bucket histograms. Each process dumps its histograms to JSON; the
+CLI prints the percentiles:
+
+    python latency_trace.py latency_pi.json latency_display.json
+
+The clocks of the two machines are not synchronized, so display-side traces of
+binary samples start from the capture time mapped with wire_protocol.ClockOffset.
+Its offset is the smallest (arrival - sent) delay seen, which holds the Pi's
+fastest processing as well as the network time, and the mapped time is late by
+both. These traces start at MAPPED_ORIGIN: their first stage, "receive over min",
+is how much longer than the fastest sample this one took to arrive, and their
+"total from mapped capture" is not end-to-end. The true capture-to-send time is
+the Pi dump's "total"; the network time itself is not measured.
+Text lines carry no sender time (the Glass app reads bare labels), so their
+traces start at "receive" and their total is reported as "total from receive":
+receive to display only, without the Pi or the network.
+"""
+import argparse
+import atexit
+import json
+import math
+import threading
+import time
+
+ENABLED = True
+BUCKETS_PER_DECADE = 20  # ~12% wide buckets
+MIN_LATENCY = 1e-6  # sec, lower edge of the first bucket; anything below lands in it
+DECADES = 8  # 1 us .. 100 s
+ORIGIN = "capture"  # Traces starting here measure the whole way; others get a partial total
+MAPPED_ORIGIN = "mapped capture"  # Display-side start of binary samples, see above
+MAPPED_RECEIVE = "receive over min"
+
+
+class Trace:
+    """Stamps of one event: [(stage, monotonic time)], the first one being where it started"""
+    __slots__ = ("stamps",)
+
+    def __init__(self, stage, timestamp=None):
+        self.stamps = [(stage, time.monotonic() if timestamp is None else timestamp)]
+
+    def stamp(self, stage, timestamp=None):
+        self.stamps.append((stage, time.monotonic() if timestamp is None else timestamp))
+        return self
+
+    def durations(self):
+        """[(stage, seconds since the previous stamp)] followed by ("total", seconds), or by
+        ("total from <first stage>", seconds) if the trace did not start at ORIGIN"""
+        result = [(stage, t - prev_t) for (_, prev_t), (stage, t) in zip(self.stamps, self.stamps[1:])]
+        first_stage, first_t = self.stamps[0]
+        total = "total" if first_stage == ORIGIN else f"total from {first_stage}"
+        result.append((total, self.stamps[-1][1] - first_t))
+        return result
+
+
+class LatencyHistogram:
+    """Counts of latencies in logarithmic buckets; percentiles are accurate to a bucket width."""
+
+    def __init__(self):
+        self.counts = [0] * (BUCKETS_PER_DECADE * DECADES + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket(seconds):
+        if seconds <= MIN_LATENCY:
+            return 0
+        index = int(math.log10(seconds / MIN_LATENCY) * BUCKETS_PER_DECADE) + 1
+        return min(index, BUCKETS_PER_DECADE * DECADES)
+
+    @staticmethod
+    def upper_edge(index):
+        return MIN_LATENCY * 10 ** (index / BUCKETS_PER_DECADE)
+
+    def add(self, seconds):
+        self.counts[self.bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile (p in 0-100), capped at the max seen"""
+        if not self.count:
+            return math.nan
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= max(rank, 1):
+                return min(self.upper_edge(index), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {"counts": self.counts, "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class LatencyRecorder:
+    """Histograms per stage, in the order the stages were first seen."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record(self, trace):
+        if not ENABLED or trace is None:
+            return
+        with self.lock:
+            for stage, seconds in trace.durations():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = LatencyHistogram()
+                histogram.add(seconds)
+
+    def dump(self, path):
+        with self.lock:
+            data = {stage: histogram.to_dict() for stage, histogram in self.histograms.items()}
+        with open(path, "w") as f:
+            json.dump({"buckets_per_decade": BUCKETS_PER_DECADE, "min_latency": MIN_LATENCY,
+                       "stages": data}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data["buckets_per_decade"] != BUCKETS_PER_DECADE or data["min_latency"] != MIN_LATENCY:
+            raise ValueError(f"{path} was written with a different bucket layout")
+        recorder = cls()
+        recorder.histograms = {stage: LatencyHistogram.from_dict(histogram)
+                               for stage, histogram in data["stages"].items()}
+        return recorder
+
+    def report(self):
+        lines = [f"{'stage':<26}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for stage, h in self.histograms.items():
+            mean = h.total / h.count if h.count else math.nan
+            lines.append(f"{stage:<26}{h.count:>8}{mean * 1000:>10.2f}{h.percentile(50) * 1000:>10.2f}"
+                         f"{h.percentile(95) * 1000:>10.2f}{h.percentile(99) * 1000:>10.2f}{h.max * 1000:>10.2f}")
+        return "\n".join(lines)
+
+
+# The process-wide recorder every stage reports to
+recorder = LatencyRecorder()
+
+
+def start_trace(stage, timestamp=None):
+    """A new Trace, or None while tracing is disabled (stamping then costs nothing)"""
+    return Trace(stage, timestamp) if ENABLED else None
+
+
+_dump_paths = set()
+
+
+def dump_at_exit(path):
+    """Writes the process-wide histograms to path when the interpreter exits (once per path)"""
+    if ENABLED and path not in _dump_paths:
+        _dump_paths.add(path)
+        atexit.register(recorder.dump, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print per-stage latency percentiles from trace dumps")
+    parser.add_argument("dumps", nargs="+", help="JSON files written by LatencyRecorder.dump")
+    args = parser.parse_args()
+    for path in args.dumps:
+        print(f"== {path}")
+        print(LatencyRecorder.load(path).report())
+
+
+if __name__ == "__main__":
+    main()
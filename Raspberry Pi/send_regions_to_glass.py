@@ -1,29 +1,32 @@
-import socket
-import time
-from watchereye_tracking import gaze_region_generator
+from glass_link import get_region_link, region_rate
+from gaze_pipeline import GazePipeline
+from latency_trace import dump_at_exit
+from watchereye_tracking import LedWatcher, region_event_generator
 # from watcherIMU import status
 
+LATENCY_FILE = "latency_pi.json"  # Per-stage latencies up to the socket, see latency_trace.py
+
 def send_regions_to_glass():
     print('[DEBUG] Entered send_regions_to_glass')
-    HOST = '172.20.10.3'  # Google Glass 的 IP
-    PORT = 5051
-    while True:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((HOST, PORT))
-                print(f"[INFO] Connected to Glass at {HOST}:{PORT}")
+    dump_at_exit(LATENCY_FILE)
+
+    # One pipeline for the whole session: reconnecting to the Glass must not
+    # restart the camera or repeat the calibration. It runs on its own thread and
+    # paces itself from frame timestamps; the bounded channel absorbs slow sends.
+    # Text lines go out at a bounded rate: the Glass app counts them to select.
+    pipeline = GazePipeline(output_rate=region_rate())
+    pipeline.subscribe(LedWatcher().on_event)
+    channel = pipeline.start()
+    events = region_event_generator(channel)
 
-                for region in gaze_region_generator():
-                    print(f"[SEND] Sending region: {region}")
-                    try:
-                        s.sendall((region + '\n').encode())  # 添加换行符以便分割
-                    except Exception as e:
-                        print(f"[ERROR] Failed to send: {e}")
-                        break  # 重连
-                    time.sleep(0.5)
-        except Exception as e:
-            print(f"[ERROR] Could not connect to Google Glass: {e}")
-            time.sleep(2)  # 等待后重试
+    # Over TCP the link shares its socket with Emergency.py's sender and reconnects
+    # by itself, regions queue in its bounded lane behind any emergency; over UDP
+    # each region is a datagram and only calibration targets use that socket
+    link = get_region_link()
+    for event in events:
+        region = event.region
+        print(f"[SEND] Sending region: {region}")
+        link.send(event)
 
 if __name__ == '__main__':
     # 可按需接入 IMU 状态判断
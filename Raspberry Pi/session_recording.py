@@ -0,0 +1,414 @@
+"""
+Records camera frames (whole, or just the eye crop), IMU samples and region
+events to one compact file, and plays them back through the same interfaces the
+live code uses, so the pipeline can be profiled without the headset:
+
+    python session_recording.py record session.gzs --seconds 60 --crop --imu
+    python session_recording.py info session.gzs
+    python session_recording.py replay session.gzs --host 127.0.0.1 --speed 0   # regions to the UI receiver
+
+File layout: a JSON header line, then records of
+    kind (u8) | seconds since the recording started (f64) | payload length (u32) | payload
+Frames are zlib-compressed one by one, every KEYFRAME_INTERVAL-th whole and the
+others as the byte-wise difference to the previous frame (mostly zeros for a
+still eye, so they compress several times better).
+"""
+import argparse
+import json
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = "gaze-session"
+VERSION = 1
+RECORD = struct.Struct("!BdI")
+# flags | frame h, w, channels | crop offset x, y in the full frame | full frame h, w
+FRAME = struct.Struct("!BHHBHHHH")
+IMU = struct.Struct("!fff")
+
+KIND_FRAME = 1
+KIND_IMU = 2
+KIND_EVENT = 3  # A region / calibration label as sent to the display
+FLAG_KEYFRAME = 1
+
+KEYFRAME_INTERVAL = 30
+ZLIB_LEVEL = 1  # Fast enough to record at camera rate on the Pi
+
+# data is the decoded frame (numpy array), the (ax, ay, az) tuple or the label
+SessionRecord = namedtuple("SessionRecord", ["kind", "timestamp", "data", "crop"])
+# Where a cropped frame sits in the camera frame: x, y, full height, full width
+CropInfo = namedtuple("CropInfo", ["x", "y", "full_h", "full_w"])
+
+
+class SessionRecorder:
+    """
+    Appends records to a session file; safe to call from the camera and IMU threads at once.
+
+    Arguments:
+        path: File to create
+        crop: Optional (x, y, w, h) box; frames are stored as that crop only
+        keyframe_interval: Every n-th frame is stored whole, the others as deltas
+    """
+
+    def __init__(self, path, crop=None, keyframe_interval=KEYFRAME_INTERVAL, level=ZLIB_LEVEL):
+        self.file = open(path, "wb")
+        self.crop = None if crop is None else tuple(int(v) for v in crop)
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.start = time.monotonic()
+        self.previous = None
+        self.frames = 0
+        self.lock = threading.Lock()
+        header = {"format": MAGIC, "version": VERSION, "created": time.time(), "crop": self.crop}
+        self.file.write(json.dumps(header).encode() + b"\n")
+
+    def _write(self, kind, timestamp, payload):
+        timestamp = (time.monotonic() if timestamp is None else timestamp) - self.start
+        with self.lock:
+            self.file.write(RECORD.pack(kind, timestamp, len(payload)))
+            self.file.write(payload)
+
+    def add_frame(self, frame, timestamp=None):
+        full_h, full_w = frame.shape[:2]
+        x = y = 0
+        if self.crop is not None:
+            x, y, w, h = self.crop
+            frame = frame[y:y + h, x:x + w]
+        frame = np.ascontiguousarray(frame)
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+
+        keyframe = (self.previous is None or self.previous.shape != frame.shape
+                    or self.frames % self.keyframe_interval == 0)
+        # uint8 subtraction wraps around, and the replay adds it back the same way
+        data = frame if keyframe else np.subtract(frame, self.previous, dtype=np.uint8)
+        self.previous = frame.copy()
+        self.frames += 1
+        header = FRAME.pack(FLAG_KEYFRAME if keyframe else 0, frame.shape[0], frame.shape[1], channels,
+                            x, y, full_h, full_w)
+        self._write(KIND_FRAME, timestamp, header + zlib.compress(data.tobytes(), self.level))
+
+    def add_imu(self, ax, ay, az, timestamp=None):
+        self._write(KIND_IMU, timestamp, IMU.pack(ax, ay, az))
+
+    def add_event(self, label, timestamp=None):
+        self._write(KIND_EVENT, timestamp, str(label).encode())
+
+    def on_event(self, event):
+        """GazePipeline subscriber: records the label of every RegionEvent"""
+        self.add_event(event.region, event.timestamp)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_session(path):
+    """Returns (header, iterator of SessionRecords) with the frames decoded"""
+    f = open(path, "rb")
+    header = json.loads(f.readline())
+    if header.get("format") != MAGIC or header.get("version") != VERSION:
+        f.close()
+        raise ValueError(f"{path} is not a version {VERSION} session recording")
+
+    def records():
+        previous = None
+        with f:
+            while True:
+                head = f.read(RECORD.size)
+                if len(head) < RECORD.size:
+                    return  # End of file, or a recording cut short mid-record
+                kind, timestamp, length = RECORD.unpack(head)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return
+                if kind == KIND_FRAME:
+                    flags, h, w, channels, x, y, full_h, full_w = FRAME.unpack_from(payload)
+                    shape = (h, w, channels) if channels > 1 else (h, w)
+                    frame = np.frombuffer(zlib.decompress(payload[FRAME.size:]), np.uint8).reshape(shape)
+                    if not flags & FLAG_KEYFRAME:
+                        frame = np.add(previous, frame, dtype=np.uint8)
+                    previous = frame
+                    yield SessionRecord(kind, timestamp, frame, CropInfo(x, y, full_h, full_w))
+                elif kind == KIND_IMU:
+                    yield SessionRecord(kind, timestamp, IMU.unpack(payload), None)
+                elif kind == KIND_EVENT:
+                    yield SessionRecord(kind, timestamp, payload.decode(), None)
+                # Unknown kinds come from newer recorders and are skipped
+
+    return header, records()
+
+
+class RecordingCamera:
+    """Wraps a camera (anything with capture_array) and records every frame it returns."""
+
+    def __init__(self, camera, recorder):
+        self.camera = camera
+        self.recorder = recorder
+
+    def capture_array(self):
+        frame = self.camera.capture_array()
+        if frame is not None:
+            self.recorder.add_frame(frame)
+        return frame
+
+
+class RecordingAccelerometer:
+    """Wraps an mc6470 Accelerometer and records every reading."""
+
+    def __init__(self, accel, recorder):
+        self.accel = accel
+        self.recorder = recorder
+
+    def get_data(self):
+        data = self.accel.get_data()
+        self.recorder.add_imu(*data[:3])
+        return data
+
+
+class _Pacer:
+    # Sleeps so records come out at their recorded times divided by speed; speed
+    # None or 0 replays as fast as possible
+    def __init__(self, speed):
+        self.speed = speed
+        self.start = None
+
+    def wait(self, timestamp):
+        if not self.speed:
+            return
+        now = time.monotonic()
+        if self.start is None:
+            self.start = now - timestamp / self.speed
+        delay = self.start + timestamp / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ReplayCamera:
+    """
+    Stands in for Picamera2 (capture_array) and cv2.VideoCapture (read), so a
+    recording can feed eyetracking.main(camera=...) or GazeTracking.refresh.
+
+    Arguments:
+        source: Session file path, or a list of frames (e.g. synthetic ones)
+        speed: 1.0 replays at the recorded pace, 0 / None as fast as possible
+        preload: Decode every frame up front, so decoding is not timed with the tracker
+        loop: Start over at the end instead of returning None
+    """
+
+    def __init__(self, source, speed=1.0, preload=False, loop=False, interval=1 / 30):
+        self.speed = speed
+        self.loop = loop
+        self.eye_bbox = None
+        self.frames = None
+        records = None
+        if isinstance(source, str):
+            self.path = source
+            header, records = read_session(source)
+            self.eye_bbox = header.get("crop")
+            if preload:
+                self.frames = [record for record in records if record.kind == KIND_FRAME]
+        else:
+            self.path = None
+            self.frames = [SessionRecord(KIND_FRAME, i * interval, frame, None) for i, frame in enumerate(source)]
+        self.rewind(None if self.frames is not None else records)
+
+    def rewind(self, records=None):
+        """Starts over from the first frame"""
+        if records is None:
+            records = iter(self.frames) if self.frames is not None else read_session(self.path)[1]
+        self._records = (record for record in records if record.kind == KIND_FRAME)
+        self.pacer = _Pacer(self.speed)
+        self.index = -1  # Index of the frame last returned
+        self.timestamp = None  # Its recorded time (seconds since the start)
+
+    def _full_frame(self, record):
+        # Crop recordings come back at full size (black outside the crop) so the
+        # crop coordinates match eye_bbox
+        crop = record.crop
+        frame = record.data
+        if crop is None or (crop.full_h, crop.full_w) == frame.shape[:2]:
+            return frame
+        full = np.zeros((crop.full_h, crop.full_w) + frame.shape[2:], np.uint8)
+        full[crop.y:crop.y + frame.shape[0], crop.x:crop.x + frame.shape[1]] = frame
+        return full
+
+    def capture_array(self):
+        record = next(self._records, None)
+        if record is None and self.loop and self.index >= 0:
+            self.rewind()
+            record = next(self._records, None)
+        if record is None:
+            return None
+        self.pacer.wait(record.timestamp)
+        self.index += 1
+        self.timestamp = record.timestamp
+        return self._full_frame(record)
+
+    def read(self):
+        frame = self.capture_array()
+        return frame is not None, frame
+
+    # Picamera2 / VideoCapture API the live code calls
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def release(self):
+        pass
+
+
+class ReplayAccelerometer:
+    """Stands in for mc6470.Accelerometer: get_data() returns the recorded readings in order.
+    ImuStream paces the reads itself, so the recorded timestamps are not used."""
+
+    def __init__(self, path, loop=False):
+        _, records = read_session(path)
+        self.samples = [list(record.data) for record in records if record.kind == KIND_IMU]
+        if not self.samples:
+            raise ValueError(f"{path} has no IMU samples")
+        self.loop = loop
+        self.index = 0
+
+    def get_data(self):
+        if self.index >= len(self.samples):
+            if not self.loop:
+                raise EOFError("End of the recorded IMU samples")
+            self.index = 0
+        sample = self.samples[self.index]
+        self.index += 1
+        return sample
+
+
+def replay_events(path, link, speed=1.0):
+    """Sends the recorded region / calibration labels through link (e.g. a
+    glass_link.GlassLink pointed at the UI receiver) at the recorded pace"""
+    _, records = read_session(path)
+    pacer = _Pacer(speed)
+    sent = 0
+    for record in records:
+        if record.kind == KIND_EVENT:
+            pacer.wait(record.timestamp)
+            link.send(record.data)
+            sent += 1
+    return sent
+
+
+### ---------- CLI ----------
+
+def record(args):
+    import eyetracking
+
+    camera = eyetracking.open_camera()
+    crop = None
+    if args.crop:
+        print("[INFO] Looking for the eye...")
+        while crop is None:
+            gray = eyetracking.to_gray(camera.capture_array())
+            eyes = eyetracking.eye_cascade.detectMultiScale(gray, 1.3, 5)
+            if len(eyes) > 0:
+                crop = max(eyes, key=lambda e: e[2] * e[3])
+        print(f"[INFO] Recording the eye crop {tuple(crop)}")
+
+    with SessionRecorder(args.path, crop=crop) as recorder:
+        stop = threading.Event()
+        if args.imu:
+            from mc6470 import Accelerometer
+            from imu_stream import ImuStream
+
+            def sample_imu():
+                stream = ImuStream(RecordingAccelerometer(Accelerometer(), recorder))
+                for _ in stream.samples():
+                    if stop.is_set():
+                        break
+
+            threading.Thread(target=sample_imu, daemon=True).start()
+
+        source = RecordingCamera(camera, recorder)
+        end = time.monotonic() + args.seconds
+        try:
+            if args.pipeline:
+                # Also record the regions the live pipeline sends, for replays to the display
+                from gaze_pipeline import GazePipeline
+                pipeline = GazePipeline(recalibrate=False, camera=source)
+                pipeline.subscribe(recorder.on_event)
+                for _ in pipeline.events():
+                    if time.monotonic() > end:
+                        break
+            else:
+                while time.monotonic() < end:
+                    source.capture_array()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+        print(f"[INFO] Recorded {recorder.frames} frames to {args.path}")
+
+
+def info(args):
+    header, records = read_session(args.path)
+    counts = {KIND_FRAME: 0, KIND_IMU: 0, KIND_EVENT: 0}
+    last = 0.0
+    shape = None
+    for rec in records:
+        counts[rec.kind] = counts.get(rec.kind, 0) + 1
+        last = rec.timestamp
+        if rec.kind == KIND_FRAME:
+            shape = rec.data.shape
+    print(f"{args.path}: {last:.1f} s, crop {header.get('crop')}, frame {shape}")
+    print(f"{counts[KIND_FRAME]} frames ({counts[KIND_FRAME] / last if last else 0:.1f} fps), "
+          f"{counts[KIND_IMU]} IMU samples, {counts[KIND_EVENT]} events")
+
+
+def replay(args):
+    from glass_link import GlassLink
+
+    link = GlassLink(args.host, args.port, protocol=args.protocol).start()
+    sent = replay_events(args.path, link, args.speed)
+    link.flush(timeout=10)
+    link.close()
+    print(f"[INFO] Replayed {sent} events to {args.host}:{args.port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay gaze sessions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_record = commands.add_parser("record", help="Record from the Pi camera (and IMU)")
+    parser_record.add_argument("path")
+    parser_record.add_argument("--seconds", type=float, default=60)
+    parser_record.add_argument("--crop", action="store_true", help="Store only the detected eye region")
+    parser_record.add_argument("--imu", action="store_true", help="Also record the accelerometer")
+    parser_record.add_argument("--pipeline", action="store_true",
+                               help="Run the gaze pipeline (saved calibration) and record its regions")
+    parser_record.set_defaults(run=record)
+
+    parser_info = commands.add_parser("info", help="Summarize a recording")
+    parser_info.add_argument("path")
+    parser_info.set_defaults(run=info)
+
+    parser_replay = commands.add_parser("replay", help="Send the recorded regions to a display")
+    parser_replay.add_argument("path")
+    parser_replay.add_argument("--host", default="127.0.0.1")
+    parser_replay.add_argument("--port", type=int, default=5051)
+    parser_replay.add_argument("--protocol", choices=["text", "binary"], default="text")
+    parser_replay.add_argument("--speed", type=float, default=1.0, help="0 replays as fast as possible")
+    parser_replay.set_defaults(run=replay)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
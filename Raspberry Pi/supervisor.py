@@ -0,0 +1,64 @@
+import threading
+
+
+class TriggeredTask:
+    """A worker thread parked on an Event: trigger() only sets the event, so the
+    caller never waits for the work. Triggers that arrive while the work is
+    running are folded into one more run."""
+
+    def __init__(self, name, work):
+        self.name = name
+        self.work = work
+        self.wake = threading.Event()
+        self.busy = False
+        self.runs = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def trigger(self):
+        self.wake.set()
+
+    def _run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            self.busy = True
+            try:
+                self.work()
+            except Exception as e:
+                print(f"[ERROR] {self.name} failed: {e}")
+            finally:
+                self.busy = False
+                self.runs += 1
+
+
+class Supervisor:
+    """Owns the background tasks of the headset in memory, replacing the
+    process-table scan and the python3 subprocess per tilt."""
+
+    def __init__(self):
+        self.tasks = {}  # name -> threading.Thread for long-running tasks
+        self.triggers = {}  # name -> TriggeredTask
+
+    def is_running(self, name):
+        thread = self.tasks.get(name)
+        return thread is not None and thread.is_alive()
+
+    def start(self, name, target, *args):
+        """Starts target on a thread unless the task is already running.
+        Returns True if it was started."""
+        if self.is_running(name):
+            return False
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self.tasks[name] = thread
+        thread.start()
+        print(f"[INFO] Started {name}")
+        return True
+
+    def add_trigger(self, name, work):
+        """Creates a warm worker for work that trigger(name) wakes up."""
+        self.triggers[name] = TriggeredTask(name, work)
+        return self.triggers[name]
+
+    def trigger(self, name):
+        self.triggers[name].trigger()
@@ -1,72 +1,70 @@
-import subprocess
-import time
 import collections
 import RPi.GPIO as GPIO
+import region_layout
+from calibration import corner_labels
+from gaze_pipeline import GazePipeline, RateLimiter
 
 # ─── GPIO ─────────────────────────────────────────────────────────────────────
 LED_PIN = 21
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(LED_PIN, GPIO.OUT, initial=GPIO.LOW)  
 
-def gaze_region_generator():
-    p = subprocess.Popen(
-        ['python3', '-u', '/home/wearableaac/calibration.py'],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        bufsize=1,
-        universal_newlines=True
-    )
+# Every region the classifier can return plus the calibration target labels
+REGION_LABELS = set(region_layout.REGION_LABELS) | set(corner_labels)
 
-    print("[INFO] start monitoring outputlines:")
+def region_event_generator(events=None):
+    # events: any RegionEvent iterable, e.g. GazePipeline.events() or an EventChannel
+    if events is None:
+        events = GazePipeline().events()
+    for event in events:
+        if event.region in REGION_LABELS:
+            yield event
 
-    for output_line in p.stdout:
-        output_line = output_line.strip()
-        print(f"output:{output_line}")
+def gaze_region_generator(events=None):
+    for event in region_event_generator(events):
+        yield event.region
 
-        if output_line in {"1", "2", "3", "4", "5", "6", "7", "8",
-                           "9", "10", "12", "13", "14", "15", "16",
-                           "17", "18", "19", "20", "21", "22", "23",
-                           "24", "25", "center", "top_mid", "left_mid"
-                            , "bottom_mid", "right_mid"}:
-            yield output_line
-#            time.sleep(0.5)  # control frequency
-if __name__ == "__main__":
-    # (timestamp, value)
-    WINDOW = collections.deque()
+class LedWatcher:
+    # LED on once a ring code 1-21 is seen 4 times within WINDOW_SPAN, off on 24 x4
     WINDOW_SPAN = 4.0  # sec
+    SAMPLE_RATE_HZ = 2.0  # the rate the 4-hit rule was tuned for
 
-    try:
-        for line in proc.stdout:
-            now = time.time()
-            val = line.strip()
-            if not val:
-                continue
+    def __init__(self):
+        # (timestamp, value)
+        self.window = collections.deque()
+        self.rate_limiter = RateLimiter(self.SAMPLE_RATE_HZ)
+
+    def on_event(self, event):
+        if event.kind != "region" or not self.rate_limiter.allow(event.timestamp):
+            return
+        now = event.timestamp
+        val = event.region
+
+        self.window.append((now, val))
+        while self.window and self.window[0][0] < now - self.WINDOW_SPAN:
+            self.window.popleft()
 
-            WINDOW.append((now, val))
-            while WINDOW and WINDOW[0][0] < now - WINDOW_SPAN:
-                WINDOW.popleft()
+        counts = {}
+        for _t, v in self.window:
+            counts[v] = counts.get(v, 0) + 1
 
-            counts = {}
-            for _t, v in WINDOW:
-                counts[v] = counts.get(v, 0) + 1
+        if counts.get("24", 0) >= 4:
+            GPIO.output(LED_PIN, GPIO.LOW)
+            print("[LED] OFF — code 24 x4 within 4 s")
+            return
 
-            if counts.get("24", 0) >= 4:
-                GPIO.output(LED_PIN, GPIO.LOW)
-                print("[LED] OFF — code 24 x4 within 4 s")
-                continue
+        for k in counts:
+            if k.isdigit() and 1 <= int(k) <= 21 and counts[k] >= 4:
+                GPIO.output(LED_PIN, GPIO.HIGH)
+                print(f"[LED] ON  — code {k} x4 within 4 s")
+                break
 
-            for k in counts:
-                if k.isdigit() and 1 <= int(k) <= 21 and counts[k] >= 4:
-                    GPIO.output(LED_PIN, GPIO.HIGH)
-                    print(f"[LED] ON  — code {k} x4 within 4 s")
-                    break
+if __name__ == "__main__":
+    pipeline = GazePipeline()
+    pipeline.subscribe(LedWatcher().on_event)
 
+    try:
+        pipeline.run()
     finally:
         GPIO.output(LED_PIN, GPIO.LOW)
         GPIO.cleanup()
-        if proc.poll() is None:
-            proc.terminate()
-
-    for region in gaze_region_generator():
-        continue
-
@@ -1,5 +1,5 @@
 import cv2
-from collections import deque
+from collections import deque, namedtuple
 import numpy as np
 import math
 import time
@@ -37,19 +37,14 @@ def estimate_eye_closed(eye_frame):
 
     return darkness_ratio > 0.7  # Adjust this threshold as needed
 
-def track_pupil(eye_frame, initial_threshold=30):
-    gray = cv2.cvtColor(eye_frame, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-
-    h, w = eye_frame.shape[:2]
-    frame_area = w * h
+# "histogram" picks the threshold from one cumulative histogram and runs
+# findContours once; "sweep" is the original walk outward from the initial threshold
+PUPIL_ENGINE = "histogram"
 
-    best_pupil = None
-    best_thresh = initial_threshold
-    step = 5
-    max_attempts = 10
+PupilDetection = namedtuple("PupilDetection", ["center", "area", "threshold"])
 
-    # Build a threshold list that includes both increasing and decreasing values
+def pupil_threshold_candidates(initial_threshold=30, step=5, max_attempts=10):
+    """Threshold list that includes both increasing and decreasing values."""
     thresholds = []
     for i in range(max_attempts):
         up = initial_threshold + step * i
@@ -58,38 +53,73 @@ def track_pupil(eye_frame, initial_threshold=30):
             thresholds.append(up)
         if down >= 0 and down != up:  # Avoid duplicate threshold
             thresholds.append(down)
+    return thresholds
+
+def contour_center(contour):
+    M = cv2.moments(contour)
+    if M["m00"] != 0:
+        return int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
+    # Fallback to circle fitting if moments failed
+    (x, y), radius = cv2.minEnclosingCircle(contour)
+    if radius > 1:  # Avoid tiny noise
+        return int(x), int(y)
+    return None
+
+def largest_contour(blurred, threshold):
+    _, thresh_img = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(thresh_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, 0.0
+    max_contour = max(contours, key=cv2.contourArea)
+    return max_contour, cv2.contourArea(max_contour)
+
+def first_pupil(blurred, thresholds):
+    # First threshold whose largest dark blob passes the size gate
+    frame_area = blurred.shape[0] * blurred.shape[1]
 
     for threshold in thresholds:
-        _, thresh_img = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY_INV)
-        contours, _ = cv2.findContours(thresh_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if contours:
-            max_contour = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(max_contour)
-
-            if frame_area * 0.01 < area < frame_area * 0.5:
-                M = cv2.moments(max_contour)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"])
-                    cy = int(M["m01"] / M["m00"])
-                    best_pupil = (cx, cy)
-                    best_thresh = threshold
-                    break
-                else:
-                    # Fallback to circle fitting if moments failed
-                    (x, y), radius = cv2.minEnclosingCircle(max_contour)
-                    if radius > 1:  # Avoid tiny noise
-                        best_pupil = (int(x), int(y))
-                        best_thresh = threshold
-                        break
-
-    if best_pupil:
-        cv2.circle(eye_frame, best_pupil, 3, (255, 0, 0), -1)
-
-    # cv2.imshow('gray', thresh_img)
-
-    return best_pupil
+        max_contour, area = largest_contour(blurred, threshold)
+
+        if max_contour is not None and frame_area * 0.01 < area < frame_area * 0.5:
+            center = contour_center(max_contour)
+            if center is not None:
+                return PupilDetection(center, area, threshold)
+    return None
+
+def likely_pupil_thresholds(blurred, thresholds, min_ratio=0.01, max_ratio=0.5):
+    # THRESH_BINARY_INV keeps pixels <= threshold, so the cumulative histogram gives
+    # the dark area of every candidate threshold at once
+    dark_area = np.cumsum(np.bincount(blurred.ravel(), minlength=256))
+    ratios = dark_area[thresholds] / blurred.size
+    return [t for t, ratio in zip(thresholds, ratios) if min_ratio < ratio < max_ratio]
+
+def locate_pupil_histogram(blurred, initial_threshold=30):
+    # Only the first likely threshold is tried: a frame whose blob there fails the
+    # size gate is dropped rather than paying for the sweep
+    likely = likely_pupil_thresholds(blurred, pupil_threshold_candidates(initial_threshold))
+    return first_pupil(blurred, likely[:1])
+
+def locate_pupil_sweep(blurred, initial_threshold=30):
+    return first_pupil(blurred, pupil_threshold_candidates(initial_threshold))
+
+def locate_pupil(blurred, initial_threshold=30, engine=None):
+    engine = engine or PUPIL_ENGINE
+    if engine == "histogram":
+        return locate_pupil_histogram(blurred, initial_threshold)
+    if engine == "sweep":
+        return locate_pupil_sweep(blurred, initial_threshold)
+    raise ValueError(f"Unknown pupil engine: {engine}")
+
+def track_pupil(eye_frame, initial_threshold=30, engine=None):
+    gray = cv2.cvtColor(eye_frame, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
+
+    detection = locate_pupil(blurred, initial_threshold, engine)
+    if detection is None:
+        return None
 
+    cv2.circle(eye_frame, detection.center, 3, (255, 0, 0), -1)
+    return detection.center
 
 
 def median_smooth_position(eye_buffer):
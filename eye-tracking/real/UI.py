@@ -1,13 +1,17 @@
 import tkinter as tk
+import asyncio
 import time
 import threading
 from typing import List, Dict, Tuple, Any
-import pygame
-from gtts import gTTS
-import os
 import math
 import re
 import socket
+from collections import deque
+from dwell import DwellEngine
+from speech import SpeechEngine
+import latency_trace
+import region_layout
+import wire_protocol
 
 ### ---------- RegionReceiver ----------
 class RegionReceiver:
@@ -15,6 +19,7 @@ class RegionReceiver:
         self.HOST = '0.0.0.0'
         self.PORT = 5051
         self.callback = callback
+        self.verbose = True  # Print every received region
 
     def start(self):
         threading.Thread(target=self._server_thread, daemon=True).start()
@@ -30,25 +35,152 @@ class RegionReceiver:
                 threading.Thread(target=self.handle_client, args=(conn,), daemon=True).start()
 
     def handle_client(self, conn):
+        # Text lines or binary frames (wire_protocol), detected from the first bytes
+        decoder = wire_protocol.StreamDecoder()
+        clock = wire_protocol.ClockOffset()
         with conn:
-            buffer = ''
             while True:
                 try:
-                    data = conn.recv(1024)
+                    data = conn.recv(4096)
                     if not data:
                         print("[INFO] Client disconnected")
                         break
-                    buffer += data.decode()
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        msg = line.strip()
-                        print(f"[INFO] Received region: {msg}")
-                        if self.callback:
-                            self.callback(msg)
+                    for event in decoder.feed(data):
+                        self.dispatch(event, clock)
                 except Exception as e:
                     print(f"[ERROR] Error while receiving: {e}")
                     break
 
+    def dispatch(self, event, clock):
+        if self.verbose:
+            print(f"[INFO] Received region: {event.label}")
+        # Sender timestamps are moved onto this machine's monotonic clock
+        timestamp = None if event.timestamp is None else clock.to_local(event.timestamp)
+        if self.callback:
+            self.callback(event.label, timestamp)
+
+
+class AsyncRegionReceiver(RegionReceiver):
+    """
+    Same protocol as RegionReceiver, but every connection is a coroutine on one
+    asyncio loop (one thread in total) instead of an OS thread per connection.
+    Connections silent for IDLE_TIMEOUT seconds are closed; senders keep theirs
+    alive with keepalive lines / empty frames (see glass_link.KEEPALIVE).
+    With udp, binary frames are also accepted as datagrams on the same port number.
+    """
+    IDLE_TIMEOUT = 15.0
+    UDP_MAX_AGE = 0.5  # sec, datagram samples delayed more than this are dropped
+
+    def __init__(self, callback=None, udp=True):
+        super().__init__(callback)
+        self.udp = udp
+        self.loop = None
+        self.server = None
+        self.connections = 0  # Currently open
+        self.closed_idle = 0
+        self.udp_filters = {}  # sender address -> wire_protocol.SequenceFilter
+
+    def start(self):
+        threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True).start()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle_client, self.HOST, self.PORT, reuse_address=True)
+        print(f"[INFO] Listening on {self.HOST}:{self.PORT} (asyncio)")
+        if self.udp:
+            await self.loop.create_datagram_endpoint(lambda: RegionDatagramProtocol(self),
+                                                     local_addr=(self.HOST, self.PORT))
+            print(f"[INFO] Listening on {self.HOST}:{self.PORT}/udp")
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _read(self, coroutine):
+        return await asyncio.wait_for(coroutine, self.IDLE_TIMEOUT)
+
+    async def _handle_client(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        print(f"[INFO] Connection from {addr}")
+        self.connections += 1
+        clock = wire_protocol.ClockOffset()
+        try:
+            first = await self._sniff(reader)
+            if first.startswith(wire_protocol.MAGIC):
+                await self._read_frames(reader, first, clock)
+            else:
+                await self._read_lines(reader, first, clock)
+            print("[INFO] Client disconnected")
+        except asyncio.IncompleteReadError:
+            print("[INFO] Client disconnected")
+        except asyncio.TimeoutError:
+            self.closed_idle += 1
+            print(f"[INFO] Closing idle connection from {addr}")
+        except Exception as e:
+            print(f"[ERROR] Error while receiving: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _sniff(self, reader):
+        # Takes whatever has arrived until it shows whether the client sends frames or
+        # lines, so a bare keepalive or a short first line is decoded at once
+        data = b""
+        while len(data) < len(wire_protocol.MAGIC) and wire_protocol.MAGIC.startswith(data):
+            chunk = await self._read(reader.read(65536))
+            if not chunk:
+                raise asyncio.IncompleteReadError(data, None)
+            data += chunk
+        return data
+
+    async def _read_lines(self, reader, first, clock):
+        decoder = wire_protocol.LineDecoder()
+        data = first
+        while True:
+            for event in decoder.feed(data):
+                self.dispatch(event, clock)
+            data = await self._read(reader.readline())
+            if not data:
+                return
+
+    async def _read_frames(self, reader, first, clock):
+        # Frames carry their own length, so take whatever has arrived and let the decoder split it
+        decoder = wire_protocol.FrameDecoder()
+        data = first
+        while data:
+            for event in decoder.feed(data):
+                self.dispatch(event, clock)
+            data = await self._read(reader.read(65536))
+
+class RegionDatagramProtocol(asyncio.DatagramProtocol):
+    """Region samples over UDP: one binary frame per datagram. Each sender
+    (address) gets its own sequence filter, so a restarted sender on a new
+    port starts fresh."""
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        seq_filter = self.receiver.udp_filters.get(addr)
+        if seq_filter is None:
+            seq_filter = wire_protocol.SequenceFilter(self.receiver.UDP_MAX_AGE)
+            self.receiver.udp_filters[addr] = seq_filter
+        try:
+            events = wire_protocol.FrameDecoder().feed(data)
+        except wire_protocol.ProtocolError as e:
+            print(f"[ERROR] Bad datagram from {addr}: {e}")
+            return
+        for event in events:
+            timestamp = seq_filter.accept(event)
+            if timestamp is None:
+                continue
+            if self.receiver.verbose:
+                print(f"[INFO] Received region: {event.label}")
+            if self.receiver.callback:
+                self.receiver.callback(event.label, timestamp)
+
 
 ### ---------- AAC_GUI ----------
 
@@ -65,14 +197,31 @@ class AAC_GUI():
     - 25: Center circle (space/decimal point)
     """
 
-    RIGHT: list[str] = ['a', 'e', 'i', 'o', 'u']
-    TOP: list[str] = ["s", "t", "n", "r", "d", "l", "h"]
-    LEFT: list[str] = ["c", "w", "m", "g", "y", "p", "f"]
-    BOTTOM: list[str] = ["j", "b", "q", "k", "v", "z", "x"]
+    # Panel contents and arc angles come from region_layout, shared with the gaze classifier
+    RIGHT: list[str] = region_layout.PANELS["RIGHT"]["targets"]
+    TOP: list[str] = region_layout.PANELS["TOP"]["targets"]
+    LEFT: list[str] = region_layout.PANELS["LEFT"]["targets"]
+    BOTTOM: list[str] = region_layout.PANELS["BOTTOM"]["targets"]
 
     # Configuration for selection mechanism
+    # "time": a target is selected after DWELL_MS of fixation, measured from event timestamps
+    # "count": a target is selected after SELECTION_THRESHOLD identical commands
+    DWELL_MODE = "time"
+    DWELL_MS = 1000  # Fixation time needed to confirm a selection in "time" mode
+    DWELL_DECAY_MS = 300  # Half-life of the highlight of targets no longer looked at
+    ADAPTIVE_DWELL = True  # Shorten DWELL_MS while selections are not being deleted
     SELECTION_THRESHOLD = 4  # Number of identical commands needed to confirm selection
     MAX_DISPLAY_CHARS = 7  # Maximum characters to display in center circle
+    # Build the canvas items once per panel and only re-color them on counter changes
+    RETAINED_SCENE = True
+    INPUT_TICK_MS = 20  # How often the Tk main loop drains commands queued by the receiver threads
+    # "asyncio": all sender connections on one event loop thread; "threads": one thread per connection
+    RECEIVER_MODE = "asyncio"
+    # Text-to-speech backends in order of preference; the first one installed is used
+    # ("espeak" and "pyttsx3" work offline, "gtts" needs network access)
+    TTS_BACKENDS = ("espeak", "pyttsx3", "gtts")
+    TTS_PREWARM = ("Yes", "No")  # Phrases synthesized into the cache at startup
+    LATENCY_FILE = "latency_display.json"  # Per-stage latencies up to the repaint, see latency_trace.py
 
     # Base color #3388ff with different opacity levels
     COLORS: Dict[str, str] = {
@@ -107,63 +256,24 @@ class AAC_GUI():
         self.state = 'MAIN'  # Current panel shown on the screen
         self.current_text = ''
         self.volume = 100  # from 0 to 100
+        self.dwell = DwellEngine(dwell_ms=self.DWELL_MS, decay_half_life_ms=self.DWELL_DECAY_MS,
+                                 adaptive=self.ADAPTIVE_DWELL)
+        self.pending_selection = False  # Last typed character not yet confirmed or deleted
+        try:
+            self.speech = SpeechEngine(backends=self.TTS_BACKENDS, prewarm=self.TTS_PREWARM)
+        except RuntimeError as e:
+            self.speech = None
+            print(f"Warning: {e}. Text-to-speech is disabled.")
 
-        # NEW: Sector-to-function mapping based on current state
+        # Sector-to-function mapping based on current state, derived from the drawn arcs:
+        # "MAIN" and "NUM" map each target to its sectors, each letter maps 0 to its sectors
         self.sector_mappings = {
-            # MAIN Interface - sectors map to main sections
-            "MAIN": {
-                "TOP": [3, 4, 5, 6, 7],  # h l d r n t s
-                "LEFT": [8, 9, 10, 11, 12, 13],  # c w m g y p f
-                "BOTTOM": [14, 15, 16, 17, 18],  # j b q k v z x
-                "RIGHT": [19, 20, 1, 2]  # u o i e a
-            },
-            # Individual vowel states
-            "a": {0: [1, 2, 3, 4]},
-            "e": {0: [5, 6, 7, 8]},
-            "i": {0: [9, 10, 11, 12]},
-            "o": {0: [13, 14, 15, 16]},
-            "u": {0: [17, 18, 19, 20]},
-            # Individual consonant states (TOP section)
-            "s": {0: [1, 2, 3]},
-            "t": {0: [4, 5, 6]},
-            "n": {0: [7, 8, 9]},
-            "r": {0: [10, 11]},
-            "d": {0: [12, 13, 14, 15]},
-            "l": {0: [16, 17]},
-            "h": {0: [18, 19, 20]},
-            # Add these lines after line 133 (after the "h": {0: [18, 19, 20]} line):
-
-            # Individual consonant states (LEFT section)
-            "c": {0: [19, 20]},
-            "w": {0: [16, 17, 18]},
-            "m": {0: [13, 14, 15]},
-            "g": {0: [10, 11, 12]},
-            "y": {0: [7, 8, 9]},
-            "p": {0: [4, 5, 6]},
-            "f": {0: [1, 2, 3]},
-
-            # Individual consonant states (BOTTOM section)
-            "j": {0: [19, 20]},
-            "b": {0: [16, 17, 18]},
-            "q": {0: [13, 14, 15]},
-            "k": {0: [10, 11, 12]},
-            "v": {0: [7, 8, 9]},
-            "z": {0: [4, 5, 6]},
-            "x": {0: [1, 2, 3]},
-            # NUM Interface
-            "NUM": {
-                "1": [1],
-                "2": [2, 3, 4],
-                "3": [5, 6],
-                "4": [7, 8],
-                "5": [9, 10],
-                "6": [11, 12],
-                "7": [13, 14],
-                "8": [15, 16],
-                "9": [17, 18, 19],
-                "0": [20]
-            }
+            "MAIN": region_layout.panel_sectors("MAIN"),
+            "NUM": region_layout.panel_sectors("NUM"),
         }
+        for section in ["RIGHT", "TOP", "LEFT", "BOTTOM"]:
+            for char, sectors in region_layout.panel_sectors(section).items():
+                self.sector_mappings[char] = {0: sectors}
 
         # NEW: Unified counter system for sectors and buttons
         self.counters = {
@@ -211,17 +321,28 @@ class AAC_GUI():
         }
 
         # Numbers without decimal point (moved to center)
-        self.numbers = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0']
+        self.numbers = region_layout.PANELS["NUM"]["targets"]
         self.character_positions = {}
         self.section_ids = {}  # Store canvas IDs for main sections
         self.secondary_section_ids = {}  # Store canvas IDs for secondary sections
         self.corner_button_ids = {}  # Store canvas IDs for corner buttons
         self.center_circle_id = None  # Store canvas ID for center circle
+        self.center_text_id = None  # Store canvas ID for center text
+        self.scene_state = None  # Panel the current ring items were built for
+        self.item_fills = {}  # Last fill set on each canvas item, to skip redundant itemconfig calls
+        self.center_text = None  # Last text shown in the center circle
 
         self.compute_character_positions()
         self.setup_UI()
+        self.scene_state = "MAIN"
 
-        self.region_receiver = RegionReceiver(callback=self.process_command)
+        # Receiver threads only append to this deque; the Tk main loop drains it
+        # (deque.append/popleft are atomic, so no lock is needed)
+        self.command_queue = deque()
+        self.root.after(self.INPUT_TICK_MS, self.drain_commands)
+
+        receiver_class = AsyncRegionReceiver if self.RECEIVER_MODE == "asyncio" else RegionReceiver
+        self.region_receiver = receiver_class(callback=self.enqueue_command)
         self.region_receiver.start()
 
         # Start command input thread
@@ -282,7 +403,7 @@ class AAC_GUI():
             if counter >= self.SELECTION_THRESHOLD:
                 return self.FALLBACK_COLORS["highlight_4"]
             else:
-                return self.FALLBACK_COLORS[f"highlight_{counter}"]
+                return self.FALLBACK_COLORS[f"highlight_{max(int(counter), 1)}"]
         else:
             # Calculate opacity based on counter and threshold
             opacity_ratio = min(counter / self.SELECTION_THRESHOLD, 1.0)
@@ -382,14 +503,17 @@ class AAC_GUI():
 
                 self.character_positions[(char, "MAIN")] = (char_x, char_y)
 
+            # Store the start and end angles of the section's arc
+            start_angle, end_angle = region_layout.target_arc("MAIN", section)
+            self.character_positions[(f"{section}_start", "MAIN")] = start_angle
+            self.character_positions[(f"{section}_end", "MAIN")] = end_angle
+
         ### --- SECONDARY VIEW: Full circle with equal segments --- ###
         ring_radius = 240  # Doubled from 120
         for section, chars in self.letters.items():
-            num_chars = len(chars)
             for i, char in enumerate(chars):
                 # Calculate angle for arc segments - divide 360 degrees evenly
-                start_angle = 360 * i / num_chars
-                end_angle = 360 * (i + 1) / num_chars
+                start_angle, end_angle = region_layout.target_arc(section, char)
 
                 # Store the start and end angles for drawing arcs
                 self.character_positions[(f"{char}_start", section)] = start_angle
@@ -407,8 +531,7 @@ class AAC_GUI():
         ### --- NUMBERS: 10 Equally Spaced Positions in a Circle (MODIFIED) --- ###
         for i, num in enumerate(self.numbers):
             # Calculate angle for arc segments - 10 equal divisions
-            start_angle = 360 * i / len(self.numbers)
-            end_angle = 360 * (i + 1) / len(self.numbers)
+            start_angle, end_angle = region_layout.target_arc("NUM", num)
 
             # Store the start and end angles for drawing arcs
             self.character_positions[(f"{num}_start", "NUM")] = start_angle
@@ -485,22 +608,22 @@ class AAC_GUI():
         # Update NUM button
         if "NUM_BG" in self.corner_button_ids:
             color = self.get_highlight_color(self.counters["NUM"])
-            self.canvas.itemconfig(self.corner_button_ids["NUM_BG"], fill=color)
+            self.set_fill(self.corner_button_ids["NUM_BG"], color)
 
         # Update RETURN button
         if "RETURN_BG" in self.corner_button_ids:
             color = self.get_highlight_color(self.counters["RETURN"])
-            self.canvas.itemconfig(self.corner_button_ids["RETURN_BG"], fill=color)
+            self.set_fill(self.corner_button_ids["RETURN_BG"], color)
 
         # Update DELETE button
         if "DELETE_BG" in self.corner_button_ids:
             color = self.get_highlight_color(self.counters["DELETE"])
-            self.canvas.itemconfig(self.corner_button_ids["DELETE_BG"], fill=color)
+            self.set_fill(self.corner_button_ids["DELETE_BG"], color)
 
         # Update CONFIRM button
         if "CONFIRM_BG" in self.corner_button_ids:
             color = self.get_highlight_color(self.counters["CONFIRM"])
-            self.canvas.itemconfig(self.corner_button_ids["CONFIRM_BG"], fill=color)
+            self.set_fill(self.corner_button_ids["CONFIRM_BG"], color)
 
     def update_center_circle_highlighting(self):
         """Update the highlighting of center circle based on its counter"""
@@ -509,7 +632,41 @@ class AAC_GUI():
             # If no highlighting, use background color, otherwise use highlight color
             if self.counters["CENTER"] == 0:
                 color = self.COLORS["background"]
-            self.canvas.itemconfig(self.center_circle_id, fill=color)
+            self.set_fill(self.center_circle_id, color)
+
+    def set_fill(self, item_id: int, color: str) -> None:
+        """Re-color a canvas item, skipping the Tk call when the color is unchanged"""
+        if self.item_fills.get(item_id) != color:
+            self.canvas.itemconfig(item_id, fill=color)
+            self.item_fills[item_id] = color
+
+    def ring_counters(self, option: str) -> List[Tuple[int, float]]:
+        """(canvas ID, counter) for every arc of the ring drawn for option"""
+        if option == "MAIN":
+            return [(item_id, self.counters[section]) for section, item_id in self.section_ids.items()]
+        if option == "NUM":
+            return [(item_id, self.counters["SECONDARY"][f"NUM_{num}"])
+                    for num, item_id in self.secondary_section_ids.items()]
+        return [(self.secondary_section_ids[char], self.counters["SECONDARY"][f"{option}_{i}"])
+                for i, char in enumerate(self.letters[option]) if char in self.secondary_section_ids]
+
+    def refresh_scene(self) -> None:
+        """Retained-scene update: only re-color arcs/buttons and swap the center text"""
+        for item_id, counter in self.ring_counters(self.scene_state):
+            self.set_fill(item_id, self.get_highlight_color(counter))
+        self.update_corner_button_highlighting()
+        self.update_center_circle_highlighting()
+
+        text = self.get_center_circle_text()
+        if text != self.center_text:
+            self.canvas.itemconfig(self.center_text_id, text=text)
+            self.center_text = text
+
+    def main_arc(self, section: str) -> Dict[str, float]:
+        """start/extent options of a MAIN section's arc"""
+        start_angle = self.character_positions[(f"{section}_start", "MAIN")]
+        end_angle = self.character_positions[(f"{section}_end", "MAIN")]
+        return {"start": start_angle, "extent": end_angle - start_angle}
 
     def create_ring(self):
         """Draws the four-sectioned ring with arcs. Modified with larger outer ring."""
@@ -522,24 +679,24 @@ class AAC_GUI():
 
         # Create the four sections and store their IDs
         self.section_ids["TOP"] = self.canvas.create_arc(offset, offset, offset + ring_size, offset + ring_size,
-                                                         start=45, extent=90,
+                                                         **self.main_arc("TOP"),
                                                          outline=self.COLORS["border"],
-                                                         fill=self.COLORS["ring"], width=6, tags="TOP")
+                                                         fill=self.COLORS["ring"], width=6, tags=("ring", "TOP"))
 
         self.section_ids["RIGHT"] = self.canvas.create_arc(offset, offset, offset + ring_size, offset + ring_size,
-                                                           start=315, extent=90,
+                                                           **self.main_arc("RIGHT"),
                                                            outline=self.COLORS["border"],
-                                                           fill=self.COLORS["ring"], width=6, tags="RIGHT")
+                                                           fill=self.COLORS["ring"], width=6, tags=("ring", "RIGHT"))
 
         self.section_ids["BOTTOM"] = self.canvas.create_arc(offset, offset, offset + ring_size, offset + ring_size,
-                                                            start=225, extent=90,
+                                                            **self.main_arc("BOTTOM"),
                                                             outline=self.COLORS["border"],
-                                                            fill=self.COLORS["ring"], width=6, tags="BOTTOM")
+                                                            fill=self.COLORS["ring"], width=6, tags=("ring", "BOTTOM"))
 
         self.section_ids["LEFT"] = self.canvas.create_arc(offset, offset, offset + ring_size, offset + ring_size,
-                                                          start=135, extent=90,
+                                                          **self.main_arc("LEFT"),
                                                           outline=self.COLORS["border"],
-                                                          fill=self.COLORS["ring"], width=6, tags="LEFT")
+                                                          fill=self.COLORS["ring"], width=6, tags=("ring", "LEFT"))
 
         # Add letter indicators to MAIN view - now positioned radially
         for section, letters in self.letters.items():
@@ -557,8 +714,9 @@ class AAC_GUI():
                                                         outline=self.COLORS["border"],
                                                         fill=self.COLORS["background"], width=6, tags="center_circle")
         # MODIFIED: Use new center circle text function
-        self.canvas.create_text(500, 500, text=self.get_center_circle_text(), font=self.FONT["large"],
-                                fill=self.COLORS["text"], tags="center_text")
+        self.center_text = self.get_center_circle_text()
+        self.center_text_id = self.canvas.create_text(500, 500, text=self.center_text, font=self.FONT["large"],
+                                                      fill=self.COLORS["text"], tags="center_text")
 
     def reset_all_counters(self):
         """Reset all counters to 0"""
@@ -568,8 +726,45 @@ class AAC_GUI():
                     self.counters["SECONDARY"][sec_key] = 0
             else:
                 self.counters[key] = 0
+        self.dwell.reset()
 
-    def process_sector_input(self, sector: int) -> None:
+    def counter_home(self, key: str) -> Dict[str, Any]:
+        """Return the counter dict holding key (main/button counters or SECONDARY)"""
+        return self.counters["SECONDARY"] if key in self.counters["SECONDARY"] else self.counters
+
+    def clear_counter(self, key: str) -> None:
+        """Reset a single counter and its dwell time"""
+        self.counter_home(key)[key] = 0
+        self.dwell.reset(key)
+
+    def sync_dwell_counters(self) -> None:
+        """In time mode, counters hold dwell progress scaled to SELECTION_THRESHOLD for highlighting"""
+        for home in (self.counters, self.counters["SECONDARY"]):
+            for key in home:
+                if key != "SECONDARY":
+                    home[key] = self.dwell.progress(key) * self.SELECTION_THRESHOLD
+
+    def register_hit(self, key: str, timestamp: float = None) -> bool:
+        """
+        Count one gaze sample on the target behind counter key.
+        Returns True once the target is selected.
+        """
+        if self.DWELL_MODE == "time":
+            self.dwell.update(key, time.monotonic() if timestamp is None else timestamp)
+            self.sync_dwell_counters()
+            return self.dwell.is_selected(key)
+
+        home = self.counter_home(key)
+        home[key] += 1
+        return home[key] >= self.SELECTION_THRESHOLD
+
+    def record_selection(self, kept: bool = True) -> None:
+        """Feed typed-character outcomes to the adaptive dwell: deleted right away means a wrong selection"""
+        if self.pending_selection:
+            self.dwell.record_outcome(kept)
+        self.pending_selection = False
+
+    def process_sector_input(self, sector: int, timestamp: float = None) -> None:
         """
         NEW: Process sector input (1-20) based on current state
         """
@@ -578,9 +773,8 @@ class AAC_GUI():
             mapping = self.sector_mappings["MAIN"]
             for section, sectors in mapping.items():
                 if sector in sectors:
-                    self.counters[section] += 1
-                    if self.counters[section] >= self.SELECTION_THRESHOLD:
-                        self.counters[section] = 0
+                    if self.register_hit(section, timestamp):
+                        self.clear_counter(section)
                         self.reset_all_counters()
                         # self.state = section
                         # self.update_display(section)
@@ -589,7 +783,7 @@ class AAC_GUI():
                     return
 
             # If sector doesn't match any mapping, dim current selection
-            self.dim_current_selection()
+            self.dim_current_selection(timestamp)
 
         elif self.state in ["RIGHT", "TOP", "LEFT", "BOTTOM"]:
             # In secondary panel, check character-specific mappings
@@ -602,15 +796,14 @@ class AAC_GUI():
 
                 # For individual character states, we need to check if we're in that state
                 if char in self.sector_mappings and sector in self.sector_mappings[char][0]:
-                    self.counters["SECONDARY"][counter_key] += 1
-                    if self.counters["SECONDARY"][counter_key] >= self.SELECTION_THRESHOLD:
+                    if self.register_hit(counter_key, timestamp):
                         self.add_character(char)
                     else:
                         self.update_display(section)
                     return
 
             # If no match found, dim current selection
-            self.dim_current_selection()
+            self.dim_current_selection(timestamp)
 
         elif self.state == "NUM":
             # In NUM panel, check number mappings
@@ -618,34 +811,31 @@ class AAC_GUI():
             for number, sectors in mapping.items():
                 if sector in sectors:
                     counter_key = f"NUM_{number}"
-                    self.counters["SECONDARY"][counter_key] += 1
-                    if self.counters["SECONDARY"][counter_key] >= self.SELECTION_THRESHOLD:
+                    if self.register_hit(counter_key, timestamp):
                         self.add_number(number)
                     else:
                         self.update_display("NUM")
                     return
 
             # If sector doesn't match any mapping, dim current selection
-            self.dim_current_selection()
+            self.dim_current_selection(timestamp)
 
-    def process_button_input(self, button_code: int) -> None:
+    def process_button_input(self, button_code: int, timestamp: float = None) -> None:
         """
         NEW: Process button input (21-25)
         21: NUM, 22: RETURN, 23: DELETE, 24: CONFIRM, 25: CENTER
         """
         if button_code == 21:  # NUM
-            self.counters["NUM"] += 1
-            if self.counters["NUM"] >= self.SELECTION_THRESHOLD:
-                self.counters["NUM"] = 0
+            if self.register_hit("NUM", timestamp):
+                self.clear_counter("NUM")
                 self.reset_all_counters()
                 # self.update_display("NUM")
             else:
                 self.update_corner_button_highlighting()
 
         elif button_code == 22:  # RETURN
-            self.counters["RETURN"] += 1
-            if self.counters["RETURN"] >= self.SELECTION_THRESHOLD:
-                self.counters["RETURN"] = 0
+            if self.register_hit("RETURN", timestamp):
+                self.clear_counter("RETURN")
                 self.reset_all_counters()
                 self.state = "MAIN"
                 self.update_display("MAIN")
@@ -657,9 +847,9 @@ class AAC_GUI():
             if self.state in ["TOP", "RIGHT", "BOTTOM", "LEFT"]:
                 return
 
-            self.counters["DELETE"] += 1
-            if self.counters["DELETE"] >= self.SELECTION_THRESHOLD:
-                self.counters["DELETE"] = 0
+            if self.register_hit("DELETE", timestamp):
+                self.clear_counter("DELETE")
+                self.record_selection(kept=False)
                 if self.current_text:
                     self.current_text = self.current_text[:-1]
                     self.update_display(self.state)
@@ -673,9 +863,9 @@ class AAC_GUI():
             if self.state in ["TOP", "RIGHT", "BOTTOM", "LEFT"]:
                 return
 
-            self.counters["CONFIRM"] += 1
-            if self.counters["CONFIRM"] >= self.SELECTION_THRESHOLD:
-                self.counters["CONFIRM"] = 0
+            if self.register_hit("CONFIRM", timestamp):
+                self.clear_counter("CONFIRM")
+                self.record_selection(kept=True)
                 if self.current_text:
                     self.confirm_text()
                 else:
@@ -684,9 +874,8 @@ class AAC_GUI():
                 self.update_corner_button_highlighting()
 
         elif button_code == 25:  # CENTER
-            self.counters["CENTER"] += 1
-            if self.counters["CENTER"] >= self.SELECTION_THRESHOLD:
-                self.counters["CENTER"] = 0
+            if self.register_hit("CENTER", timestamp):
+                self.clear_counter("CENTER")
                 if self.state == "NUM":
                     self.add_decimal_point()
                 else:
@@ -694,8 +883,15 @@ class AAC_GUI():
             else:
                 self.update_center_circle_highlighting()
 
-    def dim_current_selection(self):
+    def dim_current_selection(self, timestamp: float = None):
         """Gradually dim the current selection"""
+        if self.DWELL_MODE == "time":
+            # Time mode: every target decays by the time spent looking elsewhere
+            self.dwell.tick(time.monotonic() if timestamp is None else timestamp)
+            self.sync_dwell_counters()
+            self.update_display(self.state)
+            return
+
         if self.state == "MAIN":
             # Find highest main section counter and decrement
             max_counter = 0
@@ -745,8 +941,16 @@ class AAC_GUI():
 
         Modified: Updated ring sizes and added larger offset calculations
         MODIFIED: Numbers now use 10 equal divisions instead of 11
+
+        With RETAINED_SCENE, staying on the same panel only re-colors the existing items.
         """
+        if self.RETAINED_SCENE and option == self.scene_state:
+            self.refresh_scene()
+            self.state = option
+            return
+
         # Clear only the ring and character elements, keep side buttons
+        self.item_fills = {}
         self.canvas.delete("ring")
         self.canvas.delete("characters")
         self.canvas.delete("labels")
@@ -770,7 +974,7 @@ class AAC_GUI():
             # Create TOP section
             counter_top = self.counters["TOP"]
             self.section_ids["TOP"] = self.canvas.create_arc(
-                offset, offset, offset + ring_size, offset + ring_size, start=45, extent=90,
+                offset, offset, offset + ring_size, offset + ring_size, **self.main_arc("TOP"),
                 outline=self.COLORS["border"],
                 fill=self.get_highlight_color(counter_top),
                 width=6, tags=("ring", "TOP")
@@ -779,7 +983,7 @@ class AAC_GUI():
             # Create RIGHT section
             counter_right = self.counters["RIGHT"]
             self.section_ids["RIGHT"] = self.canvas.create_arc(
-                offset, offset, offset + ring_size, offset + ring_size, start=315, extent=90,
+                offset, offset, offset + ring_size, offset + ring_size, **self.main_arc("RIGHT"),
                 outline=self.COLORS["border"],
                 fill=self.get_highlight_color(counter_right),
                 width=6, tags=("ring", "RIGHT")
@@ -788,7 +992,7 @@ class AAC_GUI():
             # Create BOTTOM section
             counter_bottom = self.counters["BOTTOM"]
             self.section_ids["BOTTOM"] = self.canvas.create_arc(
-                offset, offset, offset + ring_size, offset + ring_size, start=225, extent=90,
+                offset, offset, offset + ring_size, offset + ring_size, **self.main_arc("BOTTOM"),
                 outline=self.COLORS["border"],
                 fill=self.get_highlight_color(counter_bottom),
                 width=6, tags=("ring", "BOTTOM")
@@ -797,7 +1001,7 @@ class AAC_GUI():
             # Create LEFT section
             counter_left = self.counters["LEFT"]
             self.section_ids["LEFT"] = self.canvas.create_arc(
-                offset, offset, offset + ring_size, offset + ring_size, start=135, extent=90,
+                offset, offset, offset + ring_size, offset + ring_size, **self.main_arc("LEFT"),
                 outline=self.COLORS["border"],
                 fill=self.get_highlight_color(counter_left),
                 width=6, tags=("ring", "LEFT")
@@ -882,14 +1086,19 @@ class AAC_GUI():
         self.update_center_circle_highlighting()
 
         # MODIFIED: Display appropriate text based on mode
-        self.canvas.create_text(500, 500, text=self.get_center_circle_text(), font=self.FONT["large"],
-                                fill=self.COLORS["text"], tags="center_text")
-
         self.state = option  # Update the state of the interface
+        self.center_text = self.get_center_circle_text()
+        self.center_text_id = self.canvas.create_text(500, 500, text=self.center_text, font=self.FONT["large"],
+                                                      fill=self.COLORS["text"], tags="center_text")
+        self.scene_state = option
+        for item_id, counter in self.ring_counters(option):
+            self.item_fills[item_id] = self.get_highlight_color(counter)
 
     def add_character(self, char: str) -> None:
         """Adds the selected letter to current_text"""
+        self.record_selection(kept=True)
         self.current_text += char
+        self.pending_selection = True
 
         # Reset all counters
         self.reset_all_counters()
@@ -900,7 +1109,9 @@ class AAC_GUI():
 
     def add_number(self, num: str) -> None:
         """ADDED: Adds the selected number to current_text"""
+        self.record_selection(kept=True)
         self.current_text += num
+        self.pending_selection = True
 
         # Reset all counters
         self.reset_all_counters()
@@ -957,9 +1168,68 @@ class AAC_GUI():
 
 ### ---------- receive ----------
 
-    def process_command(self, cmd: str):
+    def enqueue_command(self, cmd: str, timestamp: float = None) -> None:
+        """Thread-safe entry point for receiver threads: queue the command for the Tk main loop"""
+        now = time.monotonic()
+        # Binary senders give the capture time of the sample (mapped onto this clock, so
+        # late by the smallest delay seen); text lines start at arrival
+        trace = latency_trace.start_trace("receive", now) if timestamp is None else \
+            latency_trace.start_trace(latency_trace.MAPPED_ORIGIN, timestamp)
+        if trace and timestamp is not None:
+            trace.stamp(latency_trace.MAPPED_RECEIVE, now)
+        self.command_queue.append((cmd, now if timestamp is None else timestamp, trace))
+
+    def drain_commands(self) -> None:
+        """
+        Process the commands queued since the last tick on the Tk main loop.
+        A run of identical commands is coalesced: in "time" mode only its first and last
+        samples reach the dwell engine, plus whatever is needed to keep consecutive updates
+        within the engine's max gap, so the whole run is credited with a couple of updates.
+        """
+        traces = []
+        try:
+            pending = [self.command_queue.popleft() for _ in range(len(self.command_queue))]
+            i = 0
+            while i < len(pending):
+                cmd = pending[i][0]
+                j = i
+                while j + 1 < len(pending) and pending[j + 1][0] == cmd:
+                    j += 1
+
+                if self.DWELL_MODE == "time":
+                    last_sent = None
+                    for k in range(i, j + 1):
+                        _, timestamp, trace = pending[k]
+                        if k == i or k == j or pending[k + 1][1] - last_sent > self.dwell.max_gap:
+                            self.traced_command(cmd, timestamp, trace, traces)
+                            last_sent = timestamp
+                else:
+                    for _, timestamp, trace in pending[i:j + 1]:
+                        self.traced_command(cmd, timestamp, trace, traces)
+                i = j + 1
+        finally:
+            if traces:
+                # Idle callbacks run in order, so this one runs after the redraw the updates scheduled
+                self.root.after_idle(self.record_traces, traces)
+            self.root.after(self.INPUT_TICK_MS, self.drain_commands)
+
+    def traced_command(self, cmd: str, timestamp: float, trace, traces: list) -> None:
+        if trace:
+            trace.stamp("dispatch")
+        self.process_command(cmd, timestamp)
+        if trace:
+            traces.append(trace.stamp("update"))
+
+    @staticmethod
+    def record_traces(traces: list) -> None:
+        now = time.monotonic()
+        for trace in traces:
+            latency_trace.recorder.record(trace.stamp("paint", now))
+
+    def process_command(self, cmd: str, timestamp: float = None):
         """
-        Process the received command for 20-sector system or calibration points
+        Process the received command for 20-sector system or calibration points.
+        timestamp is the time.monotonic() time of the gaze sample (defaults to now)
         """
         try:
             if cmd.lower() == 'exit':
@@ -977,49 +1247,33 @@ class AAC_GUI():
                 command_num = int(cmd)
             except ValueError:
                 print(f"Invalid command: {cmd}. Please use numbers 1-25 or calibration positions")
-                self.dim_current_selection()
+                self.dim_current_selection(timestamp)
                 return
 
             # Process based on command range
             if 1 <= command_num <= 20:
                 # Ring sector commands
-                self.process_sector_input(command_num)
+                self.process_sector_input(command_num, timestamp)
                 # pass
             elif 21 <= command_num <= 25:
                 # Button commands
-                self.process_button_input(command_num)
+                self.process_button_input(command_num, timestamp)
             else:
                 print("Invalid command. Please use numbers 1-25")
-                self.dim_current_selection()
+                self.dim_current_selection(timestamp)
 
         except Exception as e:
             print(f"Error in process_command: {e}")
-    @staticmethod
-    def tts(input_text: str) -> None:
-        """Converts text to speech using gTTS and plays it with pygame."""
-        print(f"Text-to-speech: '{input_text}'")
-        file_path = "output.mp3"
-        speech = gTTS(input_text, lang='en', tld='co.uk')
-        speech.save(file_path)
 
-        # Ensure pygame mixer is initialized before playing
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-
-        pygame.mixer.music.load(file_path)
-        pygame.mixer.music.play()
-
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
-
-        pygame.mixer.quit()  # Close mixer to release file lock
-        try:
-            os.remove(file_path)
-        except:
-            pass  # Ignore if file can't be deleted
+    def tts(self, input_text: str) -> None:
+        """Queues text for speech; synthesis and playback run on the speech worker thread."""
+        print(f"Text-to-speech: '{input_text}'")
+        if self.speech is not None:
+            self.speech.say(input_text)
 
 
 def main():
+    latency_trace.dump_at_exit(AAC_GUI.LATENCY_FILE)
     root = tk.Tk()
     app = AAC_GUI(root)
     root.mainloop()
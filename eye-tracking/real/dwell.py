@@ -0,0 +1,99 @@
+import math
+from collections import deque
+
+
+class DwellEngine:
+    """
+    Accumulates fixation time per target from event timestamps, so a selection
+    takes the same time however fast the sender emits regions.
+
+    A target gains the time between two consecutive samples that both land on it.
+    Every other target decays exponentially with the given half-life, which
+    replaces the one-step dimming of the counter system. With adaptive dwell,
+    the dwell time shrinks while the user's selections are accurate and grows
+    back when they start deleting what they selected.
+    """
+
+    def __init__(self, dwell_ms=1000, decay_half_life_ms=300, max_gap_ms=250,
+                 adaptive=False, min_dwell_ms=600, max_dwell_ms=2000,
+                 target_accuracy=0.9, adapt_step=0.05, history=20):
+        self.dwell = dwell_ms / 1000
+        self.decay_half_life = decay_half_life_ms / 1000
+        self.max_gap = max_gap_ms / 1000
+        self.adaptive = adaptive
+        self.min_dwell = min_dwell_ms / 1000
+        self.max_dwell = max_dwell_ms / 1000
+        self.target_accuracy = target_accuracy
+        self.adapt_step = adapt_step
+        self.outcomes = deque(maxlen=history)
+
+        self.levels = {}  # target -> accumulated fixation seconds
+        self.current = None
+        self.last_time = None
+
+    @property
+    def dwell_ms(self) -> float:
+        return self.dwell * 1000
+
+    def _elapsed(self, timestamp: float) -> float:
+        if self.last_time is None:
+            self.last_time = timestamp
+            return 0.0
+        # A long gap (eye closed, dropped link) must not count as fixation
+        dt = min(max(timestamp - self.last_time, 0.0), self.max_gap)
+        self.last_time = max(self.last_time, timestamp)
+        return dt
+
+    def _decay(self, dt: float, keep=None) -> None:
+        if dt <= 0:
+            return
+        factor = math.pow(0.5, dt / self.decay_half_life)
+        for target in list(self.levels):
+            if target == keep:
+                continue
+            level = self.levels[target] * factor
+            if level < 0.01 * self.dwell:
+                del self.levels[target]
+            else:
+                self.levels[target] = level
+
+    def update(self, target, timestamp: float) -> float:
+        """Registers a gaze sample on target and returns its progress (0.0 - 1.0)"""
+        dt = self._elapsed(timestamp)
+        self._decay(dt, keep=target)
+        if target == self.current:
+            self.levels[target] = self.levels.get(target, 0.0) + dt
+        self.current = target
+        return self.progress(target)
+
+    def tick(self, timestamp: float) -> None:
+        """Registers a gaze sample on no target: everything decays"""
+        self._decay(self._elapsed(timestamp))
+        self.current = None
+
+    def progress(self, target) -> float:
+        return min(self.levels.get(target, 0.0) / self.dwell, 1.0)
+
+    def is_selected(self, target) -> bool:
+        # Tolerance for the float error of summing many frame intervals
+        return self.levels.get(target, 0.0) >= self.dwell - 1e-6
+
+    def reset(self, target=None) -> None:
+        if target is None:
+            self.levels.clear()
+            self.current = None
+        else:
+            self.levels.pop(target, None)
+
+    def record_outcome(self, correct: bool) -> None:
+        """Feeds back whether a selection was kept (True) or undone (False)"""
+        self.outcomes.append(bool(correct))
+        if not self.adaptive or len(self.outcomes) < 5:
+            return
+
+        accuracy = sum(self.outcomes) / len(self.outcomes)
+        if accuracy >= self.target_accuracy:
+            self.dwell *= 1 - self.adapt_step
+        else:
+            self.dwell *= 1 + self.adapt_step
+        self.dwell = min(max(self.dwell, self.min_dwell), self.max_dwell)
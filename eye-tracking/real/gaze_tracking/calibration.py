@@ -1,5 +1,7 @@
 from __future__ import division
+import threading
 import cv2
+import numpy as np
 from .pupil import Pupil
 
 
@@ -9,10 +11,23 @@ class Calibration(object):
     best binarization threshold value for the person and the webcam.
     """
 
-    def __init__(self):
+    THRESHOLDS = np.arange(5, 100, 5)
+    AVERAGE_IRIS_SIZE = 0.48
+
+    def __init__(self, recalibrate_every=0):
+        """
+        Arguments:
+            recalibrate_every (int): Once calibrated, re-evaluate the threshold on every
+                Nth frame of each eye on a worker thread, so it follows lighting changes
+                (0 keeps the startup calibration)
+        """
         self.nb_frames = 20
         self.thresholds_left = []
         self.thresholds_right = []
+        self.recalibrate_every = recalibrate_every
+        self._frames_seen = [0, 0]
+        self._workers = [None, None]  # One per eye: both eyes reach their Nth frame together
+        self._lock = threading.Lock()
 
     def is_complete(self):
         """Returns true if the calibration is completed"""
@@ -24,10 +39,11 @@ class Calibration(object):
         Argument:
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        if side == 0:
-            return int(sum(self.thresholds_left) / len(self.thresholds_left))
-        elif side == 1:
-            return int(sum(self.thresholds_right) / len(self.thresholds_right))
+        with self._lock:
+            if side == 0:
+                return int(sum(self.thresholds_left) / len(self.thresholds_left))
+            elif side == 1:
+                return int(sum(self.thresholds_right) / len(self.thresholds_right))
 
     @staticmethod
     def iris_size(frame):
@@ -43,6 +59,20 @@ class Calibration(object):
         nb_blacks = nb_pixels - cv2.countNonZero(frame)
         return nb_blacks / nb_pixels
 
+    @staticmethod
+    def iris_sizes(filtered_frame, thresholds):
+        """Returns iris_size of the frame binarized at each of the thresholds,
+        from a single histogram instead of one binarization per threshold.
+
+        Arguments:
+            filtered_frame (numpy.ndarray): Eye frame returned by Pupil.filter_eye
+            thresholds (numpy.ndarray): Threshold values
+        """
+        frame = filtered_frame[5:-5, 5:-5]
+        # THRESH_BINARY turns a pixel black when it is <= the threshold
+        blacks = np.cumsum(np.bincount(frame.ravel(), minlength=256))
+        return blacks[thresholds] / frame.size
+
     @staticmethod
     def find_best_threshold(eye_frame):
         """Calculates the optimal threshold to binarize the
@@ -51,15 +81,17 @@ class Calibration(object):
         Argument:
             eye_frame (numpy.ndarray): Frame of the eye to be analyzed
         """
-        average_iris_size = 0.48
-        trials = {}
-
-        for threshold in range(5, 100, 5):
-            iris_frame = Pupil.image_processing(eye_frame, threshold)
-            trials[threshold] = Calibration.iris_size(iris_frame)
+        thresholds = Calibration.THRESHOLDS
+        sizes = Calibration.iris_sizes(Pupil.filter_eye(eye_frame), thresholds)
+        # argmin keeps the lowest threshold on ties
+        return int(thresholds[np.argmin(np.abs(sizes - Calibration.AVERAGE_IRIS_SIZE))])
 
-        best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
-        return best_threshold
+    def _add(self, threshold, side):
+        with self._lock:
+            thresholds = self.thresholds_left if side == 0 else self.thresholds_right
+            thresholds.append(threshold)
+            if self.recalibrate_every and len(thresholds) > self.nb_frames:
+                del thresholds[0]
 
     def evaluate(self, eye_frame, side):
         """Improves calibration by taking into consideration the
@@ -69,9 +101,27 @@ class Calibration(object):
             eye_frame (numpy.ndarray): Frame of the eye
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        threshold = self.find_best_threshold(eye_frame)
+        if side in (0, 1):
+            self._add(self.find_best_threshold(eye_frame), side)
 
-        if side == 0:
-            self.thresholds_left.append(threshold)
-        elif side == 1:
-            self.thresholds_right.append(threshold)
+    def recalibrate(self, eye_frame, side):
+        """Hands every recalibrate_every-th frame of the eye to a worker thread that
+        evaluates it; the thresholds then cover the last nb_frames evaluations.
+        Returns at once, and skips the frame if the eye's previous one is still being evaluated.
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame of the eye
+            side: Indicates whether it's the left eye (0) or the right eye (1)
+        """
+        if not self.recalibrate_every or side not in (0, 1):
+            return
+        self._frames_seen[side] += 1
+        if self._frames_seen[side] % self.recalibrate_every:
+            return
+        worker = self._workers[side]
+        if worker is not None and worker.is_alive():
+            return
+        worker = threading.Thread(target=self.evaluate, args=(eye_frame.copy(), side),
+                                  name="calibration", daemon=True)
+        self._workers[side] = worker
+        worker.start()
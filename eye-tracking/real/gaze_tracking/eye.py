@@ -34,6 +34,36 @@ class Eye(object):
         y = int((p1.y + p2.y) / 2)
         return (x, y)
 
+    @staticmethod
+    def _mask_full_frame(frame, region):
+        """Returns a copy of the frame, white everywhere but inside the eye polygon
+
+        Arguments:
+            frame (numpy.ndarray): Frame containing the face
+            region (numpy.ndarray): Eye polygon in frame coordinates
+        """
+        height, width = frame.shape[:2]
+        black_frame = np.zeros((height, width), np.uint8)
+        mask = np.full((height, width), 255, np.uint8)
+        cv2.fillPoly(mask, [region], (0, 0, 0))
+        return cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
+
+    @staticmethod
+    def _mask_crop(frame, region, min_x, min_y, max_x, max_y):
+        """Same pixels as _mask_full_frame(...)[min_y:max_y, min_x:max_x], with only crop-sized buffers
+
+        Arguments:
+            frame (numpy.ndarray): Frame containing the face
+            region (numpy.ndarray): Eye polygon in frame coordinates
+            min_x, min_y, max_x, max_y (int): Crop box, inside the frame
+        """
+        crop = frame[min_y:max_y, min_x:max_x]
+        mask = np.zeros(crop.shape[:2], np.uint8)
+        cv2.fillPoly(mask, [region - (min_x, min_y)], 255)
+        eye = np.full_like(crop, 255)
+        cv2.copyTo(crop, mask, eye)
+        return eye
+
     def _isolate(self, frame, landmarks, points):
         """Isolate an eye, to have a frame without other part of the face.
 
@@ -46,13 +76,6 @@ class Eye(object):
         region = region.astype(np.int32)
         self.landmark_points = region
 
-        # Applying a mask to get only the eye
-        height, width = frame.shape[:2]
-        black_frame = np.zeros((height, width), np.uint8)
-        mask = np.full((height, width), 255, np.uint8)
-        cv2.fillPoly(mask, [region], (0, 0, 0))
-        eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
-
         # Cropping on the eye
         margin = 5
         min_x = np.min(region[:, 0]) - margin
@@ -60,7 +83,12 @@ class Eye(object):
         min_y = np.min(region[:, 1]) - margin
         max_y = np.max(region[:, 1]) + margin
 
-        self.frame = eye[min_y:max_y, min_x:max_x]
+        height, width = frame.shape[:2]
+        if min_x >= 0 and min_y >= 0 and max_x <= width and max_y <= height:
+            self.frame = self._mask_crop(frame, region, min_x, min_y, max_x, max_y)
+        else:
+            # The crop runs off the frame: keep the full-frame path and its slicing as it was
+            self.frame = self._mask_full_frame(frame, region)[min_y:max_y, min_x:max_x]
         self.origin = (min_x, min_y)
 
         height, width = self.frame.shape[:2]
@@ -114,6 +142,8 @@ class Eye(object):
 
         if not calibration.is_complete():
             calibration.evaluate(self.frame, side)
+        else:
+            calibration.recalibrate(self.frame, side)
 
         threshold = calibration.threshold(side)
         self.pupil = Pupil(self.frame, threshold)
@@ -0,0 +1,104 @@
+from __future__ import division
+import cv2
+import dlib
+
+
+class FaceTracker(object):
+    """
+    This class finds the face box for the landmark predictor without running
+    the HOG face detector on every frame: the detector runs every few frames
+    (optionally on a downscaled frame) and a correlation tracker follows the
+    face in between. Drift is judged from the tracker's own confidence, since
+    the landmark predictor fits a face to whatever box it is given: detection
+    runs again as soon as the confidence falls below an absolute floor or well
+    below what it was right after the last detection.
+    """
+
+    def __init__(self, detect_interval=10, detection_scale=1.0, min_tracking_quality=7.0, max_quality_drop=0.5):
+        """
+        Arguments:
+            detect_interval (int): Max frames between two HOG detections (1 detects on every frame)
+            detection_scale (float): Factor the frame is resized by for detection (e.g. 0.5)
+            min_tracking_quality (float): Peak-to-side-lobe ratio of the correlation tracker
+                below which the face counts as lost
+            max_quality_drop (float): The face also counts as lost when the ratio falls below
+                this share of its value on the first tracked frame
+        """
+        self.detect_interval = max(1, detect_interval)
+        self.detection_scale = detection_scale
+        self.min_tracking_quality = min_tracking_quality
+        self.max_quality_drop = max_quality_drop
+
+        self._detector = dlib.get_frontal_face_detector()
+        self._tracker = None
+        self._reference_quality = None
+        self.face = None
+        self.quality = None
+        self.frames_since_detection = 0
+        self.detections = 0
+        self.tracked_frames = 0
+        self.lost_tracks = 0
+
+    def reset(self):
+        """Forgets the tracked face, so the next frame runs the detector"""
+        self._tracker = None
+        self._reference_quality = None
+        self.face = None
+
+    def _detect(self, gray):
+        """Runs the HOG detector, returns the first face (dlib.rectangle) or None
+
+        Arguments:
+            gray (numpy.ndarray): Grayscale frame
+        """
+        self.detections += 1
+        self.frames_since_detection = 0
+        self.reset()
+        scale = self.detection_scale
+        image = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        faces = self._detector(image)
+        if len(faces) == 0:
+            return None
+
+        face = faces[0]
+        if scale != 1.0:
+            face = dlib.rectangle(int(face.left() / scale), int(face.top() / scale),
+                                  int(face.right() / scale), int(face.bottom() / scale))
+        self._tracker = dlib.correlation_tracker()
+        self._tracker.start_track(gray, face)
+        self.face = face
+        return face
+
+    def _lost(self, quality):
+        """Returns True if the tracker confidence says the box left the face
+
+        Arguments:
+            quality (float): Peak-to-side-lobe ratio returned by correlation_tracker.update
+        """
+        if quality < self.min_tracking_quality:
+            return True
+        if self._reference_quality is None:
+            self._reference_quality = quality
+            return False
+        return quality < self._reference_quality * self.max_quality_drop
+
+    def locate(self, gray):
+        """Returns the face box (dlib.rectangle) in this frame, or None if there is no face
+
+        Arguments:
+            gray (numpy.ndarray): Grayscale frame
+        """
+        self.frames_since_detection += 1
+        if self._tracker is None or self.frames_since_detection >= self.detect_interval:
+            return self._detect(gray)
+
+        self.quality = self._tracker.update(gray)
+        if self._lost(self.quality):
+            self.lost_tracks += 1
+            return self._detect(gray)
+
+        position = self._tracker.get_position()
+        self.face = dlib.rectangle(int(position.left()), int(position.top()),
+                                   int(position.right()), int(position.bottom()))
+        self.tracked_frames += 1
+        return self.face
@@ -4,6 +4,7 @@ import cv2
 import dlib
 from .eye import Eye
 from .calibration import Calibration
+from .face_tracker import FaceTracker
 
 
 class GazeTracking(object):
@@ -13,14 +14,22 @@ class GazeTracking(object):
     and pupils and allows to know if the eyes are open or closed
     """
 
-    def __init__(self):
+    def __init__(self, detect_interval=10, detection_scale=1.0, recalibrate_every=0):
+        """
+        Arguments:
+            detect_interval (int): Frames between two runs of the face detector; the face
+                is tracked in between (1 detects on every frame, like before)
+            detection_scale (float): Resize factor of the frame the face detector sees
+            recalibrate_every (int): Keep calibrating in the background on every Nth frame
+                once the startup calibration is done (0 disables)
+        """
         self.frame = None
         self.eye_left = None
         self.eye_right = None
-        self.calibration = Calibration()
+        self.calibration = Calibration(recalibrate_every)
 
-        # _face_detector is used to detect faces
-        self._face_detector = dlib.get_frontal_face_detector()
+        # _face_tracker detects faces every few frames and tracks them in between
+        self._face_tracker = FaceTracker(detect_interval, detection_scale)
 
         # _predictor is used to get facial landmarks of a given face
         cwd = os.path.abspath(os.path.dirname(__file__))
@@ -42,16 +51,16 @@ class GazeTracking(object):
     def _analyze(self):
         """Detects the face and initialize Eye objects"""
         frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
+        face = self._face_tracker.locate(frame)
 
-        try:
-            landmarks = self._predictor(frame, faces[0])
-            self.eye_left = Eye(frame, landmarks, 0, self.calibration)
-            self.eye_right = Eye(frame, landmarks, 1, self.calibration)
-
-        except IndexError:
+        if face is None:
             self.eye_left = None
             self.eye_right = None
+            return
+
+        landmarks = self._predictor(frame, face)
+        self.eye_left = Eye(frame, landmarks, 0, self.calibration)
+        self.eye_right = Eye(frame, landmarks, 1, self.calibration)
 
     def refresh(self, frame):
         """Refreshes the frame and analyzes it.
@@ -16,6 +16,28 @@ class Pupil(object):
 
         self.detect_iris(eye_frame)
 
+    @staticmethod
+    def filter_eye(eye_frame):
+        """Smooths the eye frame before binarization (the costly part of image_processing,
+        independent of the threshold)
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+        """
+        kernel = np.ones((3, 3), np.uint8)
+        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
+        return cv2.erode(new_frame, kernel, iterations=3)
+
+    @staticmethod
+    def binarize(filtered_frame, threshold):
+        """Binarizes a frame returned by filter_eye: pixels above the threshold turn white
+
+        Arguments:
+            filtered_frame (numpy.ndarray): Output of filter_eye
+            threshold (int): Threshold value used to binarize the eye frame
+        """
+        return cv2.threshold(filtered_frame, threshold, 255, cv2.THRESH_BINARY)[1]
+
     @staticmethod
     def image_processing(eye_frame, threshold):
         """Performs operations on the eye frame to isolate the iris
@@ -27,12 +49,7 @@ class Pupil(object):
         Returns:
             A frame with a single element representing the iris
         """
-        kernel = np.ones((3, 3), np.uint8)
-        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
-        new_frame = cv2.erode(new_frame, kernel, iterations=3)
-        new_frame = cv2.threshold(new_frame, threshold, 255, cv2.THRESH_BINARY)[1]
-
-        return new_frame
+        return Pupil.binarize(Pupil.filter_eye(eye_frame), threshold)
 
     def detect_iris(self, eye_frame):
         """Detects the iris and estimates the position of the iris by
@@ -0,0 +1,118 @@
+"""
+Local load test for the region receivers: dozens of simulated senders connect
+to a receiver on localhost, some of them reconnecting all the time like
+send_regions_to_glass does after an error, plus a few that connect and stay
+silent to check the idle timeout.
+
+    python receiver_load_test.py --senders 48 --mode asyncio --protocol binary
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from collections import namedtuple
+
+import wire_protocol
+from UI import AsyncRegionReceiver, RegionReceiver
+
+RegionEvent = namedtuple("RegionEvent", ["kind", "region", "x", "y", "timestamp", "confidence"],
+                         defaults=(1.0,))
+
+
+async def sender(port, protocol, messages, reconnect_every, rate_hz):
+    sent = 0
+    while sent < messages:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        burst = min(reconnect_every or messages, messages - sent)
+        events = [RegionEvent("region", str(random.randint(1, 25)), random.random(), random.random(),
+                              time.monotonic()) for _ in range(burst)]
+        for i, event in enumerate(events):
+            if protocol == "binary":
+                writer.write(wire_protocol.encode_frame([event], sent + i))
+            else:
+                writer.write(wire_protocol.encode_text([event]))
+            await writer.drain()
+            if rate_hz:
+                await asyncio.sleep(1 / rate_hz)
+        sent += burst
+        writer.close()
+        await writer.wait_closed()
+
+
+async def silent_sender(port, hold):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"\n")
+    await writer.drain()
+    # Returns as soon as the receiver closes the connection (or after hold)
+    try:
+        await asyncio.wait_for(reader.read(), hold)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        writer.close()
+
+
+async def run_senders(args):
+    jobs = [sender(args.port, args.protocol, args.messages, args.reconnect_every if i % 2 else 0, args.rate)
+            for i in range(args.senders)]
+    jobs += [silent_sender(args.port, args.idle_timeout * 3) for _ in range(args.silent)]
+    return await asyncio.gather(*jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["asyncio", "threads"], default="asyncio")
+    parser.add_argument("--protocol", choices=["text", "binary"], default="text")
+    parser.add_argument("--senders", type=int, default=48)
+    parser.add_argument("--messages", type=int, default=500, help="Events per sender")
+    parser.add_argument("--reconnect-every", type=int, default=20,
+                        help="Every other sender reconnects after this many events")
+    parser.add_argument("--rate", type=float, default=0, help="Events/s per sender (0: as fast as possible)")
+    parser.add_argument("--silent", type=int, default=4, help="Senders that connect and never send")
+    parser.add_argument("--idle-timeout", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=5061)
+    args = parser.parse_args()
+
+    # One queue for the "GUI": the receivers only append, like AAC_GUI.enqueue_command
+    received = []
+    receiver_class = AsyncRegionReceiver if args.mode == "asyncio" else RegionReceiver
+    receiver = receiver_class(callback=lambda label, timestamp: received.append(label))
+    receiver.PORT = args.port
+    receiver.verbose = False
+    receiver.IDLE_TIMEOUT = args.idle_timeout
+    receiver.start()
+    time.sleep(0.5)
+
+    peak_threads = threading.active_count()
+
+    def watch_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+
+    done = threading.Event()
+    threading.Thread(target=watch_threads, daemon=True).start()
+
+    expected = args.senders * args.messages
+    start = time.perf_counter()
+    results = asyncio.run(run_senders(args))
+    # The senders are done once their data is in the socket buffers: wait for the
+    # receiver to catch up (or to stop making progress)
+    last_count = -1
+    while len(received) < expected and len(received) != last_count:
+        last_count = len(received)
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    closed_idle = sum(1 for result in results[args.senders:] if result)
+    print(f"mode={args.mode} protocol={args.protocol} senders={args.senders}")
+    print(f"received {len(received)}/{expected} events in {elapsed:.2f} s ({len(received) / elapsed:.0f} events/s)")
+    print(f"peak threads {peak_threads}, idle connections closed by the receiver {closed_idle}/{args.silent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Single description of the gaze regions shared by the classifier (calibration.py)
+and the keyboard (UI.py). Keep the copies in "Raspberry Pi/" and
+"eye-tracking/real/" identical
+(tests/test_mirrored_modules.py checks it).
+
+Gaze coordinates are calibrated to [0, 1] x [0, 1] with y pointing up, so angles
+are counter-clockwise from the +x axis, the same convention as Tk arcs.
+Region ids:
+- 1-20: ring sectors, numbered counter-clockwise from 0 degrees
+- 21-24: corners outside the ring (top-left, top-right, bottom-left, bottom-right)
+- 25: center circle
+"""
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+CENTER = (0.5, 0.5)
+INNER_RADIUS = 0.25
+OUTER_RADIUS = 0.47
+
+# Each panel splits the ring into equal arcs, counter-clockwise from start (degrees)
+PANELS = {
+    "MAIN": {"start": 45, "targets": ["TOP", "LEFT", "BOTTOM", "RIGHT"]},
+    "RIGHT": {"start": 0, "targets": ['a', 'e', 'i', 'o', 'u']},
+    "TOP": {"start": 0, "targets": ["s", "t", "n", "r", "d", "l", "h"]},
+    "LEFT": {"start": 0, "targets": ["c", "w", "m", "g", "y", "p", "f"]},
+    "BOTTOM": {"start": 0, "targets": ["j", "b", "q", "k", "v", "z", "x"]},
+    "NUM": {"start": 0, "targets": ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0']},
+}
+
+# (sign of dx, sign of dy) -> corner region
+CORNERS = {(-1, 1): 21, (1, 1): 22, (-1, -1): 23, (1, -1): 24}
+CENTER_REGION = 25
+OUTSIDE = 0  # Batch code for points on the axes outside the ring
+
+
+def target_arc(panel, target):
+    """(start, end) angles in degrees of target's arc in panel"""
+    spec = PANELS[panel]
+    count = len(spec["targets"])
+    i = spec["targets"].index(target)
+    return spec["start"] + 360 * i / count, spec["start"] + 360 * (i + 1) / count
+
+
+# Sectors are the finest common split of every panel: a sector never straddles
+# two targets, whatever panel is shown. The union of the panels above gives 20.
+SECTOR_STARTS = sorted({
+    (spec["start"] + 360 * i / len(spec["targets"])) % 360
+    for spec in PANELS.values()
+    for i in range(len(spec["targets"]))
+})
+SECTOR_COUNT = len(SECTOR_STARTS)
+assert SECTOR_STARTS[0] == 0, "The sector numbering starts at 0 degrees"
+_SECTOR_BOUNDS = np.array(SECTOR_STARTS + [360.0])
+
+REGION_LABELS = [str(region) for region in range(1, SECTOR_COUNT + 1)] + \
+                [str(region) for region in sorted(CORNERS.values())] + [str(CENTER_REGION)]
+
+
+def panel_sectors(panel):
+    """target -> list of sector ids covered by its arc in panel"""
+    mapping = {target: [] for target in PANELS[panel]["targets"]}
+    ends = SECTOR_STARTS[1:] + [360]
+    for sector, (start, end) in enumerate(zip(SECTOR_STARTS, ends), 1):
+        middle = (start + end) / 2
+        for target in mapping:
+            arc_start, arc_end = target_arc(panel, target)
+            if (middle - arc_start) % 360 < arc_end - arc_start:
+                mapping[target].append(sector)
+                break
+    return mapping
+
+
+def region_label(code):
+    """Batch code -> the label classify_point returns"""
+    return "outside" if code == OUTSIDE else str(int(code))
+
+
+### ---------- Exact classification ----------
+
+def _classify_exact(x, y):
+    dx = x - CENTER[0]
+    dy = y - CENTER[1]
+    dist = math.hypot(dx, dy)
+
+    if dist <= INNER_RADIUS:
+        return CENTER_REGION
+    if dist <= OUTER_RADIUS:
+        angle = math.degrees(math.atan2(dy, dx)) % 360
+        return bisect_right(SECTOR_STARTS, angle)
+    if dx == 0 or dy == 0 or dist != dist:
+        return OUTSIDE
+    return CORNERS[(1 if dx > 0 else -1, 1 if dy > 0 else -1)]
+
+
+def classify_points(xs, ys):
+    """
+    Classifies arrays of points at once.
+
+    Arguments:
+        xs, ys: Array-likes of calibrated coordinates (broadcast together)
+
+    Returns:
+        Integer array of region ids, OUTSIDE (0) where classify_point says "outside"
+    """
+    dx = np.asarray(xs, dtype=np.float64) - CENTER[0]
+    dy = np.asarray(ys, dtype=np.float64) - CENTER[1]
+    dist = np.hypot(dx, dy)
+    angle = np.degrees(np.arctan2(dy, dx)) % 360
+
+    sectors = np.searchsorted(SECTOR_STARTS, angle, side="right")
+    corners = np.where(dx < 0, np.where(dy > 0, CORNERS[(-1, 1)], CORNERS[(-1, -1)]),
+                       np.where(dy > 0, CORNERS[(1, 1)], CORNERS[(1, -1)]))
+    corners = np.where((dx == 0) | (dy == 0), OUTSIDE, corners)
+
+    codes = np.select([dist <= INNER_RADIUS, dist <= OUTER_RADIUS, dist > OUTER_RADIUS],
+                      [CENTER_REGION, sectors, corners], OUTSIDE)
+
+    # NumPy's arctan2/hypot can differ from math's in the last bit, so points lying
+    # on an edge are redone with the scalar computation to match classify_point
+    bounds = _SECTOR_BOUNDS[sectors - 1], _SECTOR_BOUNDS[np.minimum(sectors, SECTOR_COUNT)]
+    on_edge = (angle - bounds[0] < 1e-9) | (bounds[1] - angle < 1e-9) | \
+              (np.abs(dist - INNER_RADIUS) < 1e-12) | (np.abs(dist - OUTER_RADIUS) < 1e-12)
+    if on_edge.any():
+        xs, ys = np.broadcast_arrays(dx + CENTER[0], dy + CENTER[1])
+        for i in zip(*np.nonzero(on_edge)):
+            codes[i] = _classify_exact(float(xs[i]), float(ys[i]))
+    return codes
+
+
+### ---------- Lookup grid ----------
+
+GRID_SIZE = 256  # Cells per side over [0, 1); a cell that holds a single region answers directly
+
+
+def _build_grid(size):
+    # A cell is usable only if its corners, pushed slightly outwards, all land in
+    # one region and no ring edge crosses it; every other cell falls back to the
+    # exact computation, so the grid never changes a result
+    eps = 1e-9
+    edges = np.linspace(0.0, 1.0, size + 1)
+    lo, hi = edges[:-1] - eps, edges[1:] + eps
+    x0, y0 = np.meshgrid(lo, lo)
+    x1, y1 = np.meshgrid(hi, hi)
+
+    codes = [classify_points(cx, cy) for cx, cy in ((x0, y0), (x1, y0), (x0, y1), (x1, y1))]
+    same = (codes[0] == codes[1]) & (codes[0] == codes[2]) & (codes[0] == codes[3])
+
+    # Distance range of each cell to the center
+    near_dx = np.maximum(np.maximum(x0 - CENTER[0], CENTER[0] - x1), 0)
+    near_dy = np.maximum(np.maximum(y0 - CENTER[1], CENTER[1] - y1), 0)
+    far_dx = np.maximum(np.abs(x0 - CENTER[0]), np.abs(x1 - CENTER[0]))
+    far_dy = np.maximum(np.abs(y0 - CENTER[1]), np.abs(y1 - CENTER[1]))
+    near, far = np.hypot(near_dx, near_dy), np.hypot(far_dx, far_dy)
+    for radius in (INNER_RADIUS, OUTER_RADIUS):
+        same &= ~((near <= radius) & (radius <= far))
+
+    # -1 marks cells that need the exact computation (row = y cell, column = x cell)
+    return np.where(same, codes[0], -1).ravel().tolist()
+
+
+_GRID = _build_grid(GRID_SIZE)
+_LABELS = [region_label(code) for code in range(CENTER_REGION + 1)]
+
+
+def classify_point(x, y):
+    """Region label ("1"-"25" or "outside") of a calibrated gaze point"""
+    if 0.0 <= x < 1.0 and 0.0 <= y < 1.0:
+        code = _GRID[int(y * GRID_SIZE) * GRID_SIZE + int(x * GRID_SIZE)]
+        if code >= 0:
+            return _LABELS[code]
+    return _LABELS[_classify_exact(x, y)]
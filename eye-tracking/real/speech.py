@@ -0,0 +1,229 @@
+import hashlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+import pygame
+
+
+### ---------- Backends ----------
+
+class EspeakBackend:
+    """Offline synthesis with the espeak-ng (or espeak) command line tool."""
+    name = "espeak"
+    extension = "wav"
+
+    def __init__(self, voice="en-gb"):
+        self.voice = voice
+        self.command = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self) -> bool:
+        return self.command is not None
+
+    def synthesize(self, text: str, path: str) -> None:
+        subprocess.run([self.command, "-v", self.voice, "-w", path, text],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class Pyttsx3Backend:
+    """Offline synthesis with pyttsx3 (SAPI5 / NSSpeechSynthesizer / espeak)."""
+    name = "pyttsx3"
+    extension = "wav"
+
+    def __init__(self, voice=None):
+        self.voice = voice
+        self.engine = None
+
+    def available(self) -> bool:
+        try:
+            import pyttsx3  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text: str, path: str) -> None:
+        if self.engine is None:
+            import pyttsx3
+            self.engine = pyttsx3.init()
+            if self.voice:
+                self.engine.setProperty("voice", self.voice)
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+
+class GTTSBackend:
+    """Online synthesis with gTTS (needs network access)."""
+    name = "gtts"
+    extension = "mp3"
+
+    def __init__(self, voice="en-co.uk"):
+        self.voice = voice
+        self.lang, _, self.tld = voice.partition("-")
+
+    def available(self) -> bool:
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text: str, path: str) -> None:
+        from gtts import gTTS
+        gTTS(text, lang=self.lang, tld=self.tld or "com").save(path)
+
+
+BACKENDS = {
+    "espeak": EspeakBackend,
+    "pyttsx3": Pyttsx3Backend,
+    "gtts": GTTSBackend,
+}
+
+
+def make_backend(names=("espeak", "gtts")):
+    """Return the first available backend out of names (a name or a preference list)"""
+    if isinstance(names, str):
+        names = (names,)
+    for name in names:
+        backend = BACKENDS[name]()
+        if backend.available():
+            return backend
+    raise RuntimeError(f"No text-to-speech backend available out of {list(names)}")
+
+
+### ---------- Cache ----------
+
+class SpeechCache:
+    """
+    LRU cache of synthesized audio files on disk, keyed by backend, voice and text.
+    Recency survives restarts through the files' modification times.
+    """
+    # Partial files of a synthesis that crashed or was killed; younger ones may still
+    # be written by another process sharing the directory
+    STALE_TMP_AGE = 60.0
+
+    def __init__(self, directory: str, max_entries: int = 200):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._remove_stale_tmp()
+
+        files = [os.path.join(directory, name) for name in os.listdir(directory)
+                 if not name.endswith(".tmp")]
+        files.sort(key=os.path.getmtime)
+        self.entries = OrderedDict((os.path.basename(path), path) for path in files)
+
+    def _remove_stale_tmp(self) -> None:
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.STALE_TMP_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def key(backend, text: str) -> str:
+        digest = hashlib.sha1(f"{backend.name}\0{backend.voice}\0{text}".encode()).hexdigest()
+        return f"{digest}.{backend.extension}"
+
+    def get(self, backend, text: str):
+        key = self.key(backend, text)
+        with self.lock:
+            path = self.entries.get(key)
+            if path is None:
+                return None
+            self.entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.entries.pop(key, None)
+            return None
+        return path
+
+    def get_or_synthesize(self, backend, text: str) -> str:
+        path = self.get(backend, text)
+        if path is not None:
+            return path
+
+        key = self.key(backend, text)
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            backend.synthesize(text, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            # Failed or interrupted: do not leave the partial file behind
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self.lock:
+            self.entries[key] = path
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                _, old_path = self.entries.popitem(last=False)
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        return path
+
+
+### ---------- Engine ----------
+
+class SpeechEngine:
+    """
+    Text-to-speech off the caller's thread. say() only queues the text; a worker
+    thread synthesizes it (or takes it from the cache) and plays it with pygame.
+    """
+
+    def __init__(self, backends=("espeak", "gtts"), cache_dir=None, cache_size=200, prewarm=()):
+        self.backend = make_backend(backends)
+        cache_dir = cache_dir or os.path.join(os.path.expanduser("~"), ".cache", "aac_tts")
+        self.cache = SpeechCache(cache_dir, cache_size)
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+        for phrase in prewarm:
+            self.prewarm(phrase)
+
+    def say(self, text: str) -> None:
+        self.jobs.put(("say", text))
+
+    def prewarm(self, text: str) -> None:
+        """Synthesize text into the cache without playing it"""
+        self.jobs.put(("warm", text))
+
+    def stop(self) -> None:
+        self.jobs.put(None)
+
+    def _play(self, path: str) -> None:
+        # The mixer is initialized once and kept; re-initializing per utterance costs ~100 ms
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            pygame.time.wait(20)
+        pygame.mixer.music.unload()
+
+    def _run(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            kind, text = job
+            try:
+                path = self.cache.get_or_synthesize(self.backend, text)
+                if kind == "say":
+                    self._play(path)
+            except Exception as e:
+                print(f"[ERROR] Text-to-speech failed for '{text}': {e}")
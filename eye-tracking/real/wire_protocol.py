@@ -0,0 +1,221 @@
+"""
+Wire format between the Pi and the displays. Keep the copies in "Raspberry Pi/"
+and "eye-tracking/real/" identical
+(tests/test_mirrored_modules.py checks it).
+
+Text mode (the default, understood by every receiver): one UTF-8 label per line,
+e.g. "17\\n" or "top_mid\\n".
+The keepalive line "keepalive\\n" is read and ignored by every receiver,
+including the Glass app, which drops empty lines before its handler sees them.
+
+Binary mode: frames of a fixed 6-byte header followed by `count` fixed-size records.
+    header: magic b"GZ" | version (u8) | frame type (u8) | count (u16)
+    record: event type (u8) | region code (u8) | sequence number (u32) |
+            x (f32) | y (f32) | confidence (f32) | sender monotonic time in ns (u64)
+All fields are big-endian. A connection is binary if its first bytes are the magic.
+"""
+import math
+import struct
+import time
+from collections import namedtuple
+
+MAGIC = b"GZ"
+VERSION = 1
+HEADER = struct.Struct("!2sBBH")
+RECORD = struct.Struct("!BBIfffQ")
+FRAME_EVENTS = 1
+MAX_BATCH = 0xFFFF
+
+EVENT_REGION = 1  # Classified gaze sample
+EVENT_CALIBRATION = 2  # Calibration target shown
+EVENT_COMMAND = 3  # Anything else sent as a bare label, e.g. "Emergency" or "exit"
+
+# Stable label <-> code table; append new labels, never renumber
+LABELS = ["outside"] + [str(region) for region in range(1, 26)] + \
+         ["center", "top_mid", "left_mid", "bottom_mid", "right_mid", "Emergency", "exit"]
+CODES = {label: code for code, label in enumerate(LABELS)}
+KEEPALIVE_LABEL = "keepalive"  # Text mode only; binary keepalives are empty frames
+
+# What a receiver gets out of either mode. Text lines only carry the label: the
+# other fields are None and the receiver stamps the arrival time itself.
+WireEvent = namedtuple("WireEvent", ["event_type", "label", "x", "y", "confidence", "timestamp", "seq"])
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+### ---------- Encoding ----------
+
+def event_fields(item):
+    """(event type, label, x, y, confidence, monotonic seconds) of a RegionEvent or a bare label"""
+    if isinstance(item, str):
+        return EVENT_COMMAND, item, None, None, 1.0, time.monotonic()
+    event_type = EVENT_CALIBRATION if item.kind == "calibration" else EVENT_REGION
+    return event_type, item.region, item.x, item.y, item.confidence, item.timestamp
+
+
+def encode_text(items):
+    return "".join(f"{event_fields(item)[1]}\n" for item in items).encode()
+
+
+def encode_frame(items, first_seq=0):
+    """One binary frame holding items, numbered from first_seq"""
+    if len(items) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} events per frame")
+    frame = bytearray(HEADER.size + RECORD.size * len(items))
+    HEADER.pack_into(frame, 0, MAGIC, VERSION, FRAME_EVENTS, len(items))
+    offset = HEADER.size
+    for seq, item in enumerate(items, first_seq):
+        event_type, label, x, y, confidence, timestamp = event_fields(item)
+        if label not in CODES:
+            raise ProtocolError(f"No wire code for label {label!r}")
+        RECORD.pack_into(frame, offset, event_type, CODES[label], seq & 0xFFFFFFFF,
+                         math.nan if x is None else x, math.nan if y is None else y,
+                         confidence, int(timestamp * 1e9))
+        offset += RECORD.size
+    return bytes(frame)
+
+
+### ---------- Decoding ----------
+
+class LineDecoder:
+    """Splits a text stream into WireEvents. Scans each byte once, however the
+    stream is chunked (the old str += / split loop was quadratic on bursts)."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Returns the WireEvents of every line completed by data"""
+        self.buffer += data
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            return []
+        lines = self.buffer[:end].decode().split("\n")
+        del self.buffer[:end + 1]
+        return [_new_event(WireEvent, (EVENT_COMMAND, label, None, None, None, None, None))
+                for label in map(str.strip, lines) if label and label != KEEPALIVE_LABEL]
+
+
+class FrameDecoder:
+    """Decodes binary frames into WireEvents; lost counts sequence gaps."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.next_seq = None
+        self.lost = 0
+
+    def feed(self, data):
+        """Returns the WireEvents of every frame completed by data"""
+        self.buffer += data
+        buffer = self.buffer
+        events = []
+        offset = 0
+        while len(buffer) - offset >= HEADER.size:
+            magic, version, frame_type, count = HEADER.unpack_from(buffer, offset)
+            if magic != MAGIC:
+                raise ProtocolError(f"Bad frame magic {bytes(magic)!r}")
+            if version != VERSION:
+                raise ProtocolError(f"Unsupported protocol version {version}")
+            end = offset + HEADER.size + count * RECORD.size
+            if len(buffer) < end:
+                break
+            if frame_type == FRAME_EVENTS and count:
+                records = RECORD.iter_unpack(bytes(buffer[offset + HEADER.size:end]))
+                # NaN encodes "no coordinate" (x != x only for NaN)
+                events.extend(_new_event(WireEvent, (event_type, _CODE_LABELS[code],
+                                                     None if x != x else x, None if y != y else y,
+                                                     confidence, timestamp_ns / 1e9, seq))
+                              for event_type, code, seq, x, y, confidence, timestamp_ns in records)
+                self._check_sequence(events[-count].seq, events[-1].seq, count)
+            offset = end
+        del buffer[:offset]
+        return events
+
+    def _check_sequence(self, first, last, count):
+        # Records of a frame are numbered consecutively by encode_frame
+        if self.next_seq is not None and first != self.next_seq:
+            self.lost += (first - self.next_seq) & 0xFFFFFFFF
+        self.next_seq = (last + 1) & 0xFFFFFFFF
+
+
+# Building the tuple directly skips the namedtuple constructor's argument handling,
+# the bulk of the per-event decode cost
+_new_event = tuple.__new__
+# Label of every possible u8 code, so unknown codes from newer senders decode as their number
+_CODE_LABELS = LABELS + [str(code) for code in range(len(LABELS), 256)]
+
+
+class StreamDecoder:
+    """Picks the text or binary decoder from the first bytes of a connection."""
+
+    def __init__(self):
+        self.decoder = None
+        self.pending = b""
+
+    @property
+    def binary(self):
+        return isinstance(self.decoder, FrameDecoder)
+
+    def feed(self, data):
+        """Returns the WireEvents completed by data"""
+        if self.decoder is None:
+            self.pending += data
+            if len(self.pending) < len(MAGIC) and MAGIC.startswith(self.pending):
+                return []
+            self.decoder = FrameDecoder() if self.pending.startswith(MAGIC) else LineDecoder()
+            data, self.pending = self.pending, b""
+        return self.decoder.feed(data)
+
+
+class ClockOffset:
+    """Maps sender monotonic timestamps onto the local monotonic clock.
+    The smallest (arrival - sent) difference seen is taken as the offset, so
+    mapped times keep the sender's spacing without the network jitter."""
+
+    def __init__(self):
+        self.offset = None
+
+    def to_local(self, remote_time, local_time=None):
+        local_time = time.monotonic() if local_time is None else local_time
+        difference = local_time - remote_time
+        if self.offset is None or difference < self.offset:
+            self.offset = difference
+        return remote_time + self.offset
+
+
+class SequenceFilter:
+    """
+    Per-sender filter for unreliable transports (UDP): a sample is accepted only if
+    its sequence number is newer than the last accepted one and it is not older
+    than max_age once moved onto the local clock. Region samples are state, so a
+    late one is worthless once a newer one has been used.
+    """
+
+    def __init__(self, max_age=0.5):
+        self.max_age = max_age
+        self.clock = ClockOffset()
+        self.last_seq = None
+        self.lost = 0  # Sequence numbers never seen
+        self.reordered = 0  # Late or duplicate samples dropped
+        self.stale = 0  # Samples dropped for being older than max_age
+
+    def accept(self, event, local_time=None):
+        """Returns the event's local timestamp, or None if it must be dropped"""
+        if self.last_seq is not None:
+            # Serial number arithmetic, so the u32 sequence can wrap around
+            step = (event.seq - self.last_seq) & 0xFFFFFFFF
+            if step == 0 or step >= 0x80000000:
+                self.reordered += 1
+                return None
+            self.lost += step - 1
+        self.last_seq = event.seq
+
+        local_time = time.monotonic() if local_time is None else local_time
+        timestamp = self.clock.to_local(event.timestamp, local_time)
+        if local_time - timestamp > self.max_age:
+            self.stale += 1
+            return None
+        return timestamp
+
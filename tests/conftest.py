@@ -0,0 +1,20 @@
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PI_DIR = os.path.join(ROOT, "Raspberry Pi")
+DISPLAY_DIR = os.path.join(ROOT, "eye-tracking", "real")
+
+# The scripts import each other by bare module name, as when run from their own
+# directory. The modules both sides share are identical copies, so the Pi's go first.
+for path in (DISPLAY_DIR, PI_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+try:
+    import dlib  # noqa: F401
+except ImportError:
+    # gaze_tracking imports dlib at module level but only calls it when a GazeTracking
+    # or FaceTracker is built, which no test does
+    sys.modules["dlib"] = types.ModuleType("dlib")
@@ -0,0 +1,75 @@
+import pytest
+
+from dwell import DwellEngine
+
+
+def fixate(engine, target, start, seconds, rate):
+    # Samples on target every 1/rate s from start; returns the time of the last one
+    frames = round(seconds * rate)
+    for i in range(frames + 1):
+        engine.update(target, start + i / rate)
+    return start + frames / rate
+
+
+@pytest.mark.parametrize("rate", [5, 10, 30, 60])
+def test_selection_time_does_not_depend_on_the_sample_rate(rate):
+    engine = DwellEngine(dwell_ms=1000, max_gap_ms=600)
+    fixate(engine, "A", 0.0, 0.8, rate)
+    assert not engine.is_selected("A")
+    engine.update("A", 1.0)
+    assert engine.is_selected("A")
+    assert engine.progress("A") == 1.0
+
+
+def test_looking_away_decays_with_the_half_life():
+    engine = DwellEngine(dwell_ms=1000, decay_half_life_ms=300)
+    t = fixate(engine, "A", 0.0, 0.5, 30)
+    engine.update("B", t + 0.15)
+    engine.update("B", t + 0.30)
+    assert engine.progress("A") == pytest.approx(0.25, rel=1e-6)
+
+
+def test_long_gaps_do_not_count_as_fixation():
+    engine = DwellEngine(dwell_ms=1000, max_gap_ms=250)
+    engine.update("A", 0.0)
+    engine.update("A", 5.0)  # Eye closed or link down in between
+    assert engine.progress("A") == pytest.approx(0.25)
+
+
+def test_tick_decays_everything():
+    engine = DwellEngine(dwell_ms=1000, decay_half_life_ms=300)
+    t = fixate(engine, "A", 0.0, 0.5, 30)
+    engine.tick(t + 0.15)
+    engine.tick(t + 0.30)
+    assert engine.progress("A") == pytest.approx(0.25, rel=1e-6)
+    assert engine.current is None
+
+
+def test_reset():
+    engine = DwellEngine()
+    fixate(engine, "A", 0.0, 0.5, 30)
+    fixate(engine, "B", 0.6, 0.2, 30)
+    engine.reset("B")
+    assert engine.progress("B") == 0.0 and engine.progress("A") > 0.0
+    engine.reset()
+    assert engine.progress("A") == 0.0
+
+
+def test_adaptive_dwell_follows_accuracy_within_bounds():
+    engine = DwellEngine(dwell_ms=1000, adaptive=True, min_dwell_ms=600, max_dwell_ms=2000)
+    for _ in range(4):
+        engine.record_outcome(True)
+    assert engine.dwell_ms == 1000  # Needs a few outcomes first
+    for _ in range(100):
+        engine.record_outcome(True)
+    assert engine.dwell_ms == pytest.approx(600)
+    for _ in range(200):
+        engine.record_outcome(False)
+    assert engine.dwell_ms == pytest.approx(2000)
+
+
+def test_fixed_dwell_ignores_outcomes():
+    engine = DwellEngine(dwell_ms=1000)
+    for _ in range(20):
+        engine.record_outcome(False)
+    assert engine.dwell_ms == 1000
@@ -0,0 +1,105 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+import eye_box
+from eye_box import EyeBoxManager
+
+Detection = namedtuple("Detection", ["center", "area"])
+FRAME = np.zeros((480, 640), np.uint8)
+CROP = (80, 120)  # h, w of the eye crop
+
+
+class FakeCascade:
+    """Returns the eye at a fixed frame position, in the coordinates of the image it is given"""
+
+    def __init__(self, eye=(300, 200, 120, 80)):
+        self.eye = eye
+        self.offset = (0, 0)  # Top-left corner of the search crop, set by the test
+        self.calls = []
+
+    def detectMultiScale(self, gray, scale, neighbours):
+        self.calls.append(gray.shape)
+        if self.eye is None:
+            return []
+        x, y, w, h = self.eye
+        # A search crop is recognized by its size: shift into its coordinates
+        if gray.shape != FRAME.shape:
+            x, y = x - self.offset[0], y - self.offset[1]
+        return [(x, y, w, h)]
+
+
+def manager(cascade=None, **kwargs):
+    return EyeBoxManager(cascade or FakeCascade(), background=False, window=10, **kwargs)
+
+
+def fill_window(boxes, detection):
+    for _ in range(boxes.window):
+        boxes.report(detection, CROP)
+
+
+def test_fixed_box_never_detects():
+    cascade = FakeCascade()
+    boxes = EyeBoxManager(cascade, fixed_box=(1, 2, 3, 4))
+    assert boxes.update(FRAME) == (1, 2, 3, 4)
+    fill_window(boxes, None)
+    assert boxes.update(FRAME) == (1, 2, 3, 4)
+    assert cascade.calls == []
+
+
+def test_first_detection_searches_the_whole_frame():
+    boxes = manager()
+    assert boxes.update(FRAME) == (300, 200, 120, 80)
+    assert (boxes.box_id, boxes.full_detections) == (1, 1)
+    # A good box is kept
+    fill_window(boxes, Detection((60, 40), 300.0))
+    boxes.update(FRAME)
+    assert (boxes.box_id, boxes.full_detections) == (1, 1)
+
+
+@pytest.mark.parametrize("detections", [
+    [None],  # Pupil lost
+    [Detection((60, 40), 300.0)] * 10 + [Detection((60, 40), 3000.0)],  # Pupil size jumped
+    [Detection((60, 40), 300.0)] * 10 + [Detection((3, 40), 300.0)],  # Pupil at the crop edge
+])
+def test_drift_triggers_a_local_redetection(detections):
+    cascade = FakeCascade()
+    boxes = manager(cascade)
+    boxes.update(FRAME)
+    for detection in detections:
+        fill_window(boxes, detection)
+    assert boxes.needs_detection
+
+    cascade.offset = (300 - 60, 200 - 40)  # Last box grown by SEARCH_PAD per side
+    boxes.update(FRAME)
+    assert cascade.calls[-1] == (80 + 2 * 40, 120 + 2 * 60)
+    assert (boxes.box_id, boxes.local_detections, boxes.needs_detection) == (2, 1, False)
+
+
+def test_reports_for_an_older_box_are_ignored():
+    boxes = manager()
+    boxes.update(FRAME)
+    for _ in range(boxes.window):
+        boxes.report(None, CROP, box_id=0)
+    assert not boxes.needs_detection
+
+
+def test_failed_detection_retries_after_an_interval(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(eye_box.time, "monotonic", lambda: now[0])
+    cascade = FakeCascade(eye=None)
+    boxes = manager(cascade)
+    assert boxes.update(FRAME) is None
+    boxes.update(FRAME)
+    assert len(cascade.calls) == 1
+    now[0] += eye_box.RETRY_INTERVAL + 0.01
+    boxes.update(FRAME)
+    assert (len(cascade.calls), boxes.failed_detections) == (2, 2)
+
+
+def test_background_detection_does_not_block_update():
+    boxes = EyeBoxManager(FakeCascade())
+    assert boxes.update(FRAME) is None  # Detection started on the worker
+    boxes.worker.join(timeout=5)
+    assert boxes.update(FRAME) == (300, 200, 120, 80)
@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from gaze_tracking.eye import Eye
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+class Landmarks:
+    """The part() lookup of a dlib.full_object_detection"""
+
+    def __init__(self, points):
+        self.points = {index: Point(int(x), int(y)) for index, (x, y) in points.items()}
+
+    def part(self, index):
+        return self.points[index]
+
+
+def eye_polygons(frame_shape, count=300, seed=0):
+    # Six landmarks around a random centre, like the Multi-PIE eye contour; some
+    # centres sit near the frame edge so the crop box runs off it
+    rng = np.random.default_rng(seed)
+    height, width = frame_shape
+    for _ in range(count):
+        cx, cy = rng.integers(-10, width + 10), rng.integers(-10, height + 10)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 6))
+        radii = rng.uniform(3, 30, 6)
+        yield np.stack([cx + radii * np.cos(angles), cy + 0.5 * radii * np.sin(angles)], axis=1).astype(np.int32)
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(1).integers(0, 256, (120, 160), dtype=np.uint8)
+
+
+def test_mask_crop_matches_the_full_frame_mask(frame):
+    height, width = frame.shape
+    compared = 0
+    for region in eye_polygons(frame.shape):
+        min_x, min_y = region.min(axis=0) - 5
+        max_x, max_y = region.max(axis=0) + 5
+        if min_x < 0 or min_y < 0 or max_x > width or max_y > height:
+            continue
+        expected = Eye._mask_full_frame(frame, region)[min_y:max_y, min_x:max_x]
+        np.testing.assert_array_equal(Eye._mask_crop(frame, region, min_x, min_y, max_x, max_y), expected)
+        compared += 1
+    assert compared > 50
+
+
+def test_isolate_keeps_the_old_pixels_when_the_box_runs_off_the_frame(frame):
+    eye = Eye.__new__(Eye)
+    off_frame = 0
+    for region in eye_polygons(frame.shape, seed=2):
+        landmarks = Landmarks(dict(zip(Eye.LEFT_EYE_POINTS, region)))
+        eye._isolate(frame, landmarks, Eye.LEFT_EYE_POINTS)
+
+        min_x, min_y = region.min(axis=0) - 5
+        max_x, max_y = region.max(axis=0) + 5
+        np.testing.assert_array_equal(eye.frame, Eye._mask_full_frame(frame, region)[min_y:max_y, min_x:max_x])
+        assert eye.origin == (min_x, min_y)
+        off_frame += min_x < 0 or min_y < 0 or max_x > frame.shape[1] or max_y > frame.shape[0]
+    assert off_frame > 50
@@ -0,0 +1,86 @@
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pytest
+
+import frame_pipeline
+
+FRAME_COUNT = 120
+EYE_BBOX = (0, 0, 160, 120)
+
+
+class ReplaySource:
+    """Recorded luma frames with their capture times, then None (end of the recording)"""
+
+    def __init__(self, count=FRAME_COUNT):
+        self.frames = []
+        for i in range(count):
+            frame = np.full((120, 160), 180, np.uint8)
+            cv2.circle(frame, (40 + i % 80, 60), 12, 20, -1)
+            self.frames.append(frame)
+        self.index = 0
+        self.frame_time = None
+
+    def capture_array(self):
+        if self.index == len(self.frames):
+            return None
+        self.frame_time = 1000.0 + self.index / 30
+        self.index += 1
+        return self.frames[self.index - 1]
+
+
+@pytest.fixture
+def rings(monkeypatch):
+    created = []
+
+    class RecordedRing(frame_pipeline.SharedRing):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self.shm.name)
+
+    monkeypatch.setattr(frame_pipeline, "SharedRing", RecordedRing)
+    return created
+
+
+def assert_released(names):
+    assert len(names) == 2
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_samples_come_out_in_capture_order(rings):
+    pipeline = frame_pipeline.ProcessPipeline(ReplaySource(), eye_bbox=EYE_BBOX)
+    samples = list(pipeline.samples(timestamps=True))
+    frame_times = [sample[2] for sample in samples]
+    assert len(samples) == FRAME_COUNT
+    assert frame_times == [1000.0 + i / 30 for i in range(FRAME_COUNT)]
+    # The pupil moves right, so the mirrored x decreases within each sweep
+    assert samples[0][0] > samples[79][0]
+    assert_released(rings)
+
+
+def test_slow_consumer_gets_the_latest_samples_and_a_dropped_count(rings):
+    pipeline = frame_pipeline.ProcessPipeline(ReplaySource(), eye_bbox=EYE_BBOX)
+    frame_times = []
+    for sample in pipeline.samples(timestamps=True):
+        frame_times.append(sample[2])
+        time.sleep(0.02)
+    dropped = pipeline.stats.dropped.value
+    assert dropped > 0
+    assert len(frame_times) + dropped == FRAME_COUNT
+    assert frame_times == sorted(frame_times)
+    assert frame_times[-1] == 1000.0 + (FRAME_COUNT - 1) / 30  # The newest sample is never dropped
+    assert_released(rings)
+
+
+def test_shared_memory_is_released_when_the_consumer_stops_early(rings):
+    pipeline = frame_pipeline.ProcessPipeline(ReplaySource(), eye_bbox=EYE_BBOX)
+    samples = pipeline.samples()
+    for _ in zip(range(5), samples):
+        pass
+    samples.close()
+    assert not any(process.is_alive() for process in pipeline.processes)
+    assert_released(rings)
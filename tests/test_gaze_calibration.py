@@ -0,0 +1,90 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from gaze_tracking.calibration import Calibration
+
+
+def legacy_find_best_threshold(eye_frame):
+    # The loop find_best_threshold ran before: filter, erode and binarize per threshold
+    kernel = np.ones((3, 3), np.uint8)
+    trials = {}
+    for threshold in range(5, 100, 5):
+        frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
+        frame = cv2.erode(frame, kernel, iterations=3)
+        frame = cv2.threshold(frame, threshold, 255, cv2.THRESH_BINARY)[1]
+        trials[threshold] = Calibration.iris_size(frame)
+    return min(trials.items(), key=(lambda p: abs(p[1] - 0.48)))[0]
+
+
+def eye_frames(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        h, w = int(rng.integers(11, 50)), int(rng.integers(11, 80))
+        if i % 3 == 0:
+            frame = rng.integers(0, 256, (h, w), dtype=np.uint8)
+        elif i % 3 == 1:
+            frame = np.full((h, w), 255, np.uint8)
+            cv2.circle(frame, (w // 2, h // 2), int(rng.integers(2, 15)), int(rng.integers(0, 120)), -1)
+            frame = np.clip(frame + rng.integers(-30, 30, frame.shape), 0, 255).astype(np.uint8)
+        else:
+            # Values on the threshold grid, so several thresholds tie
+            frame = (rng.integers(0, 256, (h, w)) // 5 * 5).astype(np.uint8)
+        yield frame
+
+
+def test_find_best_threshold_matches_the_legacy_loop():
+    mismatches = [frame.shape for frame in eye_frames()
+                  if Calibration.find_best_threshold(frame) != legacy_find_best_threshold(frame)]
+    assert mismatches == []
+
+
+def test_iris_sizes_match_iris_size():
+    from gaze_tracking.pupil import Pupil
+
+    for frame in eye_frames(30, seed=1):
+        filtered = Pupil.filter_eye(frame)
+        sizes = Calibration.iris_sizes(filtered, Calibration.THRESHOLDS)
+        expected = [Calibration.iris_size(Pupil.binarize(filtered, t)) for t in Calibration.THRESHOLDS]
+        assert sizes.tolist() == pytest.approx(expected, abs=0)
+
+
+def test_startup_calibration_averages_both_eyes():
+    calibration = Calibration()
+    frame = next(eye_frames(1, seed=2))
+    for _ in range(calibration.nb_frames):
+        calibration.evaluate(frame, 0)
+    assert not calibration.is_complete()
+    for _ in range(calibration.nb_frames):
+        calibration.evaluate(frame, 1)
+    assert calibration.is_complete()
+    assert calibration.threshold(0) == calibration.threshold(1) == Calibration.find_best_threshold(frame)
+
+
+def wait_for_workers():
+    for thread in threading.enumerate():
+        if thread.name == "calibration":
+            thread.join(timeout=10)
+
+
+def test_recalibration_follows_both_eyes():
+    calibration = Calibration(recalibrate_every=1)
+    start = np.random.default_rng(3).integers(0, 256, (40, 70), dtype=np.uint8)
+    for side in (0, 1):
+        for _ in range(calibration.nb_frames):
+            calibration.evaluate(start, side)
+
+    # Lighting changed: a bright eye with a dark pupil. Large enough that an
+    # evaluation is still running when the other eye's turn comes.
+    frame = np.full((200, 350), 200, np.uint8)
+    cv2.circle(frame, (175, 100), 60, 30, -1)
+    expected = Calibration.find_best_threshold(frame)
+    assert expected != Calibration.find_best_threshold(start)
+    for _ in range(calibration.nb_frames):
+        # Left then right eye, as GazeTracking analyzes them in one refresh
+        calibration.recalibrate(frame, 0)
+        calibration.recalibrate(frame, 1)
+        wait_for_workers()
+    assert calibration.thresholds_left == calibration.thresholds_right == [expected] * calibration.nb_frames
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from gaze_filter import GAZE_FILTERS, MedianFilter, make_gaze_filter, smooth_gaze
+
+RATE = 30.0
+
+
+def run(gaze_filter, xs, ys=None):
+    ys = xs if ys is None else ys
+    return np.array([gaze_filter(x, y, i / RATE) for i, (x, y) in enumerate(zip(xs, ys))])
+
+
+@pytest.mark.parametrize("mode", sorted(GAZE_FILTERS))
+def test_first_sample_passes_through(mode):
+    assert make_gaze_filter(mode)(0.3, 0.7, 0.0) == pytest.approx((0.3, 0.7))
+
+
+# Share of a step the output may go past the new position: the constant-velocity
+# Kalman model carries the jump's speed on for a few frames
+MAX_OVERSHOOT = {"none": 0.0, "median": 0.0, "one_euro": 0.0, "kalman": 0.2}
+
+
+@pytest.mark.parametrize("mode", sorted(GAZE_FILTERS))
+def test_step_response_settles_on_the_new_position(mode):
+    # The gaze jumps from one target to another and stays there for a second
+    out = run(make_gaze_filter(mode), [0.2] * 30 + [0.8] * 30)
+    assert out[29] == pytest.approx((0.2, 0.2))
+    assert out[-1] == pytest.approx((0.8, 0.8), abs=0.01)
+    assert out[30:].max() <= 0.8 + 0.6 * MAX_OVERSHOOT[mode] + 1e-9
+    assert out[30:].min() >= 0.2 - 1e-9
+
+
+@pytest.mark.parametrize("mode", ["median", "one_euro", "kalman"])
+def test_fixation_noise_is_reduced(mode):
+    rng = np.random.default_rng(0)
+    xs = 0.5 + rng.normal(0, 0.02, 300)
+    out = run(make_gaze_filter(mode), xs)
+    assert out[30:, 0].std() < 0.7 * xs[30:].std()
+
+
+def test_median_ignores_a_single_outlier():
+    out = run(MedianFilter(window=5), [0.4, 0.4, 0.4, 0.95, 0.4, 0.4])
+    assert out[3] == pytest.approx((0.4, 0.4))
+
+
+@pytest.mark.parametrize("mode", sorted(GAZE_FILTERS))
+def test_reset_forgets_the_history(mode):
+    gaze_filter = make_gaze_filter(mode)
+    run(gaze_filter, [0.1] * 20)
+    gaze_filter.reset()
+    assert gaze_filter(0.9, 0.9, 100.0) == pytest.approx((0.9, 0.9))
+
+
+def test_unknown_filter():
+    with pytest.raises(ValueError):
+        make_gaze_filter("bogus")
+
+
+def test_smooth_gaze_wraps_a_stream():
+    out = list(smooth_gaze(iter([(0.1, 0.2), (0.1, 0.2)]), make_gaze_filter("none")))
+    assert out == [(0.1, 0.2), (0.1, 0.2)]
@@ -0,0 +1,183 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import glass_link
+import wire_protocol
+
+
+class DisplayServer:
+    """Local stand-in for the Glass app: records what arrives on each connection"""
+
+    def __init__(self, port=0, stall_first=False, drop_first_after=None):
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+        self.stall_first = stall_first  # Never read the first connection
+        self.drop_first_after = drop_first_after  # Close the first connection after this many lines
+        self.connections = []  # bytearray per accepted connection
+        self.peers = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.peers.append(conn)
+            self.connections.append(bytearray())
+            if not (self.stall_first and len(self.connections) == 1):
+                threading.Thread(target=self._read, args=(conn, self.connections[-1]), daemon=True).start()
+
+    def _read(self, conn, data):
+        first = data is self.connections[0]
+        while True:
+            try:
+                chunk = conn.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            data += chunk
+            if first and self.drop_first_after is not None and data.count(b"\n") >= self.drop_first_after:
+                conn.close()
+                return
+
+    def lines(self, index):
+        return bytes(self.connections[index]).decode().split("\n")[:-1]
+
+    def wait_for(self, predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                raise AssertionError("Timed out waiting for the display")
+            time.sleep(0.01)
+
+    def close(self):
+        self.sock.close()
+        for conn in self.peers:
+            conn.close()
+
+
+@pytest.fixture
+def display():
+    servers = []
+
+    def make(**kwargs):
+        servers.append(DisplayServer(**kwargs))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def test_emergency_goes_before_queued_regions(display):
+    server = display()
+    link = glass_link.GlassLink("127.0.0.1", server.port)
+    for label in ("1", "2", "3"):
+        link.send(label)
+    link.send("Emergency", priority=True)
+    link.start()
+    try:
+        assert link.flush(5.0)
+        server.wait_for(lambda: server.connections and server.connections[0].count(b"\n") == 4)
+        assert server.lines(0) == ["Emergency", "1", "2", "3"]
+    finally:
+        link.close()
+
+
+def test_full_region_lane_drops_the_oldest_but_never_an_emergency(display):
+    server = display()
+    link = glass_link.GlassLink("127.0.0.1", server.port, queue_size=2)
+    for label in ("1", "2", "3"):
+        link.send(label)
+    for _ in range(3):
+        link.send("Emergency", priority=True)
+    assert link.dropped == 1
+    link.start()
+    try:
+        assert link.flush(5.0)
+        server.wait_for(lambda: server.connections and server.connections[0].count(b"\n") == 5)
+        assert server.lines(0) == ["Emergency"] * 3 + ["2", "3"]
+    finally:
+        link.close()
+
+
+def test_reconnects_and_resumes_in_order_after_the_display_drops_the_connection(display):
+    server = display(drop_first_after=3)
+    link = glass_link.GlassLink("127.0.0.1", server.port).start()
+    try:
+        sent = 0
+        while len(server.connections) < 2 or not server.connections[1]:
+            sent += 1
+            assert sent < 500, "The link never reconnected"
+            link.send(str(sent))
+            time.sleep(0.01)
+        assert link.flush(5.0)
+        server.wait_for(lambda: server.lines(1)[-1:] == [str(sent)])
+        assert link.reconnects == 1
+        # Lines written into the dead connection are lost; the rest arrive in order
+        received = [int(label) for label in server.lines(1)]
+        assert received == list(range(sent - len(received) + 1, sent + 1))
+    finally:
+        link.close()
+
+
+def test_connects_once_the_display_comes_up(display):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    link = glass_link.GlassLink("127.0.0.1", port).start()
+    try:
+        link.send("Emergency", priority=True)
+        time.sleep(0.3)  # A few refused attempts
+        server = display(port=port)
+        server.wait_for(lambda: server.connections and server.lines(0) == ["Emergency"], timeout=10.0)
+    finally:
+        link.close()
+
+
+def test_keepalive_is_a_line_the_display_reads_and_ignores(display, monkeypatch):
+    monkeypatch.setattr(glass_link, "KEEPALIVE", 0.05)
+    server = display()
+    link = glass_link.GlassLink("127.0.0.1", server.port).start()
+    try:
+        server.wait_for(lambda: server.connections and server.connections[0].count(b"\n") >= 2)
+        assert set(server.lines(0)) == {glass_link.KEEPALIVE_LABEL}
+        # Not an empty line (the Glass app skips those) and not a label it acts on
+        assert glass_link.KEEPALIVE_LABEL not in wire_protocol.CODES
+        assert wire_protocol.LineDecoder().feed(bytes(server.connections[0])) == []
+    finally:
+        link.close()
+
+
+def test_stalled_display_is_reconnected_after_the_send_timeout(display):
+    server = display(stall_first=True)
+    link = glass_link.GlassLink("127.0.0.1", server.port, send_timeout=0.5, batch_size=32).start()
+    try:
+        for _ in range(30):
+            link.send("x" * 2000000)  # Enough to fill both socket buffers
+        time.sleep(0.2)
+        link.send("Emergency", priority=True)
+        server.wait_for(lambda: len(server.connections) > 1 and b"Emergency\n" in server.connections[1])
+        assert link.reconnects >= 1
+    finally:
+        link.close()
+
+
+@pytest.mark.parametrize("transport, protocol, rate", [
+    ("tcp", "text", glass_link.TEXT_REGION_RATE_HZ),
+    ("tcp", "binary", None),
+    ("udp", "text", None),
+])
+def test_region_rate_is_bounded_only_for_text_lines(monkeypatch, transport, protocol, rate):
+    monkeypatch.setattr(glass_link, "REGION_TRANSPORT", transport)
+    monkeypatch.setattr(glass_link, "PROTOCOL", protocol)
+    assert glass_link.region_rate() == rate
@@ -0,0 +1,71 @@
+from imu_stream import SAMPLE_RATE_HZ, ImuSample, TiltGestureRecognizer
+
+
+def gestures(*segments, **options):
+    """Feeds (roll, sample count) segments at 50 Hz, returns the gestures recognized"""
+    recognizer = TiltGestureRecognizer(**options)
+    events = []
+    index = 0
+    for roll, count in segments:
+        rolls = roll if isinstance(roll, list) else [roll] * count
+        for value in rolls:
+            event = recognizer.update(ImuSample(index, index / SAMPLE_RATE_HZ, 0.0, 0.0, 1.0, value))
+            if event is not None:
+                events.append(event)
+            index += 1
+    return events
+
+
+def test_hold_fires_once_after_hold_ms():
+    events = gestures((0.0, 10), (60.0, 100))
+    assert [(e.kind, e.side) for e in events] == [("hold", "right")]
+    # 600 ms at 50 Hz: the 30th tilted sample, counted from the first one past tilt_angle
+    assert events[0].index == 10 + 29
+    assert events[0].latency_samples == 29
+
+
+def test_hold_latency_follows_hold_ms():
+    events = gestures((0.0, 10), (-60.0, 100), hold_ms=300)
+    assert [(e.kind, e.side, e.index) for e in events] == [("hold", "left", 10 + 14)]
+
+
+def test_double_tilt_inside_double_window():
+    events = gestures((0.0, 10), (60.0, 10), (0.0, 20), (60.0, 10), (0.0, 10))
+    assert [(e.kind, e.side) for e in events] == [("double_tilt", "right")]
+    # Reported once the second tilt has lasted debounce_ms (3 samples)
+    assert events[0].index == 40 + 2
+    assert events[0].latency_samples == 2
+
+
+def test_no_double_tilt_outside_double_window():
+    # 800 ms window: the second tilt starts 1.2 s after the first one ended
+    assert gestures((0.0, 10), (60.0, 10), (0.0, 60), (60.0, 10), (0.0, 10)) == []
+
+
+def test_no_double_tilt_on_opposite_sides():
+    assert gestures((0.0, 10), (60.0, 10), (0.0, 10), (-60.0, 10), (0.0, 10)) == []
+
+
+def test_a_hold_does_not_start_a_double_tilt():
+    events = gestures((0.0, 10), (60.0, 40), (0.0, 10), (60.0, 10), (0.0, 10))
+    assert [e.kind for e in events] == ["hold"]
+
+
+def test_jitter_across_tilt_angle_never_triggers():
+    assert gestures((0.0, 10), ([42.0, 48.0] * 100, None)) == []
+
+
+def test_jitter_above_release_angle_keeps_one_tilt():
+    # Once tilted, dips to 38 degrees (above release_angle) do not end the tilt, so
+    # the hold fires once and nothing re-triggers
+    events = gestures((0.0, 10), (60.0, 5), ([38.0, 50.0] * 100, None))
+    assert [(e.kind, e.index) for e in events] == [("hold", 10 + 29)]
+
+
+def test_jitter_after_a_short_tilt_is_not_a_second_tilt():
+    events = gestures((0.0, 10), (60.0, 10), (0.0, 10), ([42.0, 48.0] * 20, None), (0.0, 10))
+    assert events == []
+
+
+def test_rolls_past_max_angle_are_ignored():
+    assert gestures((0.0, 10), (120.0, 100)) == []
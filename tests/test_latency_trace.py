@@ -0,0 +1,83 @@
+import json
+import math
+
+import pytest
+
+import latency_trace
+from latency_trace import LatencyHistogram, LatencyRecorder, Trace
+
+
+def test_trace_durations():
+    trace = Trace("capture", 1.0).stamp("pupil", 1.004).stamp("send", 1.010)
+    assert trace.durations() == [("pupil", pytest.approx(0.004)), ("send", pytest.approx(0.006)),
+                                 ("total", pytest.approx(0.010))]
+
+
+def test_partial_traces_get_their_own_total():
+    durations = dict(Trace("receive", 5.0).stamp("paint", 5.02).durations())
+    assert "total" not in durations
+    assert durations["total from receive"] == pytest.approx(0.02)
+
+
+def test_clock_mapped_traces_are_not_reported_as_end_to_end():
+    recorder = LatencyRecorder()
+    recorder.record(Trace(latency_trace.MAPPED_ORIGIN, 1.0).stamp(latency_trace.MAPPED_RECEIVE, 1.004)
+                    .stamp("paint", 1.020))
+    assert list(recorder.histograms) == ["receive over min", "paint", "total from mapped capture"]
+    rows = recorder.report().splitlines()
+    assert rows[-1].startswith("total from mapped capture ")
+    assert len({len(row) for row in rows}) == 1  # Long labels keep the columns aligned
+
+
+def test_percentiles_are_accurate_to_a_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.add(ms / 1000)
+    width = 10 ** (1 / latency_trace.BUCKETS_PER_DECADE)
+    for p in (50, 95, 99):
+        assert p / 1000 <= histogram.percentile(p) <= p / 1000 * width
+    assert histogram.percentile(100) == histogram.max == 0.1
+    assert math.isnan(LatencyHistogram().percentile(50))
+
+
+def test_out_of_range_latencies_land_in_the_end_buckets():
+    assert LatencyHistogram.bucket(0.0) == 0
+    assert LatencyHistogram.bucket(1e6) == latency_trace.BUCKETS_PER_DECADE * latency_trace.DECADES
+
+
+def test_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.add(0.001)
+    b.add(0.002)
+    b.add(0.003)
+    a.merge(b)
+    assert (a.count, a.max) == (3, 0.003)
+    assert a.total == pytest.approx(0.006)
+
+
+def test_recorder_dump_and_load(tmp_path):
+    recorder = LatencyRecorder()
+    recorder.record(Trace("capture", 0.0).stamp("pupil", 0.003))
+    recorder.record(None)  # Tracing disabled upstream
+    path = tmp_path / "latency.json"
+    recorder.dump(path)
+
+    loaded = LatencyRecorder.load(path)
+    assert list(loaded.histograms) == ["pupil", "total"]
+    assert loaded.histograms["pupil"].to_dict() == recorder.histograms["pupil"].to_dict()
+    assert "pupil" in loaded.report()
+
+
+def test_load_rejects_another_bucket_layout(tmp_path):
+    path = tmp_path / "latency.json"
+    path.write_text(json.dumps({"buckets_per_decade": 7, "min_latency": 1e-6, "stages": {}}))
+    with pytest.raises(ValueError):
+        LatencyRecorder.load(path)
+
+
+def test_disabled_tracing(monkeypatch):
+    monkeypatch.setattr(latency_trace, "ENABLED", False)
+    assert latency_trace.start_trace("capture") is None
+    recorder = LatencyRecorder()
+    recorder.record(Trace("capture", 0.0).stamp("pupil", 1.0))
+    assert recorder.histograms == {}
@@ -0,0 +1,17 @@
+import filecmp
+import os
+
+import pytest
+
+from conftest import DISPLAY_DIR, PI_DIR
+
+# Modules both the Pi and the display import; each side ships its own copy
+MIRRORED = ["latency_trace.py", "region_layout.py", "wire_protocol.py"]
+
+
+@pytest.mark.parametrize("name", MIRRORED)
+def test_copies_are_identical(name):
+    pi_copy = os.path.join(PI_DIR, name)
+    display_copy = os.path.join(DISPLAY_DIR, name)
+    assert filecmp.cmp(pi_copy, display_copy, shallow=False), \
+        f"Raspberry Pi/{name} and eye-tracking/real/{name} differ"
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+import pytest
+
+import eyetracking
+
+
+def eye_crops(count=600, seed=0):
+    # Blurred crops with up to three dark blobs, some under a dark eyelid band
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        h, w = int(rng.integers(30, 120)), int(rng.integers(40, 160))
+        crop = np.full((h, w), int(rng.integers(80, 230)), np.uint8)
+        for _ in range(int(rng.integers(0, 4))):
+            cv2.circle(crop, (int(rng.integers(0, w)), int(rng.integers(0, h))), int(rng.integers(2, 25)),
+                       int(rng.integers(0, 90)), -1)
+        if i % 4 == 0:
+            cv2.rectangle(crop, (0, 0), (w, int(h * rng.uniform(0.3, 0.7))), int(rng.integers(0, 60)), -1)
+        noisy = np.clip(crop + rng.integers(-15, 15, crop.shape), 0, 255).astype(np.uint8)
+        yield eyetracking.blur_eye(noisy)
+
+
+def round_pupil_crops(count=200, seed=2):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        h, w = int(rng.integers(40, 120)), int(rng.integers(60, 160))
+        crop = np.full((h, w), int(rng.integers(120, 230)), np.uint8)
+        radius = int(rng.integers(min(h, w) // 8 + 3, min(h, w) // 3))
+        center = (int(rng.integers(radius, w - radius)), int(rng.integers(radius, h - radius)))
+        cv2.circle(crop, center, radius, int(rng.integers(0, 60)), -1)
+        yield center, eyetracking.blur_eye(crop)
+
+
+def test_histogram_engine_runs_findcontours_at_most_once(monkeypatch):
+    calls = []
+    largest_contour = eyetracking.largest_contour
+
+    def counting(blurred, threshold):
+        calls.append(threshold)
+        return largest_contour(blurred, threshold)
+
+    monkeypatch.setattr(eyetracking, "largest_contour", counting)
+    for blurred in eye_crops(200):
+        del calls[:]
+        eyetracking.locate_pupil_histogram(blurred)
+        assert len(calls) <= 1
+
+
+def test_engines_agree_on_a_single_round_pupil():
+    for center, blurred in round_pupil_crops():
+        detection = eyetracking.locate_pupil_histogram(blurred)
+        assert detection == eyetracking.locate_pupil_sweep(blurred)
+        assert detection.center == pytest.approx(center, abs=1)
+
+
+def test_histogram_engine_mostly_finds_a_pupil_where_the_sweep_does():
+    # The sweep can rescue a frame at a later threshold; the histogram engine drops it
+    crops = list(eye_crops())
+    agree = sum((eyetracking.locate_pupil_sweep(b) is None) == (eyetracking.locate_pupil_histogram(b) is None)
+                for b in crops)
+    assert agree / len(crops) > 0.85
+
+
+def test_both_engines_use_the_same_size_gate():
+    for blurred in eye_crops(200, seed=1):
+        detection = eyetracking.locate_pupil_histogram(blurred)
+        if detection is not None:
+            area = blurred.shape[0] * blurred.shape[1]
+            assert area * 0.01 < detection.area < area * 0.5
+
+
+def test_confidence_is_high_for_a_round_pupil():
+    crop = np.full((60, 80), 200, np.uint8)
+    cv2.circle(crop, (40, 30), 12, 20, -1)
+    detection = eyetracking.locate_pupil(eyetracking.blur_eye(crop))
+    assert detection.center == pytest.approx((40, 30), abs=1)
+    assert detection.confidence > 0.8
+
+    cv2.rectangle(crop, (0, 0), (80, 22), 20, -1)  # Eyelid shadow joins the pupil
+    detection = eyetracking.locate_pupil(eyetracking.blur_eye(crop))
+    assert detection.confidence < 0.5
@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+import region_layout
+from region_layout import classify_point, classify_points, region_label
+
+
+def legacy_classify_point(x, y):
+    # The if/elif chain calibration.py used before region_layout
+    dx = x - 0.5
+    dy = y - 0.5
+    dist = math.hypot(dx, dy)
+
+    if dist <= 0.25:
+        return "25"
+    elif dist <= 0.47:
+        angle = math.degrees(math.atan2(dy, dx)) % 360
+        bounds = [36, 45, 360 / 7, 72, 2 * 360 / 7, 108, 135, 144, 3 * 360 / 7, 180,
+                  4 * 360 / 7, 216, 225, 252, 5 * 360 / 7, 288, 6 * 360 / 7, 315, 324]
+        for region, bound in enumerate(bounds, 1):
+            if angle < bound:
+                return str(region)
+        return "20"
+    else:
+        if x < 0.5 and y < 0.5:
+            return "23"
+        elif x > 0.5 and y < 0.5:
+            return "24"
+        elif x < 0.5 and y > 0.5:
+            return "21"
+        elif x > 0.5 and y > 0.5:
+            return "22"
+        else:
+            return "outside"
+
+
+def edge_points():
+    # Points on and next to every sector boundary and both ring radii, plus the axes
+    points = []
+    for start in region_layout.SECTOR_STARTS + [360.0]:
+        for angle in (start - 1e-7, start, start + 1e-7):
+            for radius in (0.3, 0.46, 0.47, 0.4700001):
+                a = math.radians(angle)
+                points.append((0.5 + radius * math.cos(a), 0.5 + radius * math.sin(a)))
+    for radius in (0.25, 0.2500001, 0.47, 0.4700001, 0.6):
+        points += [(0.5 + radius, 0.5), (0.5 - radius, 0.5), (0.5, 0.5 + radius), (0.5, 0.5 - radius)]
+    return points
+
+
+def random_points(count=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return list(zip(rng.uniform(-0.2, 1.2, count), rng.uniform(-0.2, 1.2, count)))
+
+
+@pytest.mark.parametrize("x, y", edge_points())
+def test_classify_point_matches_legacy_chain_on_edges(x, y):
+    assert classify_point(x, y) == legacy_classify_point(x, y)
+
+
+def test_classify_point_matches_legacy_chain():
+    mismatches = [(x, y) for x, y in random_points() if classify_point(x, y) != legacy_classify_point(x, y)]
+    assert mismatches == []
+
+
+def test_classify_points_matches_classify_point():
+    points = random_points(5000, seed=1) + edge_points()
+    xs, ys = np.array(points).T
+    labels = [region_label(code) for code in classify_points(xs, ys)]
+    assert labels == [classify_point(x, y) for x, y in points]
+
+
+def test_centre_and_corners():
+    assert classify_point(0.5, 0.5) == "25"
+    assert classify_point(0.02, 0.98) == "21"
+    assert classify_point(0.98, 0.98) == "22"
+    assert classify_point(0.02, 0.02) == "23"
+    assert classify_point(0.98, 0.02) == "24"
+    assert classify_point(0.5, 1.2) == "outside"
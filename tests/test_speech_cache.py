@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+from speech import SpeechCache
+
+
+class StubBackend:
+    """Writes the text as the 'audio'; fail_on makes that text's synthesis crash halfway"""
+    name = "stub"
+    voice = "test"
+    extension = "wav"
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = []
+
+    def synthesize(self, text, path):
+        self.calls.append(text)
+        with open(path, "w") as f:
+            f.write(text)
+            if text == self.fail_on:
+                raise RuntimeError("synthesizer crashed")
+
+
+def test_hits_do_not_synthesize_again(tmp_path):
+    backend = StubBackend()
+    cache = SpeechCache(str(tmp_path), max_entries=4)
+    path = cache.get_or_synthesize(backend, "hello")
+    assert cache.get_or_synthesize(backend, "hello") == path
+    assert backend.calls == ["hello"]
+    with open(path) as f:
+        assert f.read() == "hello"
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    backend = StubBackend()
+    cache = SpeechCache(str(tmp_path), max_entries=2)
+    first = cache.get_or_synthesize(backend, "first")
+    second = cache.get_or_synthesize(backend, "second")
+    assert cache.get(backend, "first") == first  # Now the most recent
+    cache.get_or_synthesize(backend, "third")
+
+    assert cache.get(backend, "second") is None
+    assert not os.path.exists(second)
+    assert os.path.exists(first)
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_recency_survives_a_restart(tmp_path):
+    backend = StubBackend()
+    cache = SpeechCache(str(tmp_path), max_entries=2)
+    old = cache.get_or_synthesize(backend, "old")
+    new = cache.get_or_synthesize(backend, "new")
+    os.utime(old, (time.time() - 100, time.time() - 100))
+    os.utime(new, (time.time() - 200, time.time() - 200))
+
+    cache = SpeechCache(str(tmp_path), max_entries=2)
+    cache.get_or_synthesize(backend, "newest")
+    assert os.path.exists(old)
+    assert not os.path.exists(new)
+
+
+def test_failed_synthesis_leaves_no_partial_file(tmp_path):
+    backend = StubBackend(fail_on="crash")
+    cache = SpeechCache(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        cache.get_or_synthesize(backend, "crash")
+    assert os.listdir(tmp_path) == []
+    assert cache.get(backend, "crash") is None
+
+
+def test_stale_partial_files_are_removed_on_startup(tmp_path):
+    stale = tmp_path / "abc.wav.1.tmp"
+    fresh = tmp_path / "def.wav.2.tmp"  # Maybe still being written by another process
+    stale.write_text("partial")
+    fresh.write_text("partial")
+    old = time.time() - SpeechCache.STALE_TMP_AGE - 10
+    os.utime(stale, (old, old))
+
+    cache = SpeechCache(str(tmp_path))
+    assert not stale.exists()
+    assert fresh.exists()
+    assert not cache.entries
@@ -0,0 +1,111 @@
+import math
+from collections import namedtuple
+
+import pytest
+
+import wire_protocol as wp
+
+# Stand-in for gaze_pipeline.RegionEvent (importing it would import the camera code)
+RegionEvent = namedtuple("RegionEvent", ["kind", "region", "x", "y", "timestamp", "confidence"])
+
+
+def region(label, x=0.25, y=0.75, timestamp=12.5, confidence=0.875):
+    return RegionEvent("region", label, x, y, timestamp, confidence)
+
+
+def test_frame_round_trip():
+    items = [region("17"), RegionEvent("calibration", "top_mid", None, None, 3.0, 1.0), "Emergency"]
+    events = wp.FrameDecoder().feed(wp.encode_frame(items, first_seq=41))
+
+    assert [e.label for e in events] == ["17", "top_mid", "Emergency"]
+    assert [e.event_type for e in events] == [wp.EVENT_REGION, wp.EVENT_CALIBRATION, wp.EVENT_COMMAND]
+    assert [e.seq for e in events] == [41, 42, 43]
+    first, calibration = events[0], events[1]
+    assert (first.x, first.y, first.confidence, first.timestamp) == (0.25, 0.75, 0.875, 12.5)
+    assert calibration.x is None and calibration.y is None
+
+
+def test_frames_split_anywhere():
+    data = wp.encode_frame([region("1"), region("2")], 0) + wp.encode_frame([region("3")], 2)
+    decoder = wp.FrameDecoder()
+    events = []
+    for i in range(len(data)):
+        events += decoder.feed(data[i:i + 1])
+    assert [e.label for e in events] == ["1", "2", "3"]
+    assert decoder.lost == 0
+
+
+def test_sequence_gaps_are_counted():
+    decoder = wp.FrameDecoder()
+    decoder.feed(wp.encode_frame([region("1")], 0))
+    decoder.feed(wp.encode_frame([region("2")], 5))
+    assert decoder.lost == 4
+
+
+def test_bad_frames():
+    with pytest.raises(wp.ProtocolError):
+        wp.FrameDecoder().feed(b"XX" + bytes(10))
+    with pytest.raises(wp.ProtocolError):
+        wp.encode_frame([region("no such region")])
+
+
+def test_every_label_has_a_stable_code():
+    assert wp.LABELS[:2] == ["outside", "1"]
+    assert len(set(wp.LABELS)) == len(wp.LABELS) < 256
+    events = wp.FrameDecoder().feed(wp.encode_frame([region(label) for label in wp.LABELS]))
+    assert [e.label for e in events] == wp.LABELS
+
+
+def test_text_round_trip_in_chunks():
+    data = wp.encode_text([region("17"), "Emergency", region("outside")]) + b"keepalive\n\n"
+    decoder = wp.LineDecoder()
+    labels = []
+    for chunk in (data[:1], data[1:5], data[5:]):
+        labels += [e.label for e in decoder.feed(chunk)]
+    assert labels == ["17", "Emergency", "outside"]  # Keepalive and empty lines are skipped
+
+
+@pytest.mark.parametrize("chunks, binary", [
+    ([b"G", b"Z"], True),
+    ([b"\n"], False),
+    ([b"G", b"o\n"], False),
+    ([b"17\n"], False),
+])
+def test_stream_decoder_detects_the_protocol(chunks, binary):
+    decoder = wp.StreamDecoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    assert decoder.binary == binary
+
+
+def test_clock_offset_keeps_the_smallest_delay():
+    clock = wp.ClockOffset()
+    assert clock.to_local(100.0, local_time=5.03) == pytest.approx(5.03)
+    assert clock.to_local(100.1, local_time=5.12) == pytest.approx(5.12)  # Faster path: new offset
+    assert clock.to_local(100.2, local_time=5.40) == pytest.approx(5.22)  # Jitter removed
+
+
+def test_sequence_filter_drops_late_duplicate_and_stale_samples():
+    seq_filter = wp.SequenceFilter(max_age=0.5)
+
+    def sample(seq, sent):
+        return wp.WireEvent(wp.EVENT_REGION, "1", 0.5, 0.5, 1.0, sent, seq)
+
+    assert seq_filter.accept(sample(10, 0.0), local_time=1.0) == pytest.approx(1.0)
+    assert seq_filter.accept(sample(10, 0.0), local_time=1.0) is None
+    assert seq_filter.accept(sample(9, 0.0), local_time=1.0) is None
+    assert seq_filter.accept(sample(13, 0.1), local_time=1.1) == pytest.approx(1.1)
+    assert seq_filter.accept(sample(14, 0.2), local_time=1.9) is None
+    assert (seq_filter.reordered, seq_filter.lost, seq_filter.stale) == (2, 2, 1)
+
+
+def test_sequence_filter_wraps_around():
+    seq_filter = wp.SequenceFilter()
+    for seq in (0xFFFFFFFE, 0xFFFFFFFF, 0, 1):
+        assert seq_filter.accept(wp.WireEvent(wp.EVENT_REGION, "1", 0, 0, 1, 0.0, seq), 0.0) is not None
+    assert seq_filter.lost == 0
+
+
+def test_nan_coordinates_mean_none():
+    event = wp.FrameDecoder().feed(wp.encode_frame([region("5", x=math.nan, y=0.5)]))[0]
+    assert event.x is None and event.y == 0.5